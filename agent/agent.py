@@ -13,17 +13,30 @@ import logging
 import os
 import signal
 import sys
+from datetime import datetime, timezone
 
-import httpx
 from dotenv import load_dotenv
 from livekit import agents
-from livekit.agents import Agent, AgentServer, AgentSession, RunContext, function_tool
+from livekit.agents import Agent, AgentServer, AgentSession, JobProcess, RunContext, function_tool
 from livekit.agents.metrics import LLMMetrics, STTMetrics, TTSMetrics
 
 from livekit.plugins import assemblyai, deepgram, elevenlabs, google, silero
 
+from backend_client import aclose_backend_client, get_backend_client
+from bootstrap import BootstrapGraph
+from config_cache import AgentConfigCache
+from function_tools import ToolExecutor, aclose_tool_client, compile_function_tools, tool_latency_stats
+from greeting_cache import get_greeting_audio
+from host_replayer import HostReplayer
+from post_call import get_post_call_queue
+from prompt_templates import compile_template
 from resemble_tts import ResembleTTS
-from usage_logger import log_stt_usage, log_llm_usage, log_tts_usage
+from telemetry_spool import get_telemetry_spool
+from transcript_writer import close_transcript_writer, get_transcript_writer
+from tts_cache import get_tts_cache
+from turn_latency import TurnLatencyTracker
+from usage_logger import flush_usage_events, log_stt_usage, log_llm_usage, log_tts_usage
+from webhooks import PRE_CALL_FALLBACK_GREETING, start_pre_call_webhook
 
 load_dotenv()
 logger = logging.getLogger("voice-agent")
@@ -31,6 +44,10 @@ logger = logging.getLogger("voice-agent")
 # Backend API URL
 BACKEND_API_URL = os.environ.get("BACKEND_API_URL", "http://localhost:8000/api")
 
+# Call-setup deadline, counted from when the caller has joined; optional steps
+# still running after it fall back to defaults
+BOOTSTRAP_DEADLINE_SECONDS = float(os.environ.get("BOOTSTRAP_DEADLINE_SECONDS", "6"))
+
 # Default system prompt if no agent config found
 DEFAULT_INSTRUCTIONS = """You are Dylan, a professional and courteous virtual customer service assistant for Qatar National Bank (QNB) — the largest financial institution in the Middle East and Africa region, headquartered in Doha, Qatar, founded in 1964. You handle inbound customer calls with warmth, clarity, and efficiency.
 
@@ -111,38 +128,8 @@ You assist customers with general banking inquiries, product information, accoun
 - Do not provide investment advice — refer to QNB's wealth management team
 - Keep responses concise — this is a phone call, not a written document"""
 
-
-async def fetch_agent_config(agent_id: str) -> dict | None:
-    """Fetch agent configuration from the backend API."""
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BACKEND_API_URL}/agents/{agent_id}")
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.warning(f"Failed to fetch agent config: {response.status_code}")
-                return None
-    except Exception as e:
-        logger.error(f"Error fetching agent config: {e}")
-        return None
-
-
-async def lookup_agent_by_phone(phone_number: str) -> dict | None:
-    """Look up an agent by its assigned Twilio phone number."""
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{BACKEND_API_URL}/telephony/lookup",
-                params={"phone_number": phone_number},
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.warning(f"No agent found for phone {phone_number}: {response.status_code}")
-                return None
-    except Exception as e:
-        logger.error(f"Error looking up agent by phone: {e}")
-        return None
+# Default greeting if no agent config found
+DEFAULT_FIRST_MESSAGE = "Thank you for calling Qatar National Bank. My name is Dylan, your virtual banking assistant. How may I assist you today?"
 
 
 def get_sip_phone_number(room) -> str | None:
@@ -157,52 +144,60 @@ def get_sip_phone_number(room) -> str | None:
     return None
 
 
-async def create_backend_session(room_name: str, user_id: str, agent_id: str | None) -> str | None:
-    """Create a VoiceSession in the backend. Returns session ID."""
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{BACKEND_API_URL}/sessions/",
-                json={
-                    "room_name": room_name,
-                    "user_id": user_id,
-                    "agent_id": agent_id,
-                    "session_data": {},
-                },
-            )
-            if response.status_code == 201:
-                data = response.json()
-                logger.info(f"Created backend session: {data.get('id')}")
-                return data.get("id")
-            else:
-                logger.warning(f"Failed to create session: {response.status_code} {response.text}")
-    except Exception as e:
-        logger.error(f"Error creating backend session: {e}")
+def get_sip_caller_number(room) -> str | None:
+    """Extract the caller's phone number from a SIP participant in the room."""
+    for participant in room.remote_participants.values():
+        caller_number = (participant.attributes or {}).get("sip.phoneNumber")
+        if caller_number:
+            return caller_number
     return None
 
 
-async def save_transcript_to_backend(room_name: str, content: str, speaker: str):
-    """Save a transcript line to the backend via the by-room endpoint."""
-    if not content or not content.strip():
-        return
+async def bootstrap_backend_session(
+    room_name: str, agent_id: str | None, phone_number: str | None, user_id: str | None
+) -> dict | None:
+    """Resolve the agent and create the VoiceSession in one backend round trip.
+
+    Returns {"session_id", "user_id", "agent"}; "agent" is the full agent config,
+    resolved by agent_id or, for SIP calls, by the dialed phone_number.
+    """
     try:
-        async with httpx.AsyncClient() as client:
-            await client.post(
-                f"{BACKEND_API_URL}/sessions/by-room/{room_name}/transcripts",
-                json={"content": content, "speaker": speaker.upper()},
-            )
+        response = await get_backend_client().post(
+            f"{BACKEND_API_URL}/sessions/bootstrap",
+            json={
+                "room_name": room_name,
+                "agent_id": agent_id,
+                "phone_number": phone_number,
+                "user_id": user_id,
+            },
+        )
+        if response.status_code == 201:
+            data = response.json()
+            logger.info(f"Created backend session: {data.get('session_id')}")
+            return data
+        else:
+            logger.warning(f"Failed to bootstrap session: {response.status_code} {response.text}")
     except Exception as e:
-        logger.error(f"Error saving transcript: {e}")
+        logger.error(f"Error bootstrapping backend session: {e}")
+    return None
+
+
+def save_transcript_to_backend(room_name: str, content: str, speaker: str):
+    """Queue a transcript line; the room's writer saves lines in ordered batches."""
+    get_transcript_writer(BACKEND_API_URL, room_name).add(content, speaker)
 
 
 async def end_backend_session(room_name: str):
-    """End the session in the backend to calculate duration."""
-    try:
-        async with httpx.AsyncClient() as client:
-            await client.post(f"{BACKEND_API_URL}/sessions/by-room/{room_name}/end")
-            logger.info(f"Ended backend session for room {room_name}")
-    except Exception as e:
-        logger.error(f"Error ending backend session: {e}")
+    """End the session in the backend to calculate duration.
+
+    Spooled behind the call's transcripts and usage events, so the backend
+    sees them before it aggregates costs and analyzes the call.
+    """
+    get_telemetry_spool(BACKEND_API_URL).append(
+        f"/sessions/by-room/{room_name}/end",
+        {"ended_at": datetime.now(timezone.utc).isoformat()},
+    )
+    logger.info(f"Queued backend session end for room {room_name}")
 
 
 def create_transfer_call_tool(room_name: str, session_id_holder: dict) -> object:
@@ -256,9 +251,7 @@ def create_transfer_call_tool(room_name: str, session_id_holder: dict) -> object
             await session.say(announce_msg)
 
         # Log to transcript
-        asyncio.create_task(
-            save_transcript_to_backend(room_name, f"[Transfer: {transfer_type} → {phone_number}]", "AGENT")
-        )
+        save_transcript_to_backend(room_name, f"[Transfer: {transfer_type} → {phone_number}]", "AGENT")
 
         # Call backend to initiate transfer
         if not session_id:
@@ -268,21 +261,18 @@ def create_transfer_call_tool(room_name: str, session_id_holder: dict) -> object
             return "Error: No active session to transfer"
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{BACKEND_API_URL}/sessions/{session_id}/transfer",
-                    json={"phone_number": phone_number, "type": transfer_type},
-                    timeout=10,
-                )
-                response.raise_for_status()
-                result = response.json()
+            response = await get_backend_client().post(
+                f"{BACKEND_API_URL}/sessions/{session_id}/transfer",
+                json={"phone_number": phone_number, "type": transfer_type},
+                timeout=10,
+            )
+            response.raise_for_status()
+            result = response.json()
         except Exception as e:
             logger.error(f"Transfer API call failed: {e}")
             if session:
                 await session.say("I'm sorry, the transfer didn't go through. Let me continue helping you.")
-            asyncio.create_task(
-                save_transcript_to_backend(room_name, f"[Transfer failed: {e}]", "AGENT")
-            )
+            save_transcript_to_backend(room_name, f"[Transfer failed: {e}]", "AGENT")
             return f"Transfer failed: {str(e)}"
 
         logger.info(f"Transfer initiated: {result}")
@@ -292,20 +282,18 @@ def create_transfer_call_tool(room_name: str, session_id_holder: dict) -> object
             # Cold transfer: agent disconnects after handoff
             if session:
                 await session.say("Your call is being transferred now. Goodbye!")
-            asyncio.create_task(
-                save_transcript_to_backend(room_name, "[Agent disconnected after cold transfer]", "AGENT")
-            )
+            save_transcript_to_backend(room_name, "[Agent disconnected after cold transfer]", "AGENT")
             # Give TTS time to finish speaking before disconnecting
             await asyncio.sleep(3)
+            await close_transcript_writer(room_name)
+            await flush_usage_events(session_id)
             await end_backend_session(room_name)
             if context.session:
                 context.session.close()
         else:
             # Warm transfer: agent stays for intro, then drops
             # Return result so LLM can facilitate the introduction
-            asyncio.create_task(
-                save_transcript_to_backend(room_name, "[Warm transfer initiated — agent staying for intro]", "AGENT")
-            )
+            save_transcript_to_backend(room_name, "[Warm transfer initiated — agent staying for intro]", "AGENT")
 
         return f"Transfer {transfer_type} to {phone_number} initiated successfully. Status: {result.get('status', 'unknown')}"
 
@@ -316,115 +304,52 @@ def create_function_tools(functions_config: list[dict], room_name: str) -> list:
     """Build dynamic LiveKit function tools from agent config.functions array.
 
     Each function config defines a name, description, JSON Schema parameters,
-    and an HTTP endpoint to call when the LLM invokes the tool.
+    and an HTTP endpoint to call when the LLM invokes the tool. Configs are
+    compiled once into executors shared by every session in the process.
     """
     tools = []
-    for func_config in functions_config:
-        name = func_config.get("name")
-        description = func_config.get("description", "")
-        parameters = func_config.get("parameters", {"type": "object", "properties": {}})
-        endpoint = func_config.get("endpoint", {})
-        speak_during_execution = func_config.get("speak_during_execution", False)
-        speak_on_send = func_config.get("speak_on_send", "")
-
-        if not name:
-            logger.warning("Skipping function with no name")
-            continue
-
-        raw_schema = {
-            "type": "function",
-            "name": name,
-            "description": description,
-            "parameters": parameters,
-        }
-
-        # Capture config in closure defaults to avoid late-binding issues
-        def _make_handler(
-            _endpoint=endpoint,
-            _name=name,
-            _speak_during_execution=speak_during_execution,
-            _speak_on_send=speak_on_send,
-            _room_name=room_name,
-        ):
+    for executor in compile_function_tools(functions_config):
+        # Capture the executor in a closure default to avoid late-binding issues
+        def _make_handler(_executor: ToolExecutor = executor, _room_name: str = room_name):
             async def handler(raw_arguments: dict[str, object], context: RunContext):
-                logger.info(f"Function call: {_name}({json.dumps(raw_arguments)})")
+                args_str = json.dumps(raw_arguments)
+                logger.info(f"Function call: {_executor.name}({args_str})")
 
                 # Say filler phrase while executing if configured
-                if _speak_during_execution and _speak_on_send:
+                if _executor.speak_during_execution and _executor.speak_on_send:
                     session = context.session
                     if session:
-                        await session.say(_speak_on_send)
-
-                # Make HTTP request to the configured endpoint
-                url = _endpoint.get("url", "")
-                method = _endpoint.get("method", "POST").upper()
-                header_list = _endpoint.get("headers", [])
-                timeout = _endpoint.get("timeout", 10)
-
-                header_dict = {}
-                for h in header_list:
-                    key = h.get("key", "")
-                    value = h.get("value", "")
-                    if key:
-                        header_dict[key] = value
-
-                result_text = ""
-                try:
-                    async with httpx.AsyncClient() as client:
-                        if method in ("POST", "PUT", "PATCH"):
-                            response = await client.request(
-                                method=method,
-                                url=url,
-                                json=raw_arguments,
-                                headers=header_dict,
-                                timeout=timeout,
-                            )
-                        else:  # GET, DELETE — send args as query params
-                            response = await client.request(
-                                method=method,
-                                url=url,
-                                params={k: str(v) for k, v in raw_arguments.items()},
-                                headers=header_dict,
-                                timeout=timeout,
-                            )
-
-                        response.raise_for_status()
-
-                        content_type = response.headers.get("content-type", "")
-                        if "application/json" in content_type:
-                            result_data = response.json()
-                            result_text = json.dumps(result_data)
-                        else:
-                            result_text = response.text
-
-                except httpx.TimeoutException:
-                    result_text = f"Error: Request to {_name} timed out after {timeout}s"
-                    logger.error(f"Function {_name} timed out: {url}")
-                except httpx.HTTPStatusError as e:
-                    result_text = f"Error: {_name} returned HTTP {e.response.status_code}"
-                    logger.error(f"Function {_name} HTTP error: {e}")
-                except Exception as e:
-                    result_text = f"Error: {_name} failed — {str(e)}"
-                    logger.error(f"Function {_name} error: {e}")
+                        await session.say(_executor.speak_on_send)
+
+                result_text = await _executor.execute(raw_arguments, args_str)
 
                 # Log function call to transcript
-                args_str = json.dumps(raw_arguments)
-                log_content = f"[Function: {_name}({args_str})] → {result_text}"
-                asyncio.create_task(
-                    save_transcript_to_backend(_room_name, log_content, "AGENT")
-                )
+                log_content = f"[Function: {_executor.name}({args_str})] → {result_text}"
+                save_transcript_to_backend(_room_name, log_content, "AGENT")
 
                 return result_text
 
             return handler
 
-        tool = function_tool(_make_handler(), raw_schema=raw_schema)
+        tool = function_tool(_make_handler(), raw_schema=executor.schema)
         tools.append(tool)
-        logger.info(f"Registered function tool: {name}")
+        logger.info(f"Registered function tool: {executor.name}")
 
     return tools
 
 
+def create_stt(stt_provider: str):
+    """Create the STT plugin for the configured provider (default AssemblyAI)."""
+    if stt_provider == "assemblyai":
+        logger.info("Using AssemblyAI for STT")
+        return assemblyai.STT()
+    if stt_provider == "elevenlabs":
+        logger.info("Using ElevenLabs for STT")
+        return elevenlabs.STT()
+    logger.info("Using Deepgram for STT")
+    return deepgram.STT()
+
+
 class VoiceAssistant(Agent):
     """Custom voice assistant agent."""
 
@@ -435,8 +360,23 @@ class VoiceAssistant(Agent):
         )
 
 
+def prewarm(proc: JobProcess):
+    """Load heavy plugin state once per worker process.
+
+    Runs before the process accepts jobs, so model loading stays off the
+    call setup path. Every session in this process shares the handles
+    stored in proc.userdata.
+    """
+    proc.userdata["vad"] = silero.VAD.load()
+    logger.info("Prewarmed Silero VAD for worker process")
+
+    agent_configs = AgentConfigCache(BACKEND_API_URL)
+    agent_configs.preload()
+    proc.userdata["agent_configs"] = agent_configs
+
+
 # Create the agent server
-server = AgentServer()
+server = AgentServer(setup_fnc=prewarm)
 
 
 @server.rtc_session()
@@ -444,161 +384,235 @@ async def entrypoint(ctx: agents.JobContext):
     """Main entrypoint for the voice agent session."""
     
     logger.info(f"Starting voice agent session for room: {ctx.room.name}")
+
+    # Deliver this call's telemetry and post-call webhook while the job runs
+    get_telemetry_spool(BACKEND_API_URL).start()
+    get_post_call_queue().start()
+
+    # Shutdown callbacks run concurrently after the entrypoint returns: give
+    # the spool and the post-call queue a couple of seconds to deliver this
+    # call's requests, then close the shared clients. Both are durable on
+    # disk, so the rest is delivered by the host replayer in the worker's
+    # main process rather than holding the job open
+    async def close_backend_io():
+        await asyncio.gather(
+            get_telemetry_spool(BACKEND_API_URL).drain(),
+            get_post_call_queue().drain(),
+        )
+        await aclose_backend_client()
+        await aclose_tool_client()
+
+    ctx.add_shutdown_callback(close_backend_io)
     
-    # Wait for room to be fully connected
-    await ctx.connect()
-    logger.info("Room connected, waiting for participant...")
-    participant = await ctx.wait_for_participant()
-    logger.info(f"Participant joined: {participant.identity}, reading metadata...")
-    
-    # Get agent ID from room metadata
-    room_metadata = ctx.room.metadata
-    logger.info(f"Room metadata: {room_metadata}")
-    
-    # Parse room metadata to get agent configuration
-    agent_id = None
-    agent_config = None
-    voice_id = None
-    system_prompt = DEFAULT_INSTRUCTIONS
-    first_message = "Thank you for calling Qatar National Bank. My name is Dylan, your virtual banking assistant. How may I assist you today?"
-    first_message_mode = "assistant_speaks_first"  # or "assistant_waits"
-    metadata = {}
-    
-    # Parse room metadata to get agent ID (browser calls)
-    if room_metadata:
+    # --- CONCURRENT BOOTSTRAP ---
+    # Setup steps run as a dependency graph so independent work overlaps,
+    # e.g. the agent config fetch starts while we are still waiting for the
+    # participant whenever the room metadata already carries the agent ID.
+    boot = BootstrapGraph()
+    agent_configs: AgentConfigCache = ctx.proc.userdata["agent_configs"]
+
+    @boot.step("connect", required=True)
+    async def connect_room():
+        await ctx.connect()
+        logger.info("Room connected, waiting for participant...")
+
+    @boot.step("participant", needs=("connect",), required=True)
+    async def wait_participant(connect):
+        p = await ctx.wait_for_participant()
+        logger.info(f"Participant joined: {p.identity}")
+        return p
+
+    @boot.step("config_sync")
+    async def sync_config_cache():
+        # Overlaps the routing delta sync (if due) with connecting and waiting
+        await agent_configs.ensure_fresh()
+
+    @boot.step("room_meta", default={})
+    async def parse_room_meta():
+        # The job carries the room metadata, so it is readable before connecting
+        room_metadata = ctx.job.room.metadata or ctx.job.metadata
+        if not room_metadata:
+            await boot.get("connect")
+            room_metadata = ctx.room.metadata
+        logger.info(f"Room metadata: {room_metadata}")
+        if not room_metadata:
+            return {}
         try:
-            metadata = json.loads(room_metadata)
-            agent_id = metadata.get("agentId")
-            logger.info(f"Found agent ID in room metadata: {agent_id}")
+            return json.loads(room_metadata)
         except json.JSONDecodeError as e:
             logger.warning(f"Failed to parse room metadata: {e}")
-    
-    # --- SIP CALL DETECTION ---
-    # If no agentId from room metadata, check for a SIP participant
-    # and resolve the agent by the called phone number
-    if not agent_id or agent_id == "default":
+            return {}
+
+    @boot.step("sip_number", needs=("room_meta",))
+    async def detect_sip_number(room_meta):
+        # Browser calls carry the agent ID in the room metadata
+        if room_meta.get("agentId") not in (None, "", "default"):
+            return None
+
+        # --- SIP CALL DETECTION ---
+        # No agentId in room metadata: wait for the SIP participant
+        # and resolve the agent by the called phone number
+        await boot.get("participant")
         sip_number = get_sip_phone_number(ctx.room)
         if sip_number:
             logger.info(f"SIP call detected to number: {sip_number}")
-            lookup = await lookup_agent_by_phone(sip_number)
-            if lookup:
-                agent_id = lookup.get("agent_id")
-                logger.info(f"Resolved SIP call to agent: {agent_id} ({lookup.get('name')})")
-            else:
-                logger.warning(f"No agent configured for SIP number {sip_number}, using defaults")
-    
-    # Fetch agent config if we have an agent ID
-    if agent_id and agent_id != "default":
-        agent_config = await fetch_agent_config(agent_id)
+        return sip_number
+
+    @boot.step("agent_id", needs=("room_meta", "sip_number"))
+    async def resolve_agent_id(room_meta, sip_number):
+        resolved = room_meta.get("agentId")
+        if resolved and resolved != "default":
+            logger.info(f"Found agent ID in room metadata: {resolved}")
+            return resolved
+        if not sip_number:
+            return None
+        cached = await agent_configs.lookup_phone(sip_number)
+        if cached:
+            logger.info(f"Resolved SIP call to agent from cache: {cached['id']} ({cached.get('name')})")
+            return cached["id"]
+        # Unknown number: the session bootstrap resolves it on the backend
+        return None
+
+    # --- CREATE BACKEND SESSION ---
+    # One round trip resolves the agent (by ID, or by the dialed number when the
+    # cache does not know it) and creates the session. Browser calls pass the
+    # Clerk userId from room metadata; SIP sessions default to the agent owner
+    # so they appear in their call log.
+    @boot.step("backend_session", needs=("room_meta", "sip_number", "agent_id"))
+    async def create_session(room_meta, sip_number, agent_id):
+        return await bootstrap_backend_session(
+            room_name=ctx.room.name,
+            agent_id=agent_id,
+            phone_number=None if agent_id else sip_number,
+            user_id=room_meta.get("userId"),
+        )
+
+    @boot.step("agent_config", needs=("agent_id",))
+    async def load_agent_config(agent_id):
+        if agent_id and agent_id in agent_configs:
+            config = await agent_configs.get(agent_id)
+        else:
+            # Not cached: the session bootstrap returns the config with the session
+            backend_session = await boot.get("backend_session")
+            config = backend_session.get("agent") if backend_session else None
+            if config is None and agent_id:
+                config = await agent_configs.get(agent_id)
+        if config:
+            logger.info(f"Full agent config: {config}")
+        elif sip_number := await boot.get("sip_number"):
+            logger.warning(f"No agent configured for SIP number {sip_number}, using defaults")
+        return config
+
+    # --- PRE-CALL WEBHOOK ---
+    # Started as soon as the agent config is known; the greeting only waits
+    # for it up to its latency budget, and late variables are applied to the
+    # system prompt once the session is running.
+    @boot.step("pre_call", needs=("agent_config", "agent_id", "room_meta", "sip_number"))
+    async def start_pre_call(agent_config, agent_id, room_meta, sip_number):
+        if not agent_config:
+            return None
+        pre_call = agent_config.get("config", {}).get("webhooks", {}).get("pre_call", {})
+        if not pre_call.get("enabled"):
+            return None
+        return start_pre_call_webhook(
+            pre_call,
+            agent_id=agent_id,
+            version=agent_config.get("updated_at", ""),
+            room_name=ctx.room.name,
+            user_id=room_meta.get("userId"),  # From room metadata
+            caller_number=get_sip_caller_number(ctx.room) if sip_number else None,
+        )
+
+    @boot.step("pre_call_variables", needs=("pre_call",))
+    async def wait_pre_call(pre_call):
+        # None means the webhook is still running past its budget
+        return await pre_call.within_budget() if pre_call else {}
+
+    @boot.step("stt", needs=("agent_config",), required=True)
+    async def build_stt(agent_config):
+        provider = "assemblyai"
         if agent_config:
-            logger.info(f"Full agent config: {agent_config}")
-            config = agent_config.get("config", {})
-            system_prompt = config.get("system_prompt") or DEFAULT_INSTRUCTIONS
-            first_message = config.get("first_message") or first_message
-            voice_id = config.get("voice_id")
-            first_message_mode = config.get("first_message_mode", "assistant_speaks_first")
-            
-    # Get STT provider from config (default to assemblyai)
+            provider = agent_config.get("config", {}).get("stt_provider", "assemblyai")
+        return create_stt(provider)
+
+    @boot.step("tts", needs=("agent_config",), required=True)
+    async def build_tts(agent_config):
+        # Create TTS with the configured voice
+        voice_id = agent_config.get("config", {}).get("voice_id") if agent_config else None
+        return ResembleTTS(voice_uuid=voice_id) if voice_id else ResembleTTS()
+
+    @boot.step("prompts", needs=("agent_config", "pre_call_variables"), required=True)
+    async def render_prompts(agent_config, pre_call_variables):
+        config = agent_config.get("config", {}) if agent_config else {}
+        system_prompt = config.get("system_prompt") or DEFAULT_INSTRUCTIONS
+        first_message = config.get("first_message") or DEFAULT_FIRST_MESSAGE
+
+        system_template = compile_template(system_prompt)
+        first_message_template = compile_template(first_message)
+        # Apply pre-call webhook variables to prompts (missing keys stay as written)
+        if pre_call_variables:
+            system_prompt = system_template.render(pre_call_variables)
+            first_message = first_message_template.render(pre_call_variables)
+        elif pre_call_variables is None and first_message_template.variables:
+            # Don't greet with unfilled placeholders while the webhook is late
+            first_message = PRE_CALL_FALLBACK_GREETING
+
+        return {"system_prompt": system_prompt, "first_message": first_message}
+
+    # --- GREETING AUDIO ---
+    # The greeting is spoken from pre-synthesized audio rather than generated by
+    # the LLM. A static greeting comes straight from the cache without waiting
+    # for the pre-call webhook; a templated one is synthesized as soon as the
+    # webhook variables are applied.
+    @boot.step("greeting", needs=("agent_config", "tts"))
+    async def prepare_greeting(agent_config, tts):
+        config = agent_config.get("config", {}) if agent_config else {}
+        if config.get("first_message_mode", "assistant_speaks_first") != "assistant_speaks_first":
+            return None
+        template = config.get("first_message") or DEFAULT_FIRST_MESSAGE
+        is_static = not compile_template(template).variables
+        text = template if is_static else (await boot.get("prompts"))["first_message"]
+        if text == PRE_CALL_FALLBACK_GREETING:
+            is_static = True
+        return await get_greeting_audio(
+            tts,
+            text,
+            agent_id=agent_config["id"] if agent_config else "default",
+            version=agent_config.get("updated_at", "") if agent_config else "",
+            voice_id=tts.voice_uuid,
+            cache=is_static,
+        )
+
+    # A slow SIP join must not eat into the time left for the agent config and
+    # greeting, so the deadline only starts once the participant is in
+    results = await boot.run(deadline=BOOTSTRAP_DEADLINE_SECONDS, deadline_after=("participant",))
+
+    metadata = results["room_meta"]
+    agent_config = results["agent_config"]
+    agent_id = agent_config.get("id") if agent_config else results["agent_id"]
+    stt = results["stt"]
+    tts = results["tts"]
+    backend_session = results["backend_session"] or {}
+    session_id = backend_session.get("session_id")
+    session_user_id = backend_session.get("user_id")  # Internal DB user UUID
+
+    system_prompt = results["prompts"]["system_prompt"]
+    first_message = results["prompts"]["first_message"]
+    first_message_mode = "assistant_speaks_first"  # or "assistant_waits"
     stt_provider = "assemblyai"
-    if agent_config:
-        stt_provider = agent_config.get("config", {}).get("stt_provider", "assemblyai")
-    
-    # Create STT based on provider selection
-    if stt_provider == "assemblyai":
-        stt = assemblyai.STT()
-        logger.info("Using AssemblyAI for STT")
-    elif stt_provider == "elevenlabs":
-        stt = elevenlabs.STT()
-        logger.info("Using ElevenLabs for STT")
-    else:
-        stt = deepgram.STT()
-        logger.info("Using Deepgram for STT")
-    
-    # Continue with agent config parsing for webhooks
     if agent_config:
         config = agent_config.get("config", {})
-        
-        # --- WEBHOOKS SUPPORT ---
-        webhooks = config.get("webhooks", {})
-        
-        # Pre-call Webhook
-        pre_call = webhooks.get("pre_call", {})
-        if pre_call.get("enabled"):
-            logger.info("Executing pre-call webhook...")
-            try:
-                payload = {
-                    "agent_id": agent_id,
-                    "room_name": ctx.room.name,
-                    "user_id": metadata.get("userId"), # From room metadata
-                    "event": "pre_call"
-                }
-                
-                response_data = await execute_webhook(
-                    url=pre_call.get("url"),
-                    method=pre_call.get("method", "GET"),
-                    headers=pre_call.get("headers", []),
-                    body=payload if pre_call.get("method") == "POST" else None,
-                    timeout=pre_call.get("timeout", 5)
-                )
-                
-                # Handle Assignments
-                if response_data and pre_call.get("assignments"):
-                    variables = {}
-                    for assignment in pre_call.get("assignments", []):
-                        # Simple path traversal (e.g. key.subkey)
-                        value = response_data
-                        for key in assignment["path"].split("."):
-                            if isinstance(value, dict):
-                                value = value.get(key)
-                            else:
-                                value = None
-                                break
-                        if value is not None:
-                            variables[assignment["variable"]] = str(value)
-                    
-                    logger.info(f"Webhook assignments: {variables}")
-                    
-                    # Apply variables to prompts
-                    if variables:
-                        try:
-                            # Use safe substitution that ignores missing keys
-                            for key, val in variables.items():
-                                placeholder = "{{" + key + "}}"
-                                system_prompt = system_prompt.replace(placeholder, val)
-                                first_message = first_message.replace(placeholder, val)
-                        except Exception as e:
-                            logger.error(f"Error applying webhook variables: {e}")
-
-            except Exception as e:
-                logger.error(f"Pre-call webhook failed: {e}")
-
-    # Create TTS with the configured voice
-    tts = ResembleTTS(voice_uuid=voice_id) if voice_id else ResembleTTS()
-    
-    # --- CREATE BACKEND SESSION ---
-    # For SIP calls, use the agent owner's user_id so sessions appear in their call log.
-    # For browser calls, use the Clerk userId from room metadata.
-    # agent_config["user_id"] is the agent owner's internal DB user UUID.
-    if metadata.get("userId"):
-        session_user_id = metadata["userId"]
-    elif agent_config and agent_config.get("user_id"):
-        session_user_id = agent_config["user_id"]  # Agent owner's DB UUID for SIP calls
-    else:
-        session_user_id = "sip-caller"  # Last-resort fallback
-    session_id_holder = {"id": None}
-    session_id = await create_backend_session(
-        room_name=ctx.room.name,
-        user_id=session_user_id,
-        agent_id=agent_id,
-    )
-    session_id_holder["id"] = session_id
+        first_message_mode = config.get("first_message_mode", "assistant_speaks_first")
+        stt_provider = config.get("stt_provider", "assemblyai")
+
+    session_id_holder = {"id": session_id}
     
     # Create the agent session with STT, LLM, and TTS
     session = AgentSession(
         stt=stt,
         llm=google.LLM(),
         tts=tts,
-        vad=silero.VAD.load(),
+        vad=ctx.proc.userdata["vad"],
     )
     
     # --- TRANSCRIPT HOOKS ---
@@ -613,8 +627,20 @@ async def entrypoint(ctx: agents.JobContext):
         if not text:
             text = transcript.get("transcript", transcript.get("text", "")) if isinstance(transcript, dict) else ""
         if text and text.strip():
-            asyncio.create_task(save_transcript_to_backend(ctx.room.name, text.strip(), "USER"))
+            save_transcript_to_backend(ctx.room.name, text.strip(), "USER")
     
+    # --- TURN LATENCY ---
+    # One record per agent reply, built from the timings LiveKit attaches to
+    # each chat message, shipped in batches with the rest of the telemetry
+    latency_tracker = (
+        TurnLatencyTracker(BACKEND_API_URL, session_id, agent_id, stt_provider) if session_id else None
+    )
+
+    @session.on("function_tools_executed")
+    def on_tools_executed(event):
+        if latency_tracker:
+            latency_tracker.on_tools_executed(event)
+
     # Save agent speech transcripts via conversation_item_added (role='assistant')
     @session.on("conversation_item_added")
     def on_conversation_item(event):
@@ -622,6 +648,12 @@ async def entrypoint(ctx: agents.JobContext):
         if item is None:
             return
         role = getattr(item, "role", None)
+        turn_metrics = getattr(item, "metrics", None)
+        if latency_tracker and turn_metrics is not None:
+            if role == "user":
+                latency_tracker.on_user_message(turn_metrics)
+            elif role == "assistant":
+                latency_tracker.on_assistant_message(turn_metrics, getattr(item, "interrupted", False))
         if role != "assistant":
             return  # Only capture agent turns here; user turns come from user_input_transcribed
         # Extract text content from ChatMessage
@@ -640,14 +672,16 @@ async def entrypoint(ctx: agents.JobContext):
         else:
             text = str(content).strip() if content else ""
         if text:
-            asyncio.create_task(save_transcript_to_backend(ctx.room.name, text, "AGENT"))
+            save_transcript_to_backend(ctx.room.name, text, "AGENT")
     
     # --- USAGE METRICS HOOK ---
     # Log STT / LLM / TTS usage events for cost tracking
     @session.on("metrics_collected")
-    def on_metrics(metrics):
+    def on_metrics(event):
         if not session_id:
             return  # Can't log without a backend session
+        # AgentSession emits a MetricsCollectedEvent wrapping the metrics
+        metrics = getattr(event, "metrics", event)
         if isinstance(metrics, STTMetrics):
             log_stt_usage(
                 backend_url=BACKEND_API_URL,
@@ -668,14 +702,17 @@ async def entrypoint(ctx: agents.JobContext):
                 output_tokens=metrics.completion_tokens,
             )
         elif isinstance(metrics, TTSMetrics):
-            log_tts_usage(
-                backend_url=BACKEND_API_URL,
-                session_id=session_id,
-                user_id=session_user_id,
-                agent_id=agent_id,
-                provider="resemble",
-                character_count=metrics.characters_count,
-            )
+            # Phrases served from the audio cache are not billed by Resemble
+            character_count = tts.billable_characters(metrics)
+            if character_count:
+                log_tts_usage(
+                    backend_url=BACKEND_API_URL,
+                    session_id=session_id,
+                    user_id=session_user_id,
+                    agent_id=agent_id,
+                    provider="resemble",
+                    character_count=character_count,
+                )
 
     # --- FUNCTION TOOLS ---
     # Build dynamic tools from agent config.functions array
@@ -693,17 +730,41 @@ async def entrypoint(ctx: agents.JobContext):
 
     # Start the session with the configured system prompt and tools
     logger.info(f"Starting session with system_prompt ({len(system_prompt)} chars), first_message_mode={first_message_mode}")
-    await session.start(
-        room=ctx.room,
-        agent=VoiceAssistant(instructions=system_prompt, tools=function_tools),
-    )
+    assistant = VoiceAssistant(instructions=system_prompt, tools=function_tools)
+    await session.start(room=ctx.room, agent=assistant)
+
+    # The pre-call webhook missed its budget: apply its variables when they arrive
+    late_pre_call_task = None
+    pre_call = results["pre_call"]
+    if pre_call is not None and results["pre_call_variables"] is None:
+        async def apply_late_pre_call_variables():
+            variables = await pre_call.result()
+            if not variables:
+                return
+            await assistant.update_instructions(compile_template(system_prompt).render(variables))
+            logger.info(f"Applied {len(variables)} late pre-call variable(s) to the system prompt")
+
+        late_pre_call_task = asyncio.create_task(apply_late_pre_call_variables())
     
-    # Generate initial greeting only if mode is assistant_speaks_first
+    # Speak the initial greeting only if mode is assistant_speaks_first
     if first_message_mode == "assistant_speaks_first":
-        logger.info(f"Generating initial greeting: {first_message}")
-        await session.generate_reply(
-            instructions=f"Say this exact greeting: {first_message}"
-        )
+        greeting = results["greeting"]
+        if greeting:
+            logger.info(f"Playing pre-synthesized greeting (cached={greeting.cached}): {first_message}")
+            if greeting.billable_characters and session_id:
+                log_tts_usage(
+                    backend_url=BACKEND_API_URL,
+                    session_id=session_id,
+                    user_id=session_user_id,
+                    agent_id=agent_id,
+                    provider="resemble",
+                    character_count=greeting.billable_characters,
+                )
+            await session.say(first_message, audio=greeting.frames())
+        else:
+            # Greeting audio missed the bootstrap deadline: synthesize it live
+            logger.info(f"Speaking initial greeting: {first_message}")
+            await session.say(first_message)
     else:
         logger.info("Assistant waiting for user to speak first")
 
@@ -713,78 +774,63 @@ async def entrypoint(ctx: agents.JobContext):
     except Exception:
         pass
     
+    if late_pre_call_task is not None and not late_pre_call_task.done():
+        pre_call.cancel()
+        late_pre_call_task.cancel()
+
+    logger.info(f"TTS audio cache stats: {get_tts_cache().stats_dict()}")
+    if latency_tracker:
+        latency_tracker.flush()
+        logger.info(f"Turn latency: {latency_tracker.summary()}")
+    tool_stats = tool_latency_stats()
+    if tool_stats:
+        logger.info(f"Function tool latency: {tool_stats}")
+
     # --- END BACKEND SESSION ---
+    # Flush transcripts and usage first so post-call analysis and cost
+    # aggregation see the whole conversation
+    await close_transcript_writer(ctx.room.name)
+    if session_id:
+        await flush_usage_events(session_id)
     await end_backend_session(ctx.room.name)
 
-    # --- POST-CALL WEBHOOK EXECUTION ---
-    # This runs after the room is disconnected/shutdown
+    # --- POST-CALL WEBHOOK ---
+    # Queued for background delivery (with retries) so the job can return as
+    # soon as the room is gone instead of waiting on the customer's endpoint
     if agent_config:
          webhooks = agent_config.get("config", {}).get("webhooks", {})
          post_call = webhooks.get("post_call", {})
          
-         if post_call.get("enabled"):
-            logger.info("Executing post-call webhook...")
+         if post_call.get("enabled") and post_call.get("url"):
+            logger.info("Queueing post-call webhook...")
+            # Context variables
+            variables = {
+                "agent_id": agent_id,
+                "room_name": ctx.room.name,
+                "user_id": metadata.get("userId") if metadata else None,
+                "reason": "disconnected", # Generic reason as detailed reason might not be available
+            }
+            
+            # Construct body (values are JSON-escaped, so quotes in them can't break it)
+            body_template = post_call.get("body", "{}")
+            body_str = compile_template(body_template).render_json(variables) if body_template else body_template
+            
+            req_body = None
             try:
-                # Context variables
-                variables = {
-                    "agent_id": agent_id,
-                    "room_name": ctx.room.name,
-                    "user_id": metadata.get("userId") if metadata else None,
-                    "reason": "disconnected", # Generic reason as detailed reason might not be available
-                }
-                
-                # Construct body
-                body_template = post_call.get("body", "{}")
-                body_str = body_template
-                for key, val in variables.items():
-                    placeholder = "{{" + key + "}}"
-                    if body_str:
-                        body_str = body_str.replace(placeholder, str(val))
-                
-                req_body = None
-                try:
-                    if body_str:
-                        req_body = json.loads(body_str)
-                    else:
-                        req_body = variables # Default payload
-                except:
-                    req_body = variables
-
-                await execute_webhook(
-                    url=post_call.get("url"),
-                    method=post_call.get("method", "POST"),
-                    headers=post_call.get("headers", []),
-                    body=req_body,
-                    timeout=post_call.get("timeout", 10)
-                )
-                logger.info("Post-call webhook executed successfully.")
-            except Exception as e:
-                logger.error(f"Post-call webhook failed: {e}")
-
-async def execute_webhook(url: str, method: str, headers: list, body: dict | None, timeout: int) -> dict | None:
-    """Execute a webhook request."""
-    if not url:
-        return None
-        
-    try:
-        # Convert list of headers to dict
-        header_dict = {h["key"]: h["value"] for h in headers if h["key"]}
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method=method,
-                url=url,
-                headers=header_dict,
-                json=body,
-                timeout=timeout
+                if body_str:
+                    req_body = json.loads(body_str)
+                else:
+                    req_body = variables # Default payload
+            except:
+                req_body = variables
+
+            get_post_call_queue().enqueue(
+                url=post_call["url"],
+                method=post_call.get("method", "POST"),
+                headers=post_call.get("headers", []),
+                body=req_body,
+                timeout=post_call.get("timeout", 10)
             )
-            response.raise_for_status()
-            if response.headers.get("content-type") == "application/json":
-                return response.json()
-            return None
-    except Exception as e:
-        logger.error(f"Webhook request failed to {url}: {e}")
-        raise e
 
 
 def _handle_sigterm(signum, frame):
@@ -795,4 +841,6 @@ def _handle_sigterm(signum, frame):
 
 if __name__ == "__main__":
     signal.signal(signal.SIGTERM, _handle_sigterm)
+    # Jobs are single-use processes; the main process delivers what they leave queued
+    HostReplayer(BACKEND_API_URL).start()
     agents.cli.run_app(server)
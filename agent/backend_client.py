@@ -0,0 +1,60 @@
+"""
+Shared HTTP client for agent → backend traffic.
+
+All backend calls from the worker (config lookups, session lifecycle,
+transcripts, usage events, transfers) go through one pooled client per event
+loop, so connections are kept alive and reused instead of paying a new
+TCP/TLS handshake per request. HTTP/2 is negotiated when the backend is served
+over TLS, multiplexing concurrent requests on a single connection.
+
+Pool limits and timeouts are configurable through environment variables.
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+
+import httpx
+
+logger = logging.getLogger("backend-client")
+
+BACKEND_HTTP2 = os.environ.get("BACKEND_HTTP2", "true").lower() in ("1", "true", "yes")
+BACKEND_HTTP_TIMEOUT = float(os.environ.get("BACKEND_HTTP_TIMEOUT", "5"))
+BACKEND_HTTP_CONNECT_TIMEOUT = float(os.environ.get("BACKEND_HTTP_CONNECT_TIMEOUT", "5"))
+BACKEND_HTTP_MAX_CONNECTIONS = int(os.environ.get("BACKEND_HTTP_MAX_CONNECTIONS", "100"))
+BACKEND_HTTP_MAX_KEEPALIVE = int(os.environ.get("BACKEND_HTTP_MAX_KEEPALIVE", "20"))
+BACKEND_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("BACKEND_HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# httpx clients are bound to the loop they were created on; thread-based job
+# executors run one loop per job, so keep one client per loop.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_backend_client() -> httpx.AsyncClient:
+    """Return the shared backend client for the running event loop, creating it lazily."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=BACKEND_HTTP2,
+            limits=httpx.Limits(
+                max_connections=BACKEND_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=BACKEND_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=BACKEND_HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(BACKEND_HTTP_TIMEOUT, connect=BACKEND_HTTP_CONNECT_TIMEOUT),
+        )
+        _clients[loop] = client
+        logger.debug("Created shared backend HTTP client")
+    return client
+
+
+async def aclose_backend_client() -> None:
+    """Close the shared client for the running loop. Safe to call more than once."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        logger.debug("Closed shared backend HTTP client")
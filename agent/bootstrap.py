@@ -0,0 +1,165 @@
+"""
+Concurrent call bootstrap for the voice agent.
+
+Call setup is expressed as a small dependency graph of async steps. Every step
+starts as soon as the steps it needs have finished, so independent work
+(e.g. creating the backend session while the STT/TTS plugins are built) runs
+concurrently instead of back to back.
+
+Steps declare static dependencies with `needs=`; the resolved values are passed
+in as keyword arguments. A step can also await another step conditionally with
+`await graph.get(name)` (e.g. only wait for the participant when the room
+metadata has no agent ID).
+
+The whole graph runs under one deadline. Optional steps still running when it
+passes are cancelled and fall back to their default; required steps (room
+connection, participant) are always awaited. The deadline can be started only
+once given steps have finished (`deadline_after=`), so time spent waiting on
+the caller to join is not taken out of the budget for our own setup work.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger("bootstrap")
+
+
+@dataclass
+class _Step:
+    name: str
+    fn: Callable[..., Awaitable[Any]]
+    needs: tuple[str, ...]
+    default: Any
+    required: bool
+
+
+class BootstrapGraph:
+    """Dependency graph of call setup steps, run concurrently under a deadline."""
+
+    def __init__(self) -> None:
+        self._steps: dict[str, _Step] = {}
+        self._futures: dict[str, asyncio.Future] = {}
+
+    def step(
+        self,
+        name: str | None = None,
+        *,
+        needs: tuple[str, ...] = (),
+        default: Any = None,
+        required: bool = False,
+    ) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+        """Register an async function as a bootstrap step.
+
+        Optional steps that fail or miss the deadline resolve to `default`.
+        Required steps that fail make `run()` raise.
+        """
+
+        def decorator(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+            step_name = name or fn.__name__
+            if step_name in self._steps:
+                raise ValueError(f"Duplicate bootstrap step: {step_name}")
+            self._steps[step_name] = _Step(
+                name=step_name,
+                fn=fn,
+                needs=tuple(needs),
+                default=default,
+                required=required,
+            )
+            return fn
+
+        return decorator
+
+    async def get(self, name: str) -> Any:
+        """Wait for a step's result from inside another step."""
+        # Shield so cancelling the waiting step never cancels the dependency itself
+        return await asyncio.shield(self._futures[name])
+
+    async def run(self, deadline: float, *, deadline_after: tuple[str, ...] = ()) -> dict[str, Any]:
+        """Run every step and return a mapping of step name → result.
+
+        The `deadline` clock starts once every step in `deadline_after` has
+        finished, or right away when none are given.
+        """
+        self._validate()
+        for name in deadline_after:
+            if name not in self._steps:
+                raise ValueError(f"Bootstrap deadline waits on unknown step '{name}'")
+        loop = asyncio.get_running_loop()
+        self._futures = {name: loop.create_future() for name in self._steps}
+        started = time.perf_counter()
+
+        tasks = {
+            name: asyncio.create_task(self._run_step(step), name=f"bootstrap:{name}")
+            for name, step in self._steps.items()
+        }
+
+        if deadline_after:
+            await asyncio.wait([self._futures[name] for name in deadline_after])
+        await asyncio.wait(tasks.values(), timeout=deadline)
+
+        for name, task in tasks.items():
+            step = self._steps[name]
+            if task.done() or step.required:
+                continue
+            logger.warning(
+                f"Bootstrap step '{name}' missed the {deadline:.1f}s deadline — using default"
+            )
+            task.cancel()
+            self._resolve(name, step.default)
+
+        # Required steps are not bound by the deadline
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        logger.info(f"Bootstrap finished in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return {name: future.result() for name, future in self._futures.items()}
+
+    async def _run_step(self, step: _Step) -> None:
+        started = time.perf_counter()
+        try:
+            kwargs = {dep: await self.get(dep) for dep in step.needs}
+            value = await step.fn(**kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if step.required:
+                logger.error(f"Required bootstrap step '{step.name}' failed: {e}")
+                if not self._futures[step.name].done():
+                    self._futures[step.name].set_exception(e)
+                return
+            logger.error(f"Bootstrap step '{step.name}' failed, using default: {e}")
+            value = step.default
+
+        logger.debug(f"Bootstrap step '{step.name}' done in {(time.perf_counter() - started) * 1000:.0f}ms")
+        self._resolve(step.name, value)
+
+    def _resolve(self, name: str, value: Any) -> None:
+        future = self._futures[name]
+        if not future.done():
+            future.set_result(value)
+
+    def _validate(self) -> None:
+        """Reject unknown dependencies and cycles before anything starts."""
+        for step in self._steps.values():
+            for dep in step.needs:
+                if dep not in self._steps:
+                    raise ValueError(f"Bootstrap step '{step.name}' needs unknown step '{dep}'")
+
+        visiting: set[str] = set()
+        visited: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Bootstrap dependency cycle at step '{name}'")
+            visiting.add(name)
+            for dep in self._steps[name].needs:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self._steps:
+            visit(name)
@@ -0,0 +1,275 @@
+"""
+Worker-side cache of agent configurations.
+
+Agent configs rarely change, so the worker keeps them in memory keyed by agent
+ID and by dialed phone number. The phone routing table is also kept in a
+snapshot file (AGENT_CONFIG_SNAPSHOT) shared by every worker process on the
+host, so a new process starts from the last sync instead of downloading
+everything again:
+
+- `preload()` runs in the process prewarm hook and loads the snapshot file.
+  Only when there is none does it fetch the full routing table, capped at
+  AGENT_CONFIG_PRELOAD_TIMEOUT; on failure the process starts empty.
+- `ensure_fresh()` brings a routing table older than the sync interval up to
+  date: from the snapshot file if another process synced recently, else with
+  a delta sync (only agents changed since the last version), after which the
+  snapshot file is rewritten.
+- `lookup_phone()` answers from a routing table no older than the sync
+  interval: a stale table is synced first, waiting at most
+  AGENT_CONFIG_STALE_SYNC_TIMEOUT. If that sync fails or runs out of time, the
+  call is routed from the table at hand and the sync finishes in the
+  background.
+- `get()` serves configs fetched by ID and revalidates stale entries with
+  If-None-Match, so unchanged configs cost a bodyless 304.
+
+Unknown numbers fall through to the backend session bootstrap, which resolves
+the dialed number itself.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from backend_client import get_backend_client
+
+logger = logging.getLogger("config-cache")
+
+# Max age of the routing snapshot before a call triggers a delta sync
+AGENT_CONFIG_SYNC_INTERVAL = float(os.environ.get("AGENT_CONFIG_SYNC_INTERVAL", "30"))
+# Max age of a config fetched by ID before it is revalidated with its ETag
+AGENT_CONFIG_TTL = float(os.environ.get("AGENT_CONFIG_TTL", "30"))
+# Cap on the prewarm fetch, well below the worker's process init timeout
+AGENT_CONFIG_PRELOAD_TIMEOUT = float(os.environ.get("AGENT_CONFIG_PRELOAD_TIMEOUT", "2"))
+AGENT_CONFIG_SNAPSHOT = os.environ.get("AGENT_CONFIG_SNAPSHOT")
+# Longest a call waits on the sync of a stale routing table before using it as is
+AGENT_CONFIG_STALE_SYNC_TIMEOUT = float(os.environ.get("AGENT_CONFIG_STALE_SYNC_TIMEOUT", "1"))
+
+
+def normalize_phone(number: str) -> str:
+    """Normalize a phone number to E.164 (mirrors the backend's telephony.normalize_phone)."""
+    if not number:
+        return ""
+    digits = "".join(c for c in number if c.isdigit())
+    if not digits:
+        return ""
+    if len(digits) == 10:
+        digits = "1" + digits
+    return f"+{digits}"
+
+
+@dataclass
+class _Entry:
+    config: dict
+    etag: str | None
+    fetched_at: float
+    routed: bool  # Kept current by routing delta sync rather than per-entry revalidation
+
+
+class AgentConfigCache:
+    """In-memory agent config cache shared by every session in the worker process."""
+
+    def __init__(self, backend_url: str) -> None:
+        self._backend_url = backend_url
+        self._snapshot_path = AGENT_CONFIG_SNAPSHOT or os.path.join(
+            tempfile.gettempdir(),
+            f"voxarena-agent-configs-{hashlib.sha256(backend_url.encode()).hexdigest()[:12]}.json",
+        )
+        self._by_id: dict[str, _Entry] = {}
+        self._by_phone: dict[str, str] = {}
+        self._phone_of: dict[str, str] = {}
+        self._version: str | None = None
+        self._synced_at: float | None = None
+        self._sync_lock: asyncio.Lock | None = None
+        self._sync_task: asyncio.Task | None = None
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._by_id
+
+    def preload(self) -> None:
+        """Load the routing table for the process prewarm hook.
+
+        Reads the host's snapshot file; a stale snapshot is still loaded and
+        brought up to date by the first job. Only without a snapshot is the
+        full table fetched, and a slow or failed fetch leaves the cache empty.
+        """
+        snapshot = _read_snapshot(self._snapshot_path)
+        if snapshot is not None:
+            self._apply_snapshot(snapshot)
+            logger.info(f"Loaded {len(self._by_phone)} phone-routed agent config(s) from snapshot")
+            return
+        try:
+            with httpx.Client(timeout=AGENT_CONFIG_PRELOAD_TIMEOUT) as client:
+                response = client.get(f"{self._backend_url}/telephony/routing")
+                response.raise_for_status()
+                self._apply_sync(response.json())
+            _write_snapshot(self._snapshot_path, self._snapshot())
+            logger.info(f"Preloaded {len(self._by_phone)} phone-routed agent config(s)")
+        except Exception as e:
+            logger.warning(f"Agent config preload failed, starting empty: {e}")
+
+    async def ensure_fresh(self) -> None:
+        """Bring the routing table up to date if it is older than the sync interval."""
+        if self._is_synced_recently():
+            return
+        if self._sync_lock is None:
+            self._sync_lock = asyncio.Lock()
+        async with self._sync_lock:
+            if self._is_synced_recently():
+                return
+            # Another process on the host may have synced already
+            snapshot = await asyncio.to_thread(_read_snapshot, self._snapshot_path)
+            if snapshot is not None and time.time() - snapshot["synced_at"] < AGENT_CONFIG_SYNC_INTERVAL:
+                self._apply_snapshot(snapshot)
+                return
+            params = {"since": self._version} if self._version else None
+            try:
+                response = await get_backend_client().get(
+                    f"{self._backend_url}/telephony/routing", params=params
+                )
+                response.raise_for_status()
+                self._apply_sync(response.json())
+            except Exception as e:
+                # Keep serving the last snapshot; a stale config beats no config
+                logger.warning(f"Agent config delta sync failed: {e}")
+                return
+            await asyncio.to_thread(_write_snapshot, self._snapshot_path, self._snapshot())
+
+    async def _sync_if_stale(self) -> None:
+        """Sync a stale routing table, waiting at most AGENT_CONFIG_STALE_SYNC_TIMEOUT.
+
+        On timeout the sync keeps running in the background and the caller
+        proceeds with the table as it is.
+        """
+        if self._is_synced_recently():
+            return
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self.ensure_fresh(), name="agent-config-sync")
+        try:
+            await asyncio.wait_for(asyncio.shield(self._sync_task), AGENT_CONFIG_STALE_SYNC_TIMEOUT)
+        except TimeoutError:
+            logger.warning("Agent config sync is slow, using the cached routing table")
+
+    async def lookup_phone(self, phone_number: str) -> dict | None:
+        """Return the config of the agent routed to a phone number, or None if unknown.
+
+        A routing table older than the sync interval is synced first; it is
+        used as is only if that sync fails or times out.
+        """
+        await self._sync_if_stale()
+        agent_id = self._by_phone.get(normalize_phone(phone_number))
+        if not agent_id:
+            return None
+        entry = self._by_id.get(agent_id)
+        return entry.config if entry else None
+
+    async def get(self, agent_id: str) -> dict | None:
+        """Return an agent's config, fetching or revalidating it when needed."""
+        entry = self._by_id.get(agent_id)
+        if entry and entry.routed:
+            await self._sync_if_stale()
+            entry = self._by_id.get(agent_id)
+        if entry and (entry.routed or time.monotonic() - entry.fetched_at < AGENT_CONFIG_TTL):
+            return entry.config
+
+        headers = {"If-None-Match": entry.etag} if entry and entry.etag else None
+        try:
+            response = await get_backend_client().get(
+                f"{self._backend_url}/agents/{agent_id}", headers=headers
+            )
+        except Exception as e:
+            logger.error(f"Error fetching agent config: {e}")
+            return entry.config if entry else None
+
+        if response.status_code == 304 and entry:
+            entry.fetched_at = time.monotonic()
+            return entry.config
+        if response.status_code == 200:
+            config = response.json()
+            self._by_id[agent_id] = _Entry(
+                config=config,
+                etag=response.headers.get("etag"),
+                fetched_at=time.monotonic(),
+                routed=False,
+            )
+            return config
+
+        logger.warning(f"Failed to fetch agent config: {response.status_code}")
+        if response.status_code == 404:
+            self._by_id.pop(agent_id, None)
+            return None
+        return entry.config if entry else None
+
+    def _is_synced_recently(self) -> bool:
+        return (
+            self._synced_at is not None
+            and time.monotonic() - self._synced_at < AGENT_CONFIG_SYNC_INTERVAL
+        )
+
+    def _snapshot(self) -> dict:
+        return {
+            "version": self._version,
+            "synced_at": time.time(),
+            "agents": [entry.config for entry in self._by_id.values() if entry.routed],
+        }
+
+    def _apply_snapshot(self, snapshot: dict) -> None:
+        """Replace the routing table with a snapshot written by any process on the host."""
+        for agent_id in [agent_id for agent_id, entry in self._by_id.items() if entry.routed]:
+            self._unroute(agent_id)
+            del self._by_id[agent_id]
+        self._version = None
+        self._apply_sync(snapshot)
+        # Carry over the snapshot's age so a stale one is synced on first use
+        self._synced_at = time.monotonic() - max(time.time() - snapshot["synced_at"], 0)
+
+    def _apply_sync(self, data: dict) -> None:
+        now = time.monotonic()
+        for agent_id in data.get("removed", []):
+            self._unroute(agent_id)
+            self._by_id.pop(agent_id, None)
+        for config in data.get("agents", []):
+            agent_id = config["id"]
+            self._unroute(agent_id)
+            self._by_id[agent_id] = _Entry(config=config, etag=None, fetched_at=now, routed=True)
+            phone = normalize_phone(config.get("phone_number") or "")
+            if phone:
+                self._by_phone[phone] = agent_id
+                self._phone_of[agent_id] = phone
+        self._version = data.get("version") or self._version
+        self._synced_at = now
+
+    def _unroute(self, agent_id: str) -> None:
+        phone = self._phone_of.pop(agent_id, None)
+        if phone and self._by_phone.get(phone) == agent_id:
+            del self._by_phone[phone]
+
+
+def _read_snapshot(path: str) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable agent config snapshot {path}: {e}")
+        return None
+    if not isinstance(snapshot, dict) or "synced_at" not in snapshot:
+        return None
+    return snapshot
+
+
+def _write_snapshot(path: str, snapshot: dict) -> None:
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Failed to write agent config snapshot {path}: {e}")
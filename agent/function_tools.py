@@ -0,0 +1,287 @@
+"""
+Compiled HTTP executors for config-defined function tools.
+
+Each entry in an agent's `functions` config is compiled once into a
+`ToolExecutor` holding a prebuilt request template: method, URL, header dict,
+timeout and how arguments are sent (JSON body or query string). Invoking a
+tool only encodes its arguments and sends the request.
+
+Compiled executors are cached by the content of the functions config, and
+requests go through one shared client per event loop. The worker runs each job
+in its own single-use process, so both live for one call only: the payoff is
+within a call, where repeated tool calls to a customer endpoint reuse a warm
+keep-alive connection instead of paying DNS, TCP and TLS setup each time while
+the caller waits. Only the result cache below outlives the job.
+
+Read-only lookups can opt into a result cache with a `cache` block in their
+function config:
+
+    "cache": {"ttl_seconds": 300, "key_args": ["branch_id"]}
+
+Successful results are cached under the listed arguments, or all arguments
+when `key_args` is omitted. The worker runs each job in its own process, so
+results are kept in a shared on-disk cache (TOOL_CACHE_DIR) that every session
+on the host reads, with a small in-memory copy in front of it. Concurrent
+identical calls are coalesced onto one upstream request: within a process they
+await the same task, and across processes they wait on a per-key file lock
+and read the result the holder wrote. Error results are never cached.
+
+Every executor records its call latencies in a fixed-bucket histogram; the
+per-tool summaries are logged when a job ends.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import weakref
+from collections import OrderedDict
+
+import httpx
+
+from latency_histogram import LatencyHistogram
+from shared_cache import SharedCache
+
+logger = logging.getLogger("function-tools")
+
+TOOL_HTTP_MAX_CONNECTIONS = int(os.environ.get("TOOL_HTTP_MAX_CONNECTIONS", "100"))
+TOOL_HTTP_MAX_KEEPALIVE = int(os.environ.get("TOOL_HTTP_MAX_KEEPALIVE", "20"))
+TOOL_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("TOOL_HTTP_KEEPALIVE_EXPIRY", "60"))
+TOOL_CACHE_DIR = os.environ.get(
+    "TOOL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "voxarena-tool-results")
+)
+
+# Distinct function configs (agent versions) kept compiled per process
+_MAX_COMPILED = 256
+# Cached results kept in memory per cacheable tool
+_MAX_CACHED_RESULTS = 1024
+# Cached results kept on disk across all tools on the host
+_MAX_SHARED_RESULTS = 8192
+
+_BODY_METHODS = ("POST", "PUT", "PATCH")
+
+
+class ToolExecutor:
+    """One config-defined function tool, compiled into a request template."""
+
+    def __init__(self, func_config: dict) -> None:
+        self.name: str = func_config["name"]
+        self.schema = {
+            "type": "function",
+            "name": self.name,
+            "description": func_config.get("description", ""),
+            "parameters": func_config.get("parameters", {"type": "object", "properties": {}}),
+        }
+        self.speak_during_execution: bool = func_config.get("speak_during_execution", False)
+        self.speak_on_send: str = func_config.get("speak_on_send", "")
+
+        endpoint = func_config.get("endpoint", {})
+        self._url: str = endpoint.get("url", "")
+        self._method: str = endpoint.get("method", "POST").upper()
+        self._timeout_seconds = endpoint.get("timeout", 10)
+        self._timeout = httpx.Timeout(self._timeout_seconds)
+        self._send_body = self._method in _BODY_METHODS
+
+        self._headers = {h["key"]: h.get("value", "") for h in endpoint.get("headers", []) if h.get("key")}
+        if self._send_body and not any(k.lower() == "content-type" for k in self._headers):
+            self._headers["Content-Type"] = "application/json"
+
+        cache = func_config.get("cache") or {}
+        self._cache_ttl = float(cache.get("ttl_seconds") or 0)
+        key_args = cache.get("key_args")
+        self._cache_key_args: tuple[str, ...] | None = tuple(key_args) if key_args else None
+        self._results: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._shared = SharedCache(TOOL_CACHE_DIR, _MAX_SHARED_RESULTS) if self._cache_ttl else None
+        # Headers are part of the shared key so tenants with different credentials never share results
+        self._shared_scope = json.dumps([self.name, self._method, self._url, sorted(self._headers.items())])
+
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+
+    def _build_request(self, client: httpx.AsyncClient, arguments: dict, encoded: str | None) -> httpx.Request:
+        if self._send_body:
+            content = encoded if encoded is not None else json.dumps(arguments)
+            return client.build_request(
+                self._method, self._url, content=content.encode(), headers=self._headers, timeout=self._timeout
+            )
+        # GET, DELETE — send args as query params
+        return client.build_request(
+            self._method,
+            self._url,
+            params={k: str(v) for k, v in arguments.items()},
+            headers=self._headers,
+            timeout=self._timeout,
+        )
+
+    async def execute(self, arguments: dict, encoded: str | None = None) -> str:
+        """Call the endpoint and return the text handed back to the LLM.
+
+        `encoded` is the JSON form of `arguments` when the caller already has
+        it, so the body is not serialized twice. Failures are returned as
+        error text rather than raised, so the LLM can tell the caller.
+        """
+        if not self._cache_ttl:
+            text, _ = await self._call(arguments, encoded)
+            return text
+
+        key = self._cache_key(arguments)
+        cached = self._results.get(key)
+        if cached is not None:
+            expires_at, text = cached
+            if time.time() < expires_at:
+                self._results.move_to_end(key)
+                self.cache_hits += 1
+                return text
+            del self._results[key]
+
+        task = self._in_flight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._fetch(key, arguments, encoded), name=f"tool:{self.name}")
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, key=key: self._store_result(key, t))
+        # Shielded so an interrupted turn does not cancel the request for other callers
+        text, _, _ = await asyncio.shield(task)
+        return text
+
+    async def _fetch(self, key: str, arguments: dict, encoded: str | None) -> tuple[str, bool, float]:
+        """Serve from the shared cache, or call the endpoint while holding the key's lock.
+
+        Returns (text, ok, expires_at). Sessions in other processes asking for
+        the same key meanwhile wait on the lock and then read this result.
+        """
+        shared_key = f"{self._shared_scope}:{key}"
+        entry = await self._shared.get(shared_key)
+        if entry is not None:
+            self.cache_hits += 1
+            return entry[0], True, entry[1]
+        async with self._shared.lock(shared_key, timeout=self._timeout_seconds):
+            entry = await self._shared.get(shared_key)
+            if entry is not None:
+                self.coalesced += 1
+                return entry[0], True, entry[1]
+            text, ok = await self._call(arguments, encoded)
+            if not ok:
+                return text, False, 0.0
+            expires_at = await self._shared.put(shared_key, text, self._cache_ttl)
+            return text, True, expires_at
+
+    def _cache_key(self, arguments: dict) -> str:
+        if self._cache_key_args is not None:
+            arguments = {k: arguments.get(k) for k in self._cache_key_args}
+        return json.dumps(arguments, sort_keys=True, default=str)
+
+    def _store_result(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        text, ok, expires_at = task.result()
+        if not ok:
+            return
+        self._results[key] = (expires_at, text)
+        self._results.move_to_end(key)
+        if len(self._results) > _MAX_CACHED_RESULTS:
+            self._results.popitem(last=False)
+
+    async def _call(self, arguments: dict, encoded: str | None) -> tuple[str, bool]:
+        start = time.perf_counter()
+        try:
+            client = get_tool_client()
+            response = await client.send(self._build_request(client, arguments, encoded))
+            response.raise_for_status()
+            # JSON bodies are passed through as-is; no need to parse and re-dump them
+            return response.text, True
+        except httpx.TimeoutException:
+            self.errors += 1
+            logger.error(f"Function {self.name} timed out: {self._url}")
+            return f"Error: Request to {self.name} timed out after {self._timeout_seconds}s", False
+        except httpx.HTTPStatusError as e:
+            self.errors += 1
+            logger.error(f"Function {self.name} HTTP error: {e}")
+            return f"Error: {self.name} returned HTTP {e.response.status_code}", False
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Function {self.name} error: {e}")
+            return f"Error: {self.name} failed — {str(e)}", False
+        finally:
+            self.latency.record((time.perf_counter() - start) * 1000)
+
+    def stats(self) -> dict:
+        stats = {**self.latency.summary(), "errors": self.errors}
+        if self._cache_ttl:
+            stats.update(cache_hits=self.cache_hits, coalesced=self.coalesced)
+        return stats
+
+
+_compiled: "OrderedDict[str, list[ToolExecutor]]" = OrderedDict()
+
+
+def compile_function_tools(functions_config: list[dict]) -> list[ToolExecutor]:
+    """Return executors for an agent's functions config, compiling it on first use."""
+    key = hashlib.sha256(
+        json.dumps(functions_config, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    executors = _compiled.get(key)
+    if executors is not None:
+        _compiled.move_to_end(key)
+        return executors
+
+    executors = []
+    for func_config in functions_config:
+        if not func_config.get("name"):
+            logger.warning("Skipping function with no name")
+            continue
+        executors.append(ToolExecutor(func_config))
+    _compiled[key] = executors
+    if len(_compiled) > _MAX_COMPILED:
+        _compiled.popitem(last=False)
+    return executors
+
+
+def tool_latency_stats() -> dict[str, dict]:
+    """Latency and error summaries of every tool called in this process."""
+    return {
+        executor.name: executor.stats()
+        for executors in _compiled.values()
+        for executor in executors
+        if executor.latency.count or executor.cache_hits
+    }
+
+
+# httpx clients are bound to the loop they were created on; keep one per loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_tool_client() -> httpx.AsyncClient:
+    """Return the shared client for function tool calls on the running loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=TOOL_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=TOOL_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=TOOL_HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _clients[loop] = client
+        logger.debug("Created shared function tool HTTP client")
+    return client
+
+
+async def aclose_tool_client() -> None:
+    """Close the shared tool client for the running loop. Safe to call more than once."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        logger.debug("Closed shared function tool HTTP client")
@@ -0,0 +1,153 @@
+"""
+Pre-synthesized greeting audio.
+
+The first message of an agent is fixed text, so instead of asking the LLM to
+say it (a full round trip plus tokens) the worker synthesizes it once and
+plays the audio directly. Audio is cached on disk, shared by every worker
+process on the host, keyed by (agent, agent config version, voice, sample
+rate, text). Saving the agent bumps its config version, and storing a new
+greeting removes the agent's older files.
+"""
+
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from livekit import rtc
+from livekit.agents import tts as lk_tts
+from livekit.agents.metrics import TTSMetrics
+
+logger = logging.getLogger("greeting-cache")
+
+GREETING_CACHE_DIR = os.environ.get(
+    "GREETING_CACHE_DIR", os.path.join(tempfile.gettempdir(), "voxarena-greetings")
+)
+
+# Playout frame size for cached greetings
+_FRAME_MS = 20
+
+
+@dataclass
+class GreetingAudio:
+    """Raw 16-bit PCM for a greeting."""
+
+    pcm: bytes
+    sample_rate: int
+    num_channels: int
+    cached: bool  # False when synthesized for this call
+    billable_characters: int  # Characters the TTS provider charged for; 0 on a cache hit
+
+    async def frames(self) -> AsyncIterator[rtc.AudioFrame]:
+        """Yield the greeting as fixed-size frames for AgentSession.say(audio=...)."""
+        samples_per_frame = self.sample_rate * _FRAME_MS // 1000
+        bytes_per_frame = samples_per_frame * self.num_channels * 2
+        view = memoryview(self.pcm)
+        for offset in range(0, len(view), bytes_per_frame):
+            chunk = view[offset : offset + bytes_per_frame]
+            yield rtc.AudioFrame(
+                data=chunk,
+                sample_rate=self.sample_rate,
+                num_channels=self.num_channels,
+                samples_per_channel=len(chunk) // (2 * self.num_channels),
+            )
+
+
+def _cache_path(agent_id: str, version: str, voice_id: str, sample_rate: int, text: str) -> str:
+    digest = hashlib.sha256(f"{version}|{voice_id}|{sample_rate}|{text}".encode()).hexdigest()
+    return os.path.join(GREETING_CACHE_DIR, f"{agent_id}-{digest[:32]}.pcm")
+
+
+def _read(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write(path: str, agent_id: str, pcm: bytes) -> None:
+    os.makedirs(GREETING_CACHE_DIR, exist_ok=True)
+    # Write then rename so concurrent processes never read a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=GREETING_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(pcm)
+    os.replace(tmp_path, path)
+
+    # Invalidate greetings from older config versions of this agent
+    for stale in glob.glob(os.path.join(GREETING_CACHE_DIR, f"{agent_id}-*.pcm")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+async def get_greeting_audio(
+    tts: lk_tts.TTS,
+    text: str,
+    *,
+    agent_id: str,
+    version: str,
+    voice_id: str,
+    cache: bool = True,
+) -> GreetingAudio:
+    """Return greeting audio from the disk cache, synthesizing it on a miss.
+
+    Pass cache=False for caller-specific text (e.g. after webhook variable
+    substitution); it is synthesized right away but not stored.
+    """
+    sample_rate = tts.sample_rate
+    num_channels = tts.num_channels
+    path = _cache_path(agent_id, version, voice_id, sample_rate, text)
+
+    if cache:
+        pcm = await asyncio.to_thread(_read, path)
+        if pcm:
+            logger.info(f"Greeting cache hit for agent {agent_id}")
+            return GreetingAudio(
+                pcm=pcm,
+                sample_rate=sample_rate,
+                num_channels=num_channels,
+                cached=True,
+                billable_characters=0,
+            )
+
+    # The synthesis may itself be served from the TTS audio cache, so bill
+    # what the TTS reports it actually sent rather than the whole text
+    reported: list[TTSMetrics] = []
+
+    def on_metrics(metrics: TTSMetrics) -> None:
+        reported.append(metrics)
+
+    tts.on("metrics_collected", on_metrics)
+    try:
+        async with tts.synthesize(text) as stream:
+            frame = await stream.collect()
+    finally:
+        tts.off("metrics_collected", on_metrics)
+    billable = sum(_billable_characters(tts, metrics) for metrics in reported) if reported else len(text)
+    pcm = bytes(frame.data.cast("B"))
+
+    if cache:
+        try:
+            await asyncio.to_thread(_write, path, agent_id, pcm)
+        except OSError as e:
+            logger.warning(f"Could not store greeting audio: {e}")
+
+    return GreetingAudio(
+        pcm=pcm,
+        sample_rate=frame.sample_rate,
+        num_channels=frame.num_channels,
+        cached=False,
+        billable_characters=billable,
+    )
+
+
+def _billable_characters(tts: lk_tts.TTS, metrics: TTSMetrics) -> int:
+    billable = getattr(tts, "billable_characters", None)
+    return billable(metrics) if billable is not None else metrics.characters_count
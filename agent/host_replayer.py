@@ -0,0 +1,105 @@
+"""
+Host-level replay of queued post-call webhooks and spooled telemetry.
+
+Job processes are single-use, so the delivery tasks a job starts die with it:
+a webhook or telemetry record waiting on a retry, or still queued when the
+job's drain budget ran out, would otherwise sit on disk until another job
+starts on the same host. Instead, the worker's main process (which outlives
+every job) runs a HostReplayer: a daemon thread with its own event loop that
+runs the post-call queue consumers and a telemetry spool drainer for the whole
+host. The drainer adopts the spool of each job process once it has exited.
+
+Only one worker process per host replays at a time, chosen by an flock on
+HOST_REPLAYER_LOCK; the others retry the lock every
+HOST_REPLAYER_POLL_INTERVAL and take over when the holder exits. Jobs still
+deliver their own requests while they run; the queue's per-file locks and
+the spool's per-process locks keep anything from being sent twice.
+"""
+
+import asyncio
+import fcntl
+import logging
+import os
+import tempfile
+import threading
+
+from backend_client import aclose_backend_client
+from function_tools import aclose_tool_client
+from post_call import POST_CALL_QUEUE_DIR, PostCallQueue
+from telemetry_spool import TELEMETRY_SPOOL_DIR, TelemetrySpool
+
+logger = logging.getLogger("host-replayer")
+
+HOST_REPLAYER_LOCK = os.environ.get(
+    "HOST_REPLAYER_LOCK", os.path.join(tempfile.gettempdir(), "voxarena-host-replayer.lock")
+)
+# How often a standby worker process retries the host lock
+HOST_REPLAYER_POLL_INTERVAL = float(os.environ.get("HOST_REPLAYER_POLL_INTERVAL", "30"))
+
+
+class HostReplayer:
+    """Background thread delivering queued requests while this process holds the host lock."""
+
+    def __init__(
+        self,
+        backend_url: str,
+        lock_path: str = HOST_REPLAYER_LOCK,
+        post_call_dir: str = POST_CALL_QUEUE_DIR,
+        spool_dir: str = TELEMETRY_SPOOL_DIR,
+    ) -> None:
+        self._backend_url = backend_url
+        self._lock_path = lock_path
+        self._post_call_dir = post_call_dir
+        self._spool_dir = spool_dir
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start the replayer thread; it waits for the host lock before delivering anything."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=asyncio.run, args=(self._run(),), name="host-replayer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop delivering and release the host lock. Queued requests stay on disk."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    async def _run(self) -> None:
+        lock_fd = await asyncio.to_thread(_try_lock, self._lock_path)
+        while lock_fd is None:
+            if await asyncio.to_thread(self._stop.wait, HOST_REPLAYER_POLL_INTERVAL):
+                return
+            lock_fd = await asyncio.to_thread(_try_lock, self._lock_path)
+
+        logger.info(f"Replaying queued deliveries for this host (lock {self._lock_path})")
+        # Never appended to: it only drains spools adopted from exited processes
+        spool = TelemetrySpool(self._backend_url, self._spool_dir)
+        try:
+            PostCallQueue(self._post_call_dir).start()
+            spool.start()
+            await asyncio.to_thread(self._stop.wait)
+        finally:
+            await spool.aclose()
+            await asyncio.gather(aclose_tool_client(), aclose_backend_client())
+            # Closing the descriptor releases the lock for a standby process
+            os.close(lock_fd)
+
+
+def _try_lock(path: str) -> int | None:
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+    except OSError as e:
+        logger.warning(f"Host replayer lock unavailable at {path}: {e}")
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None  # Another worker process on the host is replaying
+    return fd
@@ -0,0 +1,53 @@
+"""
+Fixed-bucket latency histogram shared by the tool and per-turn latency stats.
+
+Recording is a bisect and a counter bump, so it is cheap enough for every
+call; percentiles are read back as bucket upper bounds.
+"""
+
+import bisect
+
+# Bucket upper bounds in milliseconds; the last bucket is open-ended
+_LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with approximate percentiles."""
+
+    def __init__(self, bounds: tuple[int, ...] = _LATENCY_BUCKETS_MS) -> None:
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, latency_ms: float) -> None:
+        self.counts[bisect.bisect_left(self._bounds, latency_ms)] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile, capped at the observed max."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if index < len(self._bounds):
+                    return round(min(float(self._bounds[index]), self.max_ms), 1)
+                break
+        return round(self.max_ms, 1)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip([*map(str, self._bounds), "inf"], self.counts)),
+        }
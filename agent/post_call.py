@@ -0,0 +1,251 @@
+"""
+Durable delivery queue for post-call webhooks.
+
+When a call ends the job only records the webhook request and returns; it does
+not wait on the customer's endpoint. Each request is written to its own JSON
+file under POST_CALL_QUEUE_DIR, shared by every worker process on the host,
+and delivered in the background by POST_CALL_CONCURRENCY consumers.
+
+Failures (network errors, 5xx, 408/425/429) are retried with capped
+exponential backoff and jitter up to POST_CALL_MAX_ATTEMPTS; permanent
+rejections (other 4xx) and exhausted requests are moved aside as `*.failed`.
+A consumer holds an flock on the file while delivering it, so two processes
+never send the same request at once, and files left behind by a process that
+died are picked up by the next periodic rescan. Every request carries an
+Idempotency-Key header so a receiver can drop a replay.
+
+A job delivers its own request while it runs and waits POST_CALL_DRAIN_TIMEOUT
+at most when it ends. Retries and requests left by an exiting job are sent by
+the host replayer in the worker's main process (see host_replayer.py).
+
+Kept apart from the telemetry spool so a slow customer endpoint never holds
+up transcripts and usage events bound for the backend.
+"""
+
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+import uuid
+import weakref
+
+from function_tools import get_tool_client
+
+logger = logging.getLogger("post-call")
+
+POST_CALL_QUEUE_DIR = os.environ.get(
+    "POST_CALL_QUEUE_DIR", os.path.join(tempfile.gettempdir(), "voxarena-post-call")
+)
+POST_CALL_CONCURRENCY = int(os.environ.get("POST_CALL_CONCURRENCY", "4"))
+POST_CALL_MAX_ATTEMPTS = int(os.environ.get("POST_CALL_MAX_ATTEMPTS", "8"))
+POST_CALL_MAX_BACKOFF = float(os.environ.get("POST_CALL_MAX_BACKOFF", "300"))
+# How long a finished job waits for queued webhooks before leaving them to the host replayer
+POST_CALL_DRAIN_TIMEOUT = float(os.environ.get("POST_CALL_DRAIN_TIMEOUT", "2"))
+_BASE_BACKOFF = 1.0
+_RESCAN_INTERVAL = 30.0
+
+# Statuses worth retrying; any other 4xx will never succeed
+_RETRYABLE_STATUS = {408, 425, 429}
+
+
+class _RetryLater(Exception):
+    pass
+
+
+class PostCallQueue:
+    """File-backed webhook queue with bounded-concurrency background delivery."""
+
+    def __init__(self, directory: str = POST_CALL_QUEUE_DIR, concurrency: int = POST_CALL_CONCURRENCY) -> None:
+        self._dir = directory
+        self._concurrency = concurrency
+        self._pending: asyncio.Queue[str] = asyncio.Queue()
+        self._queued: set[str] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the consumers (also picks up requests left by earlier jobs)."""
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._tasks = [
+            asyncio.create_task(self._consume(), name=f"post-call:{i}") for i in range(self._concurrency)
+        ]
+        self._tasks.append(asyncio.create_task(self._rescan(), name="post-call:rescan"))
+
+    def enqueue(self, url: str, method: str, headers: list, body: dict | None, timeout: float) -> None:
+        """Persist a webhook request for background delivery. Never waits on the network."""
+        request = {
+            "id": uuid.uuid4().hex,
+            "url": url,
+            "method": method,
+            "headers": {h["key"]: h["value"] for h in headers if h.get("key")},
+            "body": body,
+            "timeout": timeout,
+            "attempts": 0,
+            "not_before": 0,
+        }
+        try:
+            path = _write_request(self._dir, request)
+        except OSError as e:
+            logger.error(f"Could not queue post-call webhook to {url}: {e}")
+            return
+        self._schedule(path)
+        self.start()
+
+    async def drain(self, timeout: float = POST_CALL_DRAIN_TIMEOUT) -> None:
+        """Wait until requests ready to send have been attempted, up to `timeout`."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._pending.join(), timeout)
+        except TimeoutError:
+            logger.info("Post-call webhooks still pending; the host replayer will deliver them")
+
+    def _schedule(self, path: str, delay: float = 0) -> None:
+        if path in self._queued:
+            return
+        self._queued.add(path)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._pending.put_nowait, path)
+        else:
+            self._pending.put_nowait(path)
+
+    async def _rescan(self) -> None:
+        while True:
+            for path in sorted(glob.glob(os.path.join(self._dir, "*.json"))):
+                self._schedule(path)
+            await asyncio.sleep(_RESCAN_INTERVAL)
+
+    async def _consume(self) -> None:
+        while True:
+            path = await self._pending.get()
+            self._queued.discard(path)
+            try:
+                await self._process(path)
+            except Exception as e:
+                logger.error(f"Post-call delivery of {path} failed unexpectedly: {e}")
+            finally:
+                self._pending.task_done()
+
+    async def _process(self, path: str) -> None:
+        claimed = await asyncio.to_thread(_claim, path)
+        if claimed is None:
+            return
+        f, request = claimed
+        with f:
+            if request is None:
+                logger.warning(f"Discarding unreadable post-call request {path}")
+                _set_aside(path)
+                return
+
+            wait = request.get("not_before", 0) - time.time()
+            if wait > 0:
+                self._schedule(path, wait)
+                return
+
+            try:
+                await self._send(request)
+            except _RetryLater as e:
+                request["attempts"] += 1
+                if request["attempts"] >= POST_CALL_MAX_ATTEMPTS:
+                    logger.error(f"Giving up on post-call webhook after {request['attempts']} attempts: {e}")
+                    _set_aside(path)
+                    return
+                delay = min(POST_CALL_MAX_BACKOFF, _BASE_BACKOFF * 2 ** (request["attempts"] - 1))
+                delay *= random.uniform(0.5, 1.0)
+                request["not_before"] = time.time() + delay
+                await asyncio.to_thread(_rewrite, f, request)
+                logger.warning(f"Post-call webhook failed ({e}), retrying in {delay:.1f}s")
+                self._schedule(path, delay)
+                return
+            except Exception:
+                _set_aside(path)
+                return
+            os.remove(path)
+
+    async def _send(self, request: dict) -> None:
+        url = request["url"]
+        try:
+            response = await get_tool_client().request(
+                method=request["method"],
+                url=url,
+                headers={**request["headers"], "Idempotency-Key": request["id"]},
+                json=request["body"],
+                timeout=request["timeout"],
+            )
+        except Exception as e:
+            raise _RetryLater(f"{url}: {e}") from e
+
+        status = response.status_code
+        if status >= 500 or status in _RETRYABLE_STATUS:
+            raise _RetryLater(f"{url}: HTTP {status}")
+        if status >= 400:
+            logger.error(f"Post-call webhook rejected, dropping: {url} {status} {response.text}")
+            raise ValueError(f"HTTP {status}")
+        logger.info("Post-call webhook executed successfully.")
+
+
+def _write_request(directory: str, request: dict) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.time_ns():020d}-{request['id']}.json")
+    # Write then rename so a consumer never reads a partial request
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(request, f, default=str)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _claim(path: str):
+    """Open and lock a queued request: (file, request), with request None if unreadable.
+
+    None when another process has it or already delivered it. The caller
+    closes the file, which releases the lock.
+    """
+    try:
+        f = open(path, "r+", encoding="utf-8")  # noqa: SIM115 - held (and locked) until delivery ends
+    except FileNotFoundError:
+        return None  # Delivered by another process
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None  # Being delivered by another process
+    if os.fstat(f.fileno()).st_nlink == 0:
+        f.close()
+        return None  # Delivered while we were waiting for the lock
+    try:
+        return f, json.load(f)
+    except json.JSONDecodeError:
+        return f, None
+
+
+def _rewrite(f, request: dict) -> None:
+    f.seek(0)
+    f.truncate()
+    json.dump(request, f, default=str)
+    f.flush()
+
+
+def _set_aside(path: str) -> None:
+    try:
+        os.replace(path, path[: -len(".json")] + ".failed")
+    except OSError:
+        pass
+
+
+# One queue per event loop (thread-based job executors run a loop per job)
+_queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PostCallQueue]" = weakref.WeakKeyDictionary()
+
+
+def get_post_call_queue() -> PostCallQueue:
+    """Return the post-call queue for the running event loop, creating it lazily."""
+    loop = asyncio.get_running_loop()
+    queue = _queues.get(loop)
+    if queue is None:
+        queue = _queues[loop] = PostCallQueue()
+    return queue
@@ -0,0 +1,100 @@
+"""
+Compiled `{{variable}}` templates for prompts and webhook bodies.
+
+Agent prompts are several KB long and carry dozens of placeholders. Replacing
+them one `str.replace` at a time rescans the whole prompt per variable, so a
+template is parsed once into literal chunks and placeholder names, cached by
+its source text (i.e. per agent config version), and rendered in one pass.
+
+Placeholders without a value are left as written, matching the previous
+replace-based behaviour. `render_json` escapes values for use inside JSON
+string literals, so a quote or newline in a variable no longer breaks a
+webhook body.
+
+Pre-call assignment paths (`customer.profile.name`) are compiled the same way
+into tuples of keys.
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Callable
+
+_PLACEHOLDER = re.compile(r"\{\{([^{}]+)\}\}")
+
+# Distinct templates / assignment lists kept compiled per process
+_MAX_COMPILED = 1024
+
+
+class Template:
+    """A `{{variable}}` template parsed into alternating literals and names."""
+
+    __slots__ = ("_literals", "_names", "variables")
+
+    def __init__(self, source: str) -> None:
+        parts = _PLACEHOLDER.split(source)
+        # split() alternates literal, name, literal, ..., always ending on a literal
+        self._literals: tuple[str, ...] = tuple(parts[0::2])
+        self._names: tuple[str, ...] = tuple(parts[1::2])
+        self.variables = frozenset(self._names)
+
+    def render(self, variables: dict[str, Any], escape: Callable[[str], str] | None = None) -> str:
+        """Substitute known variables in one pass; unknown placeholders stay as written."""
+        if not self._names:
+            return self._literals[0]
+        out = [self._literals[0]]
+        for name, literal in zip(self._names, self._literals[1:]):
+            if name in variables:
+                value = str(variables[name])
+                out.append(escape(value) if escape else value)
+            else:
+                out.append("{{" + name + "}}")
+            out.append(literal)
+        return "".join(out)
+
+    def render_json(self, variables: dict[str, Any]) -> str:
+        """Render for a JSON document whose placeholders sit inside string literals."""
+        return self.render(variables, escape=_json_escape)
+
+
+def _json_escape(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False)[1:-1]
+
+
+@lru_cache(maxsize=_MAX_COMPILED)
+def compile_template(source: str) -> Template:
+    """Return the compiled template for `source`, parsing it on first use."""
+    return Template(source)
+
+
+class Assignments:
+    """Pre-call webhook assignments compiled to (variable, key path) pairs."""
+
+    __slots__ = ("_paths",)
+
+    def __init__(self, pairs: tuple[tuple[str, str], ...]) -> None:
+        self._paths = tuple((variable, tuple(path.split("."))) for variable, path in pairs)
+
+    def extract(self, data: Any) -> dict[str, str]:
+        """Resolve every path against a JSON response; missing paths are skipped."""
+        variables = {}
+        for variable, keys in self._paths:
+            value = data
+            for key in keys:
+                if not isinstance(value, dict):
+                    value = None
+                    break
+                value = value.get(key)
+            if value is not None:
+                variables[variable] = str(value)
+        return variables
+
+
+@lru_cache(maxsize=_MAX_COMPILED)
+def _compile_assignments(pairs: tuple[tuple[str, str], ...]) -> Assignments:
+    return Assignments(pairs)
+
+
+def compile_assignments(assignments: list[dict]) -> Assignments:
+    """Return compiled assignments for a webhook's `assignments` config."""
+    return _compile_assignments(tuple((a["variable"], a["path"]) for a in assignments))
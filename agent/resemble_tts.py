@@ -1,32 +1,137 @@
 """
 Custom Resemble AI TTS plugin for LiveKit Agents.
 
-Uses the streaming synthesis API with no_audio_header for raw PCM output:
-https://docs.resemble.ai/voice-generation/text-to-speech/streaming-http
+Two synthesis paths:
+
+- `stream()` (default): LLM tokens are split into sentences as they arrive and
+  each sentence is sent over a pooled, persistent WebSocket as soon as it is
+  complete, so audio for the first sentence plays while the LLM is still
+  generating the rest:
+  https://docs.resemble.ai/voice-generation/text-to-speech/streaming-websocket
+- `synthesize()`: one HTTP streaming request per text with no_audio_header for
+  raw PCM output. Also used as the fallback when the WebSocket is unavailable:
+  https://docs.resemble.ai/voice-generation/text-to-speech/streaming-http
 """
 
+import asyncio
+import base64
+import itertools
+import json
 import os
 import logging
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+import aiohttp
 import httpx
-from livekit.agents import tts, APIConnectOptions
+from livekit import rtc
+from livekit.agents import (
+    tts,
+    tokenize,
+    utils,
+    APIConnectOptions,
+    APIConnectionError,
+    APIStatusError,
+)
+from livekit.agents.metrics import TTSMetrics
 import uuid
 
+from tts_cache import get_tts_cache
+
 logger = logging.getLogger("resemble-tts")
 
+RESEMBLE_HTTP_URL = "https://f.cluster.resemble.ai/stream"
+RESEMBLE_WS_URL = "wss://websocket.cluster.resemble.ai/stream"
+
+# Set to false to disable the WebSocket path and synthesize per sentence over HTTP
+RESEMBLE_STREAMING = os.environ.get("RESEMBLE_STREAMING", "true").lower() in ("1", "true", "yes")
+# Reconnect pooled WebSockets after this many seconds
+RESEMBLE_WS_MAX_SESSION = float(os.environ.get("RESEMBLE_WS_MAX_SESSION", "300"))
+
+# Duration of the audio frames pushed to the pipeline
+RESEMBLE_FRAME_MS = int(os.environ.get("RESEMBLE_FRAME_MS", "20"))
+
+
+class PCMFrameAssembler:
+    """Re-chunks a 16-bit PCM byte stream into fixed-duration audio frames.
+
+    Network reads arrive in arbitrary sizes, odd lengths included. Whole
+    frames are sliced straight out of each chunk; only the bytes straddling a
+    chunk boundary are collected in a carry buffer, so no sample is ever split
+    or dropped. Frames keep a reference to the memory they are built from, so
+    a completed boundary frame is emitted as a copy before the carry buffer is
+    reused.
+    """
+
+    def __init__(
+        self,
+        output_emitter: tts.AudioEmitter,
+        *,
+        sample_rate: int,
+        num_channels: int = 1,
+        frame_ms: int = RESEMBLE_FRAME_MS,
+    ):
+        self._emitter = output_emitter
+        self._sample_rate = sample_rate
+        self._num_channels = num_channels
+        self._sample_bytes = 2 * num_channels
+        self._frame_bytes = sample_rate * frame_ms // 1000 * self._sample_bytes
+        self._carry = bytearray(self._frame_bytes)
+        self._carried = 0
+
+    def push(self, data: bytes | bytearray | memoryview) -> None:
+        view = memoryview(data).cast("B")
+        frame_bytes = self._frame_bytes
+
+        if self._carried:
+            take = min(len(view), frame_bytes - self._carried)
+            self._carry[self._carried : self._carried + take] = view[:take]
+            self._carried += take
+            view = view[take:]
+            if self._carried < frame_bytes:
+                return
+            self._emit(bytes(self._carry))
+            self._carried = 0
+
+        whole = len(view) - len(view) % frame_bytes
+        for offset in range(0, whole, frame_bytes):
+            self._emit(view[offset : offset + frame_bytes])
+
+        rest = len(view) - whole
+        if rest:
+            self._carry[:rest] = view[whole:]
+            self._carried = rest
+
+    def flush(self) -> None:
+        """Emit the trailing partial frame (whole samples only)."""
+        size = self._carried - self._carried % self._sample_bytes
+        if size:
+            self._emit(bytes(self._carry[:size]))
+        self._carried = 0
+
+    def _emit(self, pcm: bytes | memoryview) -> None:
+        self._emitter.push_frame(
+            rtc.AudioFrame(
+                data=pcm,
+                sample_rate=self._sample_rate,
+                num_channels=self._num_channels,
+                samples_per_channel=len(pcm) // self._sample_bytes,
+            )
+        )
+
 
 class ResembleTTS(tts.TTS):
     """
     Text-to-Speech using Resemble AI API.
-    
-    This implementation supports synthesis (text -> audio stream).
+
+    Supports streaming synthesis (LLM tokens -> audio over a persistent
+    WebSocket) and one-shot synthesis (text -> audio over HTTP).
     Uses no_audio_header=true for raw PCM output, eliminating WAV header parsing.
-    
+
     Requires:
     - RESEMBLE_API_KEY
     - RESEMBLE_VOICE_UUID
     """
-    
+
     def __init__(
         self,
         *,
@@ -34,38 +139,132 @@ class ResembleTTS(tts.TTS):
         voice_uuid: str | None = None,
         project_uuid: str | None = None,
         sample_rate: int = 22050,
+        streaming: bool = RESEMBLE_STREAMING,
     ):
         super().__init__(
-            capabilities=tts.TTSCapabilities(streaming=False),
+            capabilities=tts.TTSCapabilities(streaming=streaming),
             sample_rate=sample_rate,
             num_channels=1,
         )
-        
+
         self._api_key = api_key or os.environ.get("RESEMBLE_API_KEY")
         self._voice_uuid = voice_uuid or os.environ.get("RESEMBLE_VOICE_UUID")
         self._project_uuid = project_uuid or os.environ.get("RESEMBLE_PROJECT_UUID")
-        
+
         if not self._api_key:
             raise ValueError("RESEMBLE_API_KEY is required")
         if not self._voice_uuid:
             raise ValueError("RESEMBLE_VOICE_UUID is required")
-        
+
         self._http_client: httpx.AsyncClient | None = None
-        
+        self._ws_session: aiohttp.ClientSession | None = None
+        self._ws_pool = utils.ConnectionPool[aiohttp.ClientWebSocketResponse](
+            connect_cb=self._connect_ws,
+            close_cb=self._close_ws,
+            max_session_duration=RESEMBLE_WS_MAX_SESSION,
+            mark_refreshed_on_get=True,
+        )
+        # WebSocket request IDs must be unique per connection; pooled
+        # connections outlive streams, so number requests per TTS instance
+        self._ws_request_ids = itertools.count()
+        # Characters served from the audio cache, by emitter request ID
+        self._cached_characters: dict[str, int] = {}
+
         logger.info(f"Initialized Resemble TTS with voice: {self._voice_uuid}")
-    
+
+    @property
+    def voice_uuid(self) -> str:
+        return self._voice_uuid
+
     def _ensure_client(self) -> httpx.AsyncClient:
         """Lazily create the HTTP client."""
         if self._http_client is None:
             self._http_client = httpx.AsyncClient(timeout=60.0)
         return self._http_client
-    
+
+    def _payload(self, text: str) -> dict[str, Any]:
+        payload = {
+            "voice_uuid": self._voice_uuid,
+            "data": text,
+            "sample_rate": self._sample_rate,
+            "precision": "PCM_16",
+            "no_audio_header": True,  # Raw PCM - no WAV header parsing needed!
+        }
+        if self._project_uuid:
+            payload["project_uuid"] = self._project_uuid
+        return payload
+
+    async def _cached_audio(self, text: str) -> memoryview | None:
+        return await get_tts_cache().get(self._voice_uuid, self._sample_rate, text)
+
+    def _cache_audio(self, text: str, pcm: bytes) -> None:
+        get_tts_cache().put(self._voice_uuid, self._sample_rate, text, pcm)
+
+    def _record_cached(self, request_id: str, text: str) -> None:
+        self._cached_characters[request_id] = self._cached_characters.get(request_id, 0) + len(text)
+
+    def billable_characters(self, metrics: TTSMetrics) -> int:
+        """Characters of a TTS request actually sent to Resemble (cache hits are free)."""
+        cached = self._cached_characters.pop(metrics.request_id, 0)
+        return max(0, metrics.characters_count - cached)
+
+    async def _connect_ws(self, timeout: float) -> aiohttp.ClientWebSocketResponse:
+        if self._ws_session is None or self._ws_session.closed:
+            self._ws_session = aiohttp.ClientSession()
+        try:
+            return await asyncio.wait_for(
+                self._ws_session.ws_connect(
+                    RESEMBLE_WS_URL,
+                    headers={"Authorization": f"Bearer {self._api_key}"},
+                    heartbeat=20,
+                ),
+                timeout,
+            )
+        except (aiohttp.ClientError, TimeoutError) as e:
+            raise APIConnectionError(f"Could not connect to Resemble AI WebSocket: {e}") from e
+
+    async def _close_ws(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        await ws.close()
+
+    async def _stream_http(self, text: str) -> AsyncIterator[bytes]:
+        """Yield raw PCM chunks for `text` from the HTTP streaming endpoint."""
+        http_client = self._ensure_client()
+        async with http_client.stream(
+            "POST",
+            RESEMBLE_HTTP_URL,
+            headers={
+                "Authorization": f"Bearer {self._api_key}",
+                "Content-Type": "application/json",
+            },
+            json=self._payload(text),
+        ) as response:
+            if response.status_code >= 400:
+                error_content = await response.aread()
+                error_msg = error_content.decode('utf-8')
+                logger.error(f"Resemble AI HTTP error: {response.status_code} - {error_msg}")
+                raise RuntimeError(f"Resemble AI error {response.status_code}: {error_msg}")
+
+            # Raw PCM with no_audio_header; chunks may split a sample, callers
+            # reassemble them with PCMFrameAssembler
+            async for chunk in response.aiter_bytes(chunk_size=4096):
+                if chunk:
+                    yield chunk
+
+    def prewarm(self) -> None:
+        """Open a pooled WebSocket ahead of the first utterance."""
+        if self._capabilities.streaming:
+            self._ws_pool.prewarm()
+
     async def aclose(self) -> None:
-        """Close the HTTP client."""
+        """Close the HTTP client and pooled WebSockets."""
+        await self._ws_pool.aclose()
+        if self._ws_session is not None:
+            await self._ws_session.close()
+            self._ws_session = None
         if self._http_client is not None:
             await self._http_client.aclose()
             self._http_client = None
-    
+
     def synthesize(
         self,
         text: str,
@@ -83,10 +282,18 @@ class ResembleTTS(tts.TTS):
             sample_rate=self._sample_rate,
         )
 
+    def stream(
+        self,
+        *,
+        conn_options: APIConnectOptions = APIConnectOptions(),
+    ) -> "ResembleSynthesizeStream":
+        """Stream LLM tokens to speech over a pooled Resemble AI WebSocket."""
+        return ResembleSynthesizeStream(tts=self, conn_options=conn_options)
+
 
 class ResembleChunkedStream(tts.ChunkedStream):
     """Streaming chunk for Resemble AI TTS."""
-    
+
     def __init__(
         self,
         *,
@@ -104,23 +311,12 @@ class ResembleChunkedStream(tts.ChunkedStream):
         self._voice_uuid = voice_uuid
         self._project_uuid = project_uuid
         self._sample_rate = sample_rate
-    
+
     async def _run(self, output_emitter: tts.AudioEmitter) -> None:
         """Stream audio from Resemble AI with no_audio_header for raw PCM."""
         request_id = str(uuid.uuid4())
-        http_client = self._resemble_tts._ensure_client()
-        
-        try:
-            payload = {
-                "voice_uuid": self._voice_uuid,
-                "data": self._input_text,
-                "sample_rate": self._sample_rate,
-                "precision": "PCM_16",
-                "no_audio_header": True,  # Raw PCM - no WAV header parsing needed!
-            }
-            if self._project_uuid:
-                payload["project_uuid"] = self._project_uuid
 
+        try:
             logger.debug(f"Sending TTS request for text: {self._input_text[:50]}...")
 
             # Initialize the emitter before streaming
@@ -131,39 +327,31 @@ class ResembleChunkedStream(tts.ChunkedStream):
                 mime_type="audio/pcm",
             )
 
-            # Use the HTTP streaming synthesis endpoint
-            async with http_client.stream(
-                "POST",
-                "https://f.cluster.resemble.ai/stream",
-                headers={
-                    "Authorization": f"Bearer {self._api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            ) as response:
-                if response.status_code >= 400:
-                    error_content = await response.aread()
-                    error_msg = error_content.decode('utf-8')
-                    logger.error(f"Resemble AI HTTP error: {response.status_code} - {error_msg}")
-                    raise RuntimeError(f"Resemble AI error {response.status_code}: {error_msg}")
-                
-                # Stream chunks directly - no buffering needed with no_audio_header!
-                async for chunk in response.aiter_bytes(chunk_size=4096):
-                    if not chunk:
-                        continue
-                    
-                    # Ensure even number of bytes for 16-bit PCM
-                    if len(chunk) % 2 != 0:
-                        chunk = chunk[:-1]
-                    
-                    if len(chunk) > 0:
-                        output_emitter.push(chunk)
-                
-                # Signal end of audio
+            assembler = PCMFrameAssembler(output_emitter, sample_rate=self._sample_rate)
+
+            cached = await self._resemble_tts._cached_audio(self._input_text)
+            if cached is not None:
+                logger.debug(f"TTS cache hit for request {request_id}")
+                self._resemble_tts._record_cached(request_id, self._input_text)
+                assembler.push(cached)
+                assembler.flush()
                 output_emitter.flush()
-                
-                logger.debug(f"Finished streaming audio for request {request_id}")
-                    
+                return
+
+            audio = bytearray() if get_tts_cache().cacheable(self._input_text) else None
+            async for chunk in self._resemble_tts._stream_http(self._input_text):
+                assembler.push(chunk)
+                if audio is not None:
+                    audio += chunk
+            assembler.flush()
+            if audio:
+                self._resemble_tts._cache_audio(self._input_text, audio)
+
+            # Signal end of audio
+            output_emitter.flush()
+
+            logger.debug(f"Finished streaming audio for request {request_id}")
+
         except httpx.HTTPStatusError as e:
             logger.error(f"Resemble AI HTTP status error: {e}")
             raise RuntimeError(f"Resemble AI TTS error: {e}")
@@ -173,3 +361,199 @@ class ResembleChunkedStream(tts.ChunkedStream):
         except Exception as e:
             logger.error(f"Resemble AI TTS error: {e}")
             raise RuntimeError(f"Resemble AI TTS error: {e}")
+
+
+@dataclass
+class _Sentence:
+    text: str
+    ws_request_id: int | None = None
+    cached: memoryview | None = None  # Audio served from the cache, no request sent
+    store: bool = False  # Keep the received audio for the cache
+
+
+class ResembleSynthesizeStream(tts.SynthesizeStream):
+    """Token-in, audio-out stream over a pooled Resemble AI WebSocket.
+
+    Resemble synthesizes whole texts per request, so incoming tokens are cut
+    into sentences and each sentence is sent the moment it is complete.
+    Sends and receives run concurrently; audio is emitted strictly in request
+    order even if responses interleave. Sentences found in the audio cache
+    are played without a request.
+    """
+
+    def __init__(self, *, tts: ResembleTTS, conn_options: APIConnectOptions):
+        super().__init__(tts=tts, conn_options=conn_options)
+        self._resemble_tts = tts
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        request_id = utils.shortuuid()
+        output_emitter.initialize(
+            request_id=request_id,
+            sample_rate=self._resemble_tts.sample_rate,
+            num_channels=1,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        output_emitter.start_segment(segment_id=request_id)
+
+        sent_stream = tokenize.basic.SentenceTokenizer().stream()
+
+        async def _forward_input() -> None:
+            async for data in self._input_ch:
+                if isinstance(data, self._FlushSentinel):
+                    sent_stream.flush()
+                    continue
+                sent_stream.push_text(data)
+            sent_stream.end_input()
+
+        assembler = PCMFrameAssembler(output_emitter, sample_rate=self._resemble_tts.sample_rate)
+        input_task = asyncio.create_task(_forward_input())
+        pool = self._resemble_tts._ws_pool
+        try:
+            try:
+                ws = await pool.get(timeout=self._conn_options.timeout)
+            except APIConnectionError as e:
+                logger.warning(f"Resemble AI WebSocket unavailable, falling back to HTTP: {e}")
+                await self._run_http(sent_stream, assembler, request_id)
+            else:
+                try:
+                    await self._run_ws(ws, sent_stream, assembler, request_id)
+                except BaseException:
+                    # Never reuse a socket that may still carry this stream's responses
+                    pool.remove(ws)
+                    raise
+                pool.put(ws)
+            assembler.flush()
+            output_emitter.end_segment()
+        finally:
+            await sent_stream.aclose()
+            await utils.aio.cancel_and_wait(input_task)
+
+    async def _run_ws(
+        self,
+        ws: aiohttp.ClientWebSocketResponse,
+        sent_stream: tokenize.SentenceStream,
+        assembler: PCMFrameAssembler,
+        request_id: str,
+    ) -> None:
+        resemble_tts = self._resemble_tts
+        # Sentences in playout order; None marks the end of input
+        order: asyncio.Queue[_Sentence | None] = asyncio.Queue()
+
+        async def _send() -> None:
+            async for ev in sent_stream:
+                text = ev.token.strip()
+                if not text:
+                    continue
+                self._mark_started()
+                cached = await resemble_tts._cached_audio(text)
+                if cached is not None:
+                    resemble_tts._record_cached(request_id, text)
+                    order.put_nowait(_Sentence(text=text, cached=cached))
+                    continue
+
+                ws_request_id = next(resemble_tts._ws_request_ids)
+                payload = resemble_tts._payload(text)
+                payload["request_id"] = ws_request_id
+                try:
+                    await ws.send_str(json.dumps(payload))
+                except (aiohttp.ClientError, ConnectionResetError) as e:
+                    raise APIConnectionError(f"Resemble AI WebSocket send failed: {e}") from e
+                order.put_nowait(_Sentence(text=text, ws_request_id=ws_request_id))
+            order.put_nowait(None)
+
+        async def _recv() -> None:
+            # Audio buffered for sentences not yet playing, or kept for the cache
+            buffers: dict[int, bytearray] = {}
+            finished: set[int] = set()
+
+            async def _next() -> _Sentence | None:
+                while (sentence := await order.get()) is not None:
+                    if sentence.cached is not None:
+                        assembler.push(sentence.cached)
+                        continue
+                    sentence.store = get_tts_cache().cacheable(sentence.text)
+                    buffered = buffers.get(sentence.ws_request_id)
+                    if buffered:
+                        assembler.push(buffered)
+                    if not sentence.store:
+                        buffers.pop(sentence.ws_request_id, None)
+                    return sentence
+                return None
+
+            current = await _next()
+            while current is not None:
+                msg = await ws.receive()
+                if msg.type in (
+                    aiohttp.WSMsgType.CLOSE,
+                    aiohttp.WSMsgType.CLOSED,
+                    aiohttp.WSMsgType.CLOSING,
+                    aiohttp.WSMsgType.ERROR,
+                ):
+                    raise APIConnectionError("Resemble AI WebSocket closed unexpectedly")
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+
+                data = json.loads(msg.data)
+                msg_type = data.get("type")
+                msg_request_id = data.get("request_id")
+
+                if msg_type == "audio":
+                    pcm = base64.b64decode(data.get("audio_content") or "")
+                    if msg_request_id == current.ws_request_id:
+                        assembler.push(pcm)
+                        if current.store:
+                            buffers.setdefault(msg_request_id, bytearray()).extend(pcm)
+                    else:
+                        buffers.setdefault(msg_request_id, bytearray()).extend(pcm)
+                elif msg_type == "audio_end":
+                    finished.add(msg_request_id)
+                    # Advance past every sentence whose audio is complete
+                    while current is not None and current.ws_request_id in finished:
+                        finished.discard(current.ws_request_id)
+                        audio = buffers.pop(current.ws_request_id, None)
+                        if current.store and audio:
+                            resemble_tts._cache_audio(current.text, audio)
+                        current = await _next()
+                elif msg_type == "error":
+                    raise APIStatusError(
+                        f"Resemble AI TTS error: {data.get('message') or data}",
+                        status_code=data.get("status_code", -1),
+                        request_id=str(msg_request_id),
+                        body=data,
+                    )
+
+        tasks = [asyncio.create_task(_send()), asyncio.create_task(_recv())]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await utils.aio.cancel_and_wait(*tasks)
+
+    async def _run_http(
+        self,
+        sent_stream: tokenize.SentenceStream,
+        assembler: PCMFrameAssembler,
+        request_id: str,
+    ) -> None:
+        """Fallback: one HTTP streaming request per sentence."""
+        resemble_tts = self._resemble_tts
+        async for ev in sent_stream:
+            text = ev.token.strip()
+            if not text:
+                continue
+            self._mark_started()
+            cached = await resemble_tts._cached_audio(text)
+            if cached is not None:
+                resemble_tts._record_cached(request_id, text)
+                assembler.push(cached)
+                continue
+            audio = bytearray() if get_tts_cache().cacheable(text) else None
+            try:
+                async for chunk in resemble_tts._stream_http(text):
+                    assembler.push(chunk)
+                    if audio is not None:
+                        audio += chunk
+            except httpx.RequestError as e:
+                raise APIConnectionError(f"Resemble AI TTS error: {e}") from e
+            if audio:
+                resemble_tts._cache_audio(text, audio)
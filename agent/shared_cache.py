@@ -0,0 +1,147 @@
+"""
+Small JSON cache shared by every worker process on the host.
+
+The worker runs each job in its own process, so anything cached in process
+memory is gone by the next call. Values that should outlive a job (tool
+results, pre-call webhook variables) are kept here instead: one JSON file per
+key, written atomically and expired by wall-clock TTL. `lock(key)` is a
+cross-process lock so only one process fetches a missing value while the
+others wait and read its result.
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, AsyncIterator
+
+logger = logging.getLogger("shared-cache")
+
+_LOCK_POLL_SECONDS = 0.02
+# Lock files are only removed once nobody can plausibly still hold them
+_STALE_LOCK_SECONDS = 3600
+
+
+class SharedCache:
+    """TTL'd key -> JSON value store under `directory`, safe across processes."""
+
+    def __init__(self, directory: str, max_entries: int = 4096) -> None:
+        self._dir = directory
+        self._max_entries = max_entries
+
+    def _path(self, key: str, suffix: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self._dir, f"{digest}{suffix}")
+
+    async def get(self, key: str) -> tuple[Any, float] | None:
+        """Return (value, expires_at) for a live entry, None if missing or expired."""
+        return await asyncio.to_thread(self._read, self._path(key, ".json"))
+
+    async def put(self, key: str, value: Any, ttl: float) -> float:
+        """Store `value` for `ttl` seconds; returns its wall-clock expiry."""
+        expires_at = time.time() + ttl
+        await asyncio.to_thread(
+            self._write, self._path(key, ".json"), {"expires_at": expires_at, "value": value}
+        )
+        return expires_at
+
+    @contextlib.asynccontextmanager
+    async def lock(self, key: str, timeout: float) -> AsyncIterator[bool]:
+        """Hold the cross-process lock for `key`, waiting up to `timeout` seconds.
+
+        Yields False if the lock could not be taken in time; the caller then
+        proceeds unlocked rather than stalling behind a stuck holder.
+        """
+        fd = await asyncio.to_thread(self._open_lock, self._path(key, ".lock"))
+        if fd is None:
+            yield False
+            return
+        try:
+            deadline = time.monotonic() + timeout
+            locked = _try_lock(fd)
+            while not locked and time.monotonic() < deadline:
+                await asyncio.sleep(_LOCK_POLL_SECONDS)
+                locked = _try_lock(fd)
+            yield locked
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    def _read(self, path: str) -> tuple[Any, float] | None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+        expires_at = entry.get("expires_at", 0)
+        if expires_at <= time.time():
+            return None
+        return entry.get("value"), expires_at
+
+    def _write(self, path: str, entry: dict) -> None:
+        try:
+            os.makedirs(self._dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {path}: {e}")
+            return
+        self._prune()
+
+    def _open_lock(self, path: str) -> int | None:
+        try:
+            os.makedirs(self._dir, exist_ok=True)
+            return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning(f"Cache lock unavailable at {path}: {e}")
+            return None
+
+    def _prune(self) -> None:
+        """Drop the oldest entries beyond `max_entries`, plus stale lock files."""
+        now = time.time()
+        try:
+            names = os.listdir(self._dir)
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            path = os.path.join(self._dir, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if name.endswith(".lock"):
+                if now - mtime > _STALE_LOCK_SECONDS:
+                    _remove(path)
+            elif name.endswith(".json"):
+                entries.append((mtime, path))
+        if len(entries) <= self._max_entries:
+            return
+        entries.sort()
+        for _, path in entries[: len(entries) - self._max_entries]:
+            _remove(path)
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,432 @@
+"""
+Durable on-disk spool for agent → backend telemetry.
+
+Transcript batches, usage event batches and session-end notices are appended
+to a local spool instead of being posted inline. Appending is a single
+buffered file write, so call handling never waits on the backend, and a slow
+or unreachable backend costs disk space rather than memory or pending tasks.
+
+Layout: each worker process owns a directory under TELEMETRY_SPOOL_DIR,
+guarded by an flock, holding append-only JSON-lines segments. The active
+segment (`*.open`) is sealed (`*.seg`) once it reaches TELEMETRY_SEGMENT_BYTES
+or TELEMETRY_SEGMENT_MAX_AGE; the drainer reads it while it is still open.
+
+A background drainer replays segments in order and checkpoints its progress
+per segment (`*.ack`). Consecutive records bound for the same batch endpoint
+(transcripts, usage events, turn latencies) are merged into one request up to
+the endpoint's batch limit. Transient failures (network errors, 5xx,
+408/425/429) are retried with capped exponential backoff and jitter up to
+TELEMETRY_MAX_ATTEMPTS; records that exhaust their attempts or are rejected
+(other 4xx) are moved aside to `failed/` under the spool root. A rejected
+merged request is retried record by record first, so one bad record does not
+take its neighbours with it. Every request carries an Idempotency-Key header,
+and the rows inside carry client-generated IDs, so a record replayed after a
+crash is not stored twice. Spools left behind by dead processes are adopted
+and drained.
+
+A job delivers its own records while it runs and waits TELEMETRY_DRAIN_TIMEOUT
+at most when it ends. Whatever is left (including records waiting on a retry)
+is replayed once the job's process has exited, by the host replayer in the
+worker's main process (see host_replayer.py); an idle drainer rescans for
+such spools every _RESCAN_INTERVAL.
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+import uuid
+import weakref
+
+from backend_client import get_backend_client
+
+logger = logging.getLogger("telemetry-spool")
+
+TELEMETRY_SPOOL_DIR = os.environ.get(
+    "TELEMETRY_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "voxarena-spool")
+)
+TELEMETRY_SEGMENT_BYTES = int(os.environ.get("TELEMETRY_SEGMENT_BYTES", str(1024 * 1024)))
+TELEMETRY_SEGMENT_MAX_AGE = float(os.environ.get("TELEMETRY_SEGMENT_MAX_AGE", "300"))
+# How long a finished job waits for the spool to drain before leaving the rest to the host replayer
+TELEMETRY_DRAIN_TIMEOUT = float(os.environ.get("TELEMETRY_DRAIN_TIMEOUT", "2"))
+TELEMETRY_MAX_BACKOFF = float(os.environ.get("TELEMETRY_MAX_BACKOFF", "60"))
+TELEMETRY_MAX_ATTEMPTS = int(os.environ.get("TELEMETRY_MAX_ATTEMPTS", "20"))
+_BASE_BACKOFF = 0.5
+_RESCAN_INTERVAL = 30.0
+
+# Statuses worth retrying; any other 4xx will never succeed
+_RETRYABLE_STATUS = {408, 425, 429}
+
+# Batch endpoints (by path suffix) whose records can be merged: list field and item limit
+_BATCH_FIELDS = {
+    "/transcripts/batch": ("transcripts", 500),
+    "/usage/events/batch": ("events", 1000),
+    "/latency/turns/batch": ("turns", 1000),
+}
+
+
+class _RetryLater(Exception):
+    pass
+
+
+class _Rejected(Exception):
+    pass
+
+
+class TelemetrySpool:
+    """Append-only, segment-rotated spool with a background drainer."""
+
+    def __init__(self, backend_url: str, root: str = TELEMETRY_SPOOL_DIR) -> None:
+        self._backend_url = backend_url
+        self._root = root
+        self._dir = os.path.join(root, f"proc-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        self._lock_fd: int | None = None
+        self._seq = 0
+        self._active = None
+        self._active_path: str | None = None
+        self._active_size = 0
+        self._active_opened_at = 0.0
+        self._active_count = 0  # Records written to the active segment
+        self._active_acked = 0  # ... and delivered from it
+        self._failing: tuple[str, int] | None = None  # Segment stem and index of the head request
+        self._attempts = 0
+        self._adopted: dict[str, int] = {}  # orphan dir → held lock fd
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start the drainer (also replays spools left by dead processes)."""
+        if self._task is None or self._task.done():
+            self._idle.clear()
+            self._task = asyncio.create_task(self._run(), name="telemetry-spool")
+
+    def append(self, path: str, body: dict) -> None:
+        """Spool a POST of `body` to `{backend_url}{path}`. Never blocks on the network."""
+        record = {"id": uuid.uuid4().hex, "path": path, "body": body}
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        try:
+            if self._active is None:
+                self._open_segment()
+            self._active.write(line)
+            self._active.flush()
+        except OSError as e:
+            logger.error(f"Could not spool telemetry for {path}: {e}")
+            return
+        self._active_size += len(line)
+        self._active_count += 1
+        self._maybe_seal()
+        self._idle.clear()
+        self._wakeup.set()
+        self.start()
+
+    async def drain(self, timeout: float = TELEMETRY_DRAIN_TIMEOUT) -> None:
+        """Wait until everything spooled so far is delivered, up to `timeout`."""
+        if self._task is None:
+            return
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except TimeoutError:
+            logger.warning(
+                f"Telemetry spool not drained after {timeout:.0f}s; "
+                "remaining records will be replayed by the host replayer"
+            )
+
+    async def aclose(self) -> None:
+        """Stop the drainer and let go of adopted spools; undelivered records stay on disk."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        for lock_fd in self._adopted.values():
+            os.close(lock_fd)
+        self._adopted.clear()
+
+    # --- Segments ---
+
+    def _open_segment(self) -> None:
+        if self._lock_fd is None:
+            os.makedirs(self._dir, exist_ok=True)
+            self._lock_fd = os.open(os.path.join(self._dir, "lock"), os.O_WRONLY | os.O_CREAT, 0o644)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._seq += 1
+        self._active_path = os.path.join(self._dir, f"{self._seq:012d}.open")
+        self._active = open(self._active_path, "a", encoding="utf-8")  # noqa: SIM115 - closed when sealed
+        self._active_size = 0
+        self._active_opened_at = time.monotonic()
+        self._active_count = 0
+        self._active_acked = 0
+
+    def _maybe_seal(self) -> None:
+        """Seal the active segment once it reaches its size or age limit."""
+        if self._active is None:
+            return
+        if (
+            self._active_size >= TELEMETRY_SEGMENT_BYTES
+            or time.monotonic() - self._active_opened_at >= TELEMETRY_SEGMENT_MAX_AGE
+        ):
+            self._seal_active()
+
+    def _seal_active(self) -> None:
+        self._active.close()
+        os.replace(self._active_path, _stem(self._active_path) + ".seg")
+        self._active = None
+        self._active_path = None
+
+    def _next_segment(self) -> str | None:
+        """Oldest undelivered segment: own sealed ones, then the active one, then orphans."""
+        self._maybe_seal()
+        own = sorted(glob.glob(os.path.join(self._dir, "*.seg")))
+        if own:
+            return own[0]
+        if self._active is not None and self._active_acked < self._active_count:
+            return self._active_path
+
+        for directory in sorted(glob.glob(os.path.join(self._root, "proc-*"))):
+            if directory == self._dir:
+                continue
+            if directory not in self._adopted and not self._adopt(directory):
+                continue
+            segments = sorted(
+                glob.glob(os.path.join(directory, "*.seg"))
+                + glob.glob(os.path.join(directory, "*.open"))
+            )
+            if segments:
+                return segments[0]
+            self._release(directory)
+        return None
+
+    def _adopt(self, directory: str) -> bool:
+        """Take over a spool whose owning process is gone (its flock is free)."""
+        try:
+            lock_fd = os.open(os.path.join(directory, "lock"), os.O_WRONLY | os.O_CREAT, 0o644)
+        except OSError:
+            return False
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(lock_fd)
+            return False
+        logger.info(f"Replaying orphaned telemetry spool {directory}")
+        self._adopted[directory] = lock_fd
+        return True
+
+    def _release(self, directory: str) -> None:
+        lock_fd = self._adopted.pop(directory)
+        for leftover in glob.glob(os.path.join(directory, "*")):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+        os.close(lock_fd)
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+    # --- Delivery ---
+
+    async def _run(self) -> None:
+        failures = 0
+        while True:
+            try:
+                segment = self._next_segment()
+            except OSError as e:
+                logger.error(f"Telemetry spool unreadable: {e}")
+                segment = None
+            if segment is None:
+                self._idle.set()
+                self._wakeup.clear()
+                # Also wake up periodically to adopt spools of processes that exited since
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), _RESCAN_INTERVAL)
+                except TimeoutError:
+                    pass
+                continue
+            try:
+                await self._deliver(segment)
+                failures = 0
+            except _RetryLater as e:
+                failures += 1
+                delay = min(TELEMETRY_MAX_BACKOFF, _BASE_BACKOFF * 2 ** (failures - 1))
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(f"Telemetry delivery failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _deliver(self, segment: str) -> None:
+        # Acks are keyed by the stem so progress survives the segment being sealed meanwhile
+        stem = _stem(segment)
+        ack_path = stem + ".ack"
+        # Records appended to the active segment before this read are all in it
+        written = self._active_count
+        records = await asyncio.to_thread(_read_segment, segment)
+        index = await asyncio.to_thread(_read_ack, ack_path)
+
+        while index < len(records):
+            body, end = _coalesce(records, index)
+            group = records[index:end]
+            try:
+                await self._attempt(stem, index, group, body)
+            except _Rejected:
+                if len(group) == 1:
+                    await self._set_aside(group)
+                else:
+                    # Find the bad record(s) rather than setting the whole batch aside
+                    for offset, record in enumerate(group):
+                        try:
+                            await self._attempt(stem, index + offset, [record], record["body"])
+                        except _Rejected:
+                            await self._set_aside([record])
+                        await asyncio.to_thread(_write_ack, ack_path, index + offset + 1)
+            index = end
+            await asyncio.to_thread(_write_ack, ack_path, index)
+
+        if segment == self._active_path:
+            self._active_acked = max(self._active_acked, written)
+            return
+        if not os.path.exists(segment):
+            return  # Sealed while being delivered; the rest is picked up from the .seg
+        for path in (segment, ack_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def _attempt(self, stem: str, index: int, group: list[dict], body: dict) -> None:
+        """Send one request, setting its records aside once they run out of attempts.
+
+        Raises _RetryLater while attempts remain, so the drainer backs off and
+        comes back to the same records, and _Rejected on a permanent rejection.
+        """
+        if self._failing != (stem, index):
+            self._failing, self._attempts = (stem, index), 0
+        try:
+            await self._send(group, body)
+        except _RetryLater as e:
+            self._attempts += 1
+            if self._attempts < TELEMETRY_MAX_ATTEMPTS:
+                raise
+            logger.error(f"Giving up on telemetry after {self._attempts} attempts: {e}")
+            await self._set_aside(group)
+
+    async def _send(self, group: list[dict], body: dict) -> None:
+        path = group[0]["path"]
+        # A merged request gets a key derived from its records, so the same merge replays with the same key
+        key = group[0]["id"] if len(group) == 1 else hashlib.sha256(
+            ",".join(record["id"] for record in group).encode()
+        ).hexdigest()
+        try:
+            response = await get_backend_client().post(
+                f"{self._backend_url}{path}",
+                json=body,
+                headers={"Idempotency-Key": key},
+            )
+        except Exception as e:
+            raise _RetryLater(f"{path}: {e}") from e
+
+        status = response.status_code
+        if status >= 500 or status in _RETRYABLE_STATUS:
+            raise _RetryLater(f"{path}: HTTP {status}")
+        if status >= 400:
+            logger.error(f"Telemetry rejected by backend: {path} {status} {response.text}")
+            raise _Rejected(f"{path}: HTTP {status}")
+
+    async def _set_aside(self, records: list[dict]) -> None:
+        failed_dir = os.path.join(self._root, "failed")
+        try:
+            await asyncio.to_thread(_write_failed, failed_dir, records)
+        except OSError as e:
+            logger.error(f"Could not set aside {len(records)} telemetry record(s), dropping: {e}")
+            return
+        logger.error(f"Set aside {len(records)} telemetry record(s) in {failed_dir}")
+
+
+def _stem(segment: str) -> str:
+    return os.path.splitext(segment)[0]
+
+
+def _coalesce(records: list[dict], start: int) -> tuple[dict, int]:
+    """Body of one request for records[start:end], merging a run of same-endpoint batches.
+
+    Records merge when they go to the same batch path and agree on every field
+    besides the batched list, e.g. usage events of the same session.
+    """
+    first = records[start]
+    spec = next(
+        (spec for suffix, spec in _BATCH_FIELDS.items() if first["path"].endswith(suffix)), None
+    )
+    if spec is None:
+        return first["body"], start + 1
+    field, limit = spec
+    common = {k: v for k, v in first["body"].items() if k != field}
+    items = list(first["body"].get(field, []))
+    end = start + 1
+    while end < len(records):
+        record = records[end]
+        if record["path"] != first["path"]:
+            break
+        if {k: v for k, v in record["body"].items() if k != field} != common:
+            break
+        more = record["body"].get(field, [])
+        if len(items) + len(more) > limit:
+            break
+        items.extend(more)
+        end += 1
+    return {**common, field: items}, end
+
+
+def _read_segment(path: str) -> list[dict]:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break  # Still being written (active segment) or torn by a crash
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Torn final write from a crashed process
+                logger.warning(f"Skipping corrupt telemetry record in {path}")
+    return records
+
+
+def _read_ack(path: str) -> int:
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_ack(path: str, count: int) -> None:
+    with open(path, "w") as f:
+        f.write(str(count))
+
+
+def _write_failed(directory: str, records: list[dict]) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{records[0]['id']}.failed"), "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+
+
+# One spool per event loop (thread-based job executors run a loop per job)
+_spools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TelemetrySpool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_telemetry_spool(backend_url: str) -> TelemetrySpool:
+    """Return the spool for the running event loop, creating it lazily."""
+    loop = asyncio.get_running_loop()
+    spool = _spools.get(loop)
+    if spool is None:
+        spool = _spools[loop] = TelemetrySpool(backend_url)
+    return spool
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+import backend_client
+import config_cache
+from config_cache import AgentConfigCache
+
+BACKEND = "http://backend.test/api"
+
+
+def _write_stale_snapshot(path, age: float) -> None:
+    path.write_text(json.dumps({
+        "version": "v1",
+        "synced_at": time.time() - age,
+        "agents": [{"id": "old-agent", "name": "Old", "phone_number": "+15550001111"}],
+    }))
+
+
+def _install_backend(delay: float, calls: list) -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(dict(request.url.params))
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={
+            "version": "v2",
+            "agents": [{"id": "new-agent", "name": "New", "phone_number": "+15550001111"}],
+            "removed": ["old-agent"],
+        })
+
+    loop = asyncio.get_running_loop()
+    backend_client._clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_stale_snapshot_is_synced_before_routing(tmp_path, monkeypatch):
+    snapshot = tmp_path / "configs.json"
+    _write_stale_snapshot(snapshot, age=config_cache.AGENT_CONFIG_SYNC_INTERVAL + 60)
+    monkeypatch.setattr(config_cache, "AGENT_CONFIG_SNAPSHOT", str(snapshot))
+    calls = []
+
+    async def scenario():
+        _install_backend(0.0, calls)
+        cache = AgentConfigCache(BACKEND)
+        cache.preload()
+        routed = await cache.lookup_phone("(555) 000-1111")
+        await backend_client.aclose_backend_client()
+        return routed
+
+    routed = asyncio.run(scenario())
+
+    assert calls == [{"since": "v1"}]
+    assert routed["id"] == "new-agent"
+    assert json.loads(snapshot.read_text())["version"] == "v2"
+
+
+def test_slow_sync_falls_back_to_snapshot(tmp_path, monkeypatch):
+    snapshot = tmp_path / "configs.json"
+    _write_stale_snapshot(snapshot, age=config_cache.AGENT_CONFIG_SYNC_INTERVAL + 60)
+    monkeypatch.setattr(config_cache, "AGENT_CONFIG_SNAPSHOT", str(snapshot))
+    monkeypatch.setattr(config_cache, "AGENT_CONFIG_STALE_SYNC_TIMEOUT", 0.05)
+    calls = []
+
+    async def scenario():
+        _install_backend(0.3, calls)
+        cache = AgentConfigCache(BACKEND)
+        cache.preload()
+        started = time.monotonic()
+        routed = await cache.lookup_phone("+15550001111")
+        waited = time.monotonic() - started
+        # The sync keeps going in the background and serves later calls
+        await asyncio.sleep(0.4)
+        later = await cache.lookup_phone("+15550001111")
+        await backend_client.aclose_backend_client()
+        return routed, waited, later
+
+    routed, waited, later = asyncio.run(scenario())
+
+    assert routed["id"] == "old-agent"
+    assert waited < 0.25
+    assert later["id"] == "new-agent"
+    assert len(calls) == 1
@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+
+import function_tools
+from function_tools import ToolExecutor
+
+LOOKUP = {
+    "name": "lookup_branch",
+    "endpoint": {"url": "https://tools.example.com/branches", "method": "GET"},
+    "cache": {"ttl_seconds": 300, "key_args": ["branch_id"]},
+}
+
+
+def _install_upstream(calls: list) -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"branch": request.url.params["branch_id"], "open": True})
+
+    loop = asyncio.get_running_loop()
+    function_tools._clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_two_sessions_share_one_upstream_call(tmp_path, monkeypatch):
+    # Each executor stands in for a session in its own worker process: no shared memory,
+    # only the on-disk cache directory.
+    monkeypatch.setattr(function_tools, "TOOL_CACHE_DIR", str(tmp_path))
+    calls = []
+
+    async def scenario():
+        _install_upstream(calls)
+        first, second = ToolExecutor(LOOKUP), ToolExecutor(LOOKUP)
+        results = await asyncio.gather(
+            first.execute({"branch_id": "12"}),
+            second.execute({"branch_id": "12", "caller": "ignored"}),
+        )
+        later = await ToolExecutor(LOOKUP).execute({"branch_id": "12"})
+        await function_tools.aclose_tool_client()
+        return results, later, [first.stats(), second.stats()]
+
+    (first_text, second_text), later_text, stats = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert first_text == second_text == later_text
+    # Whichever takes the key's lock first calls upstream; the other waits and reads its result
+    assert sorted(s["coalesced"] for s in stats) == [0, 1]
+
+
+def test_errors_are_not_shared(tmp_path, monkeypatch):
+    monkeypatch.setattr(function_tools, "TOOL_CACHE_DIR", str(tmp_path))
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        return httpx.Response(503)
+
+    async def scenario():
+        function_tools._clients[asyncio.get_running_loop()] = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        texts = [await ToolExecutor(LOOKUP).execute({"branch_id": "12"}) for _ in range(2)]
+        await function_tools.aclose_tool_client()
+        return texts
+
+    texts = asyncio.run(scenario())
+
+    assert len(calls) == 2
+    assert all(text.startswith("Error:") for text in texts)
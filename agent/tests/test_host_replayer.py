@@ -0,0 +1,108 @@
+import json
+import time
+import uuid
+
+import httpx
+
+import host_replayer
+import post_call
+import telemetry_spool
+from host_replayer import HostReplayer
+
+BACKEND = "http://backend.test/api"
+
+
+def _queue_request(directory) -> str:
+    request = {
+        "id": uuid.uuid4().hex,
+        "url": "https://hooks.example.com/call-ended",
+        "method": "POST",
+        "headers": {},
+        "body": {"room": "call-1"},
+        "timeout": 5,
+        "attempts": 0,
+        "not_before": 0,
+    }
+    post_call._write_request(str(directory), request)
+    return request["id"]
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def test_one_replayer_per_host_delivers_and_a_standby_takes_over(tmp_path, monkeypatch):
+    queue_dir = tmp_path / "post-call"
+    lock_path = str(tmp_path / "replayer.lock")
+    monkeypatch.setattr(host_replayer, "HOST_REPLAYER_POLL_INTERVAL", 0.05)
+    delivered = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        delivered.append(request.headers["Idempotency-Key"])
+        return httpx.Response(200)
+
+    # Every replayer thread gets its own client on its own loop
+    monkeypatch.setattr(
+        post_call, "get_tool_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+    # Left behind by a job that exited before delivering it
+    first_id = _queue_request(queue_dir)
+    spool_dir = str(tmp_path / "spool")
+    first = HostReplayer(BACKEND, lock_path, str(queue_dir), spool_dir)
+    standby = HostReplayer(BACKEND, lock_path, str(queue_dir), spool_dir)
+    first.start()
+    try:
+        assert _wait_for(lambda: not list(queue_dir.glob("*.json")))
+        assert delivered == [first_id]
+        standby.start()
+
+        # Queued by a job after the first replayer's last rescan: picked up on takeover
+        second_id = _queue_request(queue_dir)
+        first.stop(timeout=5)
+        assert _wait_for(lambda: not list(queue_dir.glob("*.json")))
+        assert delivered == [first_id, second_id]
+    finally:
+        first.stop(timeout=5)
+        standby.stop(timeout=5)
+
+
+def test_replays_the_spool_of_an_exited_job(tmp_path, monkeypatch):
+    # Spool of a job process that exited before its records were delivered
+    orphan = tmp_path / "spool" / "proc-4242-deadbeef"
+    orphan.mkdir(parents=True)
+    records = [
+        {"id": uuid.uuid4().hex, "path": "/sessions/by-room/call-1/transcripts/batch",
+         "body": {"transcripts": [{"id": str(i), "content": f"line {i}"}]}}
+        for i in range(3)
+    ]
+    (orphan / "000000000001.seg").write_text("".join(json.dumps(r) + "\n" for r in records))
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append((request.url.path, json.loads(request.content)))
+        return httpx.Response(200)
+
+    monkeypatch.setattr(
+        telemetry_spool, "get_backend_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+    replayer = HostReplayer(
+        BACKEND, str(tmp_path / "replayer.lock"), str(tmp_path / "post-call"), str(tmp_path / "spool")
+    )
+    replayer.start()
+    try:
+        assert _wait_for(lambda: not orphan.exists())
+    finally:
+        replayer.stop(timeout=5)
+
+    # The three batches are merged into one request
+    assert received == [(
+        "/api/sessions/by-room/call-1/transcripts/batch",
+        {"transcripts": [{"id": str(i), "content": f"line {i}"} for i in range(3)]},
+    )]
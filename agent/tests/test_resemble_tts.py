@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from resemble_tts import PCMFrameAssembler
+
+
+class _Emitter:
+    def __init__(self) -> None:
+        self.frames = []
+
+    def push_frame(self, frame) -> None:
+        self.frames.append(frame)
+
+
+def _assemble(pcm: bytes, chunk_sizes: list[int], sample_rate: int = 22050) -> list:
+    emitter = _Emitter()
+    assembler = PCMFrameAssembler(emitter, sample_rate=sample_rate, frame_ms=20)
+    offset = 0
+    sizes = iter(chunk_sizes)
+    while offset < len(pcm):
+        size = next(sizes)
+        assembler.push(pcm[offset : offset + size])
+        offset += size
+    assembler.flush()
+    return emitter.frames
+
+
+@pytest.mark.parametrize("chunk_size", [4096, 1000, 881, 883, 1, 7])
+def test_frames_reproduce_the_stream_across_chunk_boundaries(chunk_size):
+    rng = random.Random(chunk_size)
+    pcm = rng.randbytes(882 * 47 + 300)
+
+    # Frames are only inspected after the whole stream was pushed, so a frame
+    # still pointing at the reused carry buffer would show later bytes
+    frames = _assemble(pcm, [chunk_size] * len(pcm))
+
+    assert [len(bytes(f.data.cast("B"))) for f in frames[:-1]] == [882] * 47
+    assert b"".join(bytes(f.data.cast("B")) for f in frames) == pcm
+    assert all(f.samples_per_channel * 2 == len(bytes(f.data.cast("B"))) for f in frames)
+
+
+def test_uneven_chunks_keep_every_frame_intact():
+    rng = random.Random(9)
+    pcm = rng.randbytes(882 * 60)
+    chunk_sizes = [rng.randint(1, 3000) for _ in range(len(pcm))]
+
+    frames = _assemble(pcm, chunk_sizes)
+
+    expected = [pcm[i : i + 882] for i in range(0, len(pcm), 882)]
+    assert [bytes(f.data.cast("B")) for f in frames] == expected
+
+
+def test_flush_drops_a_trailing_half_sample():
+    frames = _assemble(b"\x01\x02\x03", [3])
+
+    assert [bytes(f.data.cast("B")) for f in frames] == [b"\x01\x02"]
@@ -0,0 +1,108 @@
+"""
+Batched, ordered transcript writer.
+
+Each call gets one writer. Transcript lines (user turns, agent turns,
+function-call and transfer logs) are queued in order and handed to the
+telemetry spool in batches for the backend's bulk endpoint, either when a
+batch fills up or after a short delay, instead of one HTTP request and one
+database commit per line.
+
+A single consumer drains the queue, so lines reach the backend in the order
+they were spoken. Delivery, retries and replay after an outage are handled by
+the spool; every line carries a client-generated ID so replays are not
+stored twice.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+
+from telemetry_spool import get_telemetry_spool
+
+logger = logging.getLogger("transcript-writer")
+
+TRANSCRIPT_BATCH_SIZE = int(os.environ.get("TRANSCRIPT_BATCH_SIZE", "20"))
+TRANSCRIPT_FLUSH_INTERVAL = float(os.environ.get("TRANSCRIPT_FLUSH_INTERVAL", "0.5"))
+TRANSCRIPT_QUEUE_SIZE = int(os.environ.get("TRANSCRIPT_QUEUE_SIZE", "1000"))
+
+
+class TranscriptWriter:
+    """Ordered, bounded transcript queue for one room, flushed in batches."""
+
+    def __init__(self, backend_url: str, room_name: str) -> None:
+        self._backend_url = backend_url
+        self._path = f"/sessions/by-room/{room_name}/transcripts/batch"
+        self._room_name = room_name
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=TRANSCRIPT_QUEUE_SIZE)
+        self._task: asyncio.Task | None = None
+
+    def add(self, content: str, speaker: str) -> None:
+        """Queue a transcript line. Never blocks the caller."""
+        if not content or not content.strip():
+            return
+        line = {
+            "id": str(uuid.uuid4()),
+            "content": content,
+            "speaker": speaker.upper(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            self._queue.put_nowait(line)
+        except asyncio.QueueFull:
+            logger.warning(f"Transcript queue full for room {self._room_name}, dropping line")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"transcripts:{self._room_name}")
+
+    async def flush(self) -> None:
+        """Wait until every queued line has been handed to the spool."""
+        await self._queue.join()
+
+    async def aclose(self) -> None:
+        """Flush remaining lines and stop the background task."""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + TRANSCRIPT_FLUSH_INTERVAL
+            while len(batch) < TRANSCRIPT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except TimeoutError:
+                    break
+            get_telemetry_spool(self._backend_url).append(self._path, {"transcripts": batch})
+            logger.debug(f"Spooled {len(batch)} transcript line(s) for room {self._room_name}")
+            for _ in batch:
+                self._queue.task_done()
+
+
+_writers: dict[str, TranscriptWriter] = {}
+
+
+def get_transcript_writer(backend_url: str, room_name: str) -> TranscriptWriter:
+    """Return the writer for a room, creating it on first use."""
+    writer = _writers.get(room_name)
+    if writer is None:
+        writer = _writers[room_name] = TranscriptWriter(backend_url, room_name)
+    return writer
+
+
+async def close_transcript_writer(room_name: str) -> None:
+    """Flush and drop a room's writer (call before ending the backend session)."""
+    writer = _writers.pop(room_name, None)
+    if writer is not None:
+        await writer.aclose()
@@ -0,0 +1,203 @@
+"""
+Content-addressed cache of synthesized TTS audio.
+
+Agents repeat a lot of fixed phrases across calls: transfer announcements,
+function-call fillers, apologies and closings. Synthesized PCM is cached under
+a hash of (voice, sample rate, normalized text) in two tiers:
+
+- memory: a byte-bounded LRU private to the worker process
+- disk: one raw PCM file per phrase, shared by every worker on the host and
+  read back through mmap, so a hit is served from the page cache without
+  copying the file into the process
+
+Disk entries are pruned oldest-first (by mtime, refreshed on every hit) once
+the directory exceeds its size budget. Hit/miss counters are kept per process
+and logged when a job ends.
+"""
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger("tts-cache")
+
+TTS_CACHE_ENABLED = os.environ.get("TTS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TTS_CACHE_DIR = os.environ.get(
+    "TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "voxarena-tts")
+)
+TTS_CACHE_MEMORY_MB = float(os.environ.get("TTS_CACHE_MEMORY_MB", "32"))
+TTS_CACHE_DISK_MB = float(os.environ.get("TTS_CACHE_DISK_MB", "512"))
+# Longer texts are almost never repeated verbatim; don't spend space on them
+TTS_CACHE_MAX_CHARS = int(os.environ.get("TTS_CACHE_MAX_CHARS", "300"))
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+@dataclass
+class TTSCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    bytes_served: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class TTSAudioCache:
+    """Two-tier (memory LRU + mmap'd disk) PCM cache keyed by voice, rate and text."""
+
+    def __init__(
+        self,
+        directory: str = TTS_CACHE_DIR,
+        memory_bytes: int = int(TTS_CACHE_MEMORY_MB * 1024 * 1024),
+        disk_bytes: int = int(TTS_CACHE_DISK_MB * 1024 * 1024),
+    ) -> None:
+        self._directory = directory
+        self._memory_bytes = memory_bytes
+        self._disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, memoryview]" = OrderedDict()
+        self._memory_used = 0
+        self.stats = TTSCacheStats()
+
+    @staticmethod
+    def cacheable(text: str) -> bool:
+        return TTS_CACHE_ENABLED and 0 < len(text) <= TTS_CACHE_MAX_CHARS
+
+    @staticmethod
+    def key(voice_id: str, sample_rate: int, text: str) -> str:
+        return hashlib.sha256(
+            f"{voice_id}|{sample_rate}|{normalize_text(text)}".encode()
+        ).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.pcm")
+
+    async def get(self, voice_id: str, sample_rate: int, text: str) -> memoryview | None:
+        """Return cached 16-bit PCM for the text, or None on a miss."""
+        if not self.cacheable(text):
+            return None
+        key = self.key(voice_id, sample_rate, text)
+
+        pcm = self._memory.get(key)
+        if pcm is not None:
+            self._memory.move_to_end(key)
+            self.stats.memory_hits += 1
+            self.stats.bytes_served += len(pcm)
+            return pcm
+
+        pcm = await asyncio.to_thread(self._map, self._path(key))
+        if pcm is not None:
+            self._remember(key, pcm)
+            self.stats.disk_hits += 1
+            self.stats.bytes_served += len(pcm)
+            return pcm
+
+        self.stats.misses += 1
+        return None
+
+    def put(self, voice_id: str, sample_rate: int, text: str, pcm: bytes) -> None:
+        """Store synthesized PCM for the text in both tiers.
+
+        The disk write runs in the default executor so audio playback never
+        waits on it.
+        """
+        if not pcm or not self.cacheable(text):
+            return
+        key = self.key(voice_id, sample_rate, text)
+        pcm = bytes(pcm)
+        self._remember(key, memoryview(pcm))
+        asyncio.get_running_loop().run_in_executor(None, self._store, self._path(key), pcm)
+
+    def _remember(self, key: str, pcm: memoryview) -> None:
+        if len(pcm) > self._memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_used -= len(previous)
+        self._memory[key] = pcm
+        self._memory_used += len(pcm)
+        while self._memory_used > self._memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+            self.stats.evictions += 1
+
+    @staticmethod
+    def _map(path: str) -> memoryview | None:
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                # The mapping outlives the file object; it is released with the last view
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)  # Mark as recently used for disk pruning
+        except (OSError, ValueError):
+            return None
+        return memoryview(mapped)
+
+    def _store(self, path: str, pcm: bytes) -> None:
+        try:
+            self._write(path, pcm)
+            self.stats.stores += 1
+        except OSError as e:
+            logger.warning(f"Could not store TTS audio: {e}")
+
+    def _write(self, path: str, pcm: bytes) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+        # Write then rename so concurrent processes never map a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pcm)
+        os.replace(tmp_path, path)
+        self._prune()
+
+    def _prune(self) -> None:
+        entries = []
+        total = 0
+        with os.scandir(self._directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".pcm"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self._disk_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self._disk_bytes:
+                break
+
+    def stats_dict(self) -> dict:
+        return {**asdict(self.stats), "hit_rate": round(self.stats.hit_rate, 3)}
+
+
+_cache: TTSAudioCache | None = None
+
+
+def get_tts_cache() -> TTSAudioCache:
+    """Return the process-wide TTS audio cache."""
+    global _cache
+    if _cache is None:
+        _cache = TTSAudioCache()
+    return _cache
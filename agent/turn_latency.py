@@ -0,0 +1,114 @@
+"""
+Per-turn latency records.
+
+For every agent reply to a user turn, the stages between the caller going
+quiet and hearing the agent are recorded in milliseconds:
+
+- eou_delay_ms:   end of user speech → end-of-turn decision
+- stt_final_ms:   end of user speech → final transcript
+- llm_ttft_ms:    LLM request → first token
+- tts_ttfb_ms:    first text sent to TTS → first audio byte
+- first_audio_ms: end of user speech → first audio frame published
+- tool_ms:        time spent in function tools during the turn
+
+The timings come from the metrics LiveKit attaches to each user and assistant
+chat message; tool time from the function_tools_executed event. Records are
+buffered per session and spooled to the backend in batches (and once more when
+the call ends); per-stage histograms are kept in memory and logged at the end.
+"""
+
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any
+
+from latency_histogram import LatencyHistogram
+from telemetry_spool import get_telemetry_spool
+
+logger = logging.getLogger("turn-latency")
+
+LATENCY_BATCH_SIZE = int(os.environ.get("LATENCY_BATCH_SIZE", "20"))
+
+# Record field → MetricsReport key (seconds) on the user / assistant message
+_USER_STAGES = {"eou_delay_ms": "end_of_turn_delay", "stt_final_ms": "transcription_delay"}
+_ASSISTANT_STAGES = {
+    "llm_ttft_ms": "llm_node_ttft",
+    "tts_ttfb_ms": "tts_node_ttfb",
+    "first_audio_ms": "e2e_latency",
+}
+STAGES = (*_USER_STAGES, *_ASSISTANT_STAGES, "tool_ms")
+
+
+def _ms(metrics: dict, key: str) -> float | None:
+    value = metrics.get(key)
+    return round(value * 1000, 1) if value is not None else None
+
+
+class TurnLatencyTracker:
+    """Builds one latency record per agent reply and ships them in batches."""
+
+    def __init__(self, backend_url: str, session_id: str, agent_id: str | None, stt_provider: str) -> None:
+        self._backend_url = backend_url
+        self._session_id = session_id
+        self._agent_id = agent_id
+        self._stt_provider = stt_provider
+        self._user_turn: dict[str, Any] | None = None
+        self._tool_ms = 0.0
+        self._pending: list[dict[str, Any]] = []
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+
+    def on_user_message(self, metrics: dict) -> None:
+        self._user_turn = {field: _ms(metrics, key) for field, key in _USER_STAGES.items()}
+        self._tool_ms = 0.0
+
+    def on_tools_executed(self, event: Any) -> None:
+        for call, output in zip(event.function_calls, event.function_call_outputs):
+            started = getattr(call, "created_at", None)
+            finished = getattr(output, "created_at", None)
+            if started is not None and finished is not None:
+                self._tool_ms += max(finished - started, 0) * 1000
+
+    def on_assistant_message(self, metrics: dict, interrupted: bool = False) -> None:
+        # Only replies to a user turn (not the greeting or say() announcements)
+        if self._user_turn is None:
+            return
+        record = {
+            "id": str(uuid.uuid4()),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **self._user_turn,
+            **{field: _ms(metrics, key) for field, key in _ASSISTANT_STAGES.items()},
+            "tool_ms": round(self._tool_ms, 1),
+            "interrupted": interrupted,
+        }
+        self._user_turn = None
+        self._tool_ms = 0.0
+
+        for stage in STAGES:
+            if record[stage] is not None:
+                self.histograms[stage].record(record[stage])
+        self._pending.append(record)
+        if len(self._pending) >= LATENCY_BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        turns, self._pending = self._pending, []
+        if not turns:
+            return
+        get_telemetry_spool(self._backend_url).append(
+            "/latency/turns/batch",
+            {
+                "session_id": self._session_id,
+                "agent_id": self._agent_id,
+                "stt_provider": self._stt_provider,
+                "turns": turns,
+            },
+        )
+        logger.debug(f"Spooled {len(turns)} turn latency record(s)")
+
+    def summary(self) -> dict[str, dict]:
+        return {
+            stage: {k: v for k, v in histogram.summary().items() if k != "buckets"}
+            for stage, histogram in self.histograms.items()
+            if histogram.count
+        }
@@ -1,20 +1,79 @@
 """
 Usage event logger for cost tracking.
 
-Sends STT, LLM, and TTS usage events to the backend API.
+Buffers STT, LLM, and TTS usage events per session and sends them to the
+backend in batches: every few seconds, as soon as a batch fills up, and once
+more when the session ends. The number of requests no longer grows with the
+number of turns in a call.
+
+Batches go through the telemetry spool, which handles delivery and retries;
+each event carries a client-generated ID so replays are not billed twice.
 All logging is fire-and-forget — failures are logged but never crash the call.
 """
 
 import asyncio
 import logging
+import os
+import uuid
 from typing import Any
 
-import httpx
+from telemetry_spool import get_telemetry_spool
 
 logger = logging.getLogger("usage-logger")
 
+USAGE_FLUSH_INTERVAL = float(os.environ.get("USAGE_FLUSH_INTERVAL", "5"))
+USAGE_BATCH_SIZE = int(os.environ.get("USAGE_BATCH_SIZE", "50"))
+
+
+class _UsageBuffer:
+    """Pending usage events for one session, flushed by a background task."""
+
+    def __init__(self, backend_url: str, session_id: str, user_id: str) -> None:
+        self._backend_url = backend_url
+        self._session_id = session_id
+        self._user_id = user_id
+        self._events: list[dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task: asyncio.Task | None = None
+
+    def add(self, event: dict[str, Any]) -> None:
+        self._events.append(event)
+        if len(self._events) >= USAGE_BATCH_SIZE:
+            self._wakeup.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"usage:{self._session_id}")
+
+    async def aclose(self) -> None:
+        """Stop the background task and send whatever is still buffered."""
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+        await self._flush()
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), USAGE_FLUSH_INTERVAL)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
 
-async def log_usage_event(
+    async def _flush(self) -> None:
+        events, self._events = self._events, []
+        if not events:
+            return
+        payload = {"session_id": self._session_id, "user_id": self._user_id, "events": events}
+        get_telemetry_spool(self._backend_url).append("/usage/events/batch", payload)
+        logger.debug(f"Spooled {len(events)} usage event(s)")
+
+
+_buffers: dict[str, _UsageBuffer] = {}
+
+
+def _buffer_usage_event(
     backend_url: str,
     session_id: str,
     user_id: str,
@@ -23,30 +82,23 @@ async def log_usage_event(
     provider: str,
     usage_data: dict[str, Any],
 ) -> None:
-    """Send a single usage event to the backend. Never raises."""
-    payload = {
-        "session_id": session_id,
-        "user_id": user_id,
+    buffer = _buffers.get(session_id)
+    if buffer is None:
+        buffer = _buffers[session_id] = _UsageBuffer(backend_url, session_id, user_id)
+    buffer.add({
+        "id": str(uuid.uuid4()),
         "agent_id": agent_id,
         "event_type": event_type,
         "provider": provider,
         "usage_data": usage_data,
-    }
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{backend_url}/usage/events",
-                json=payload,
-                timeout=5,
-            )
-            if response.status_code >= 400:
-                logger.warning(
-                    f"Usage event rejected: {response.status_code} {response.text}"
-                )
-            else:
-                logger.debug(f"Logged {event_type} usage event")
-    except Exception as e:
-        logger.warning(f"Failed to log {event_type} usage event: {e}")
+    })
+
+
+async def flush_usage_events(session_id: str) -> None:
+    """Send a session's remaining usage events. Call before ending the session."""
+    buffer = _buffers.pop(session_id, None)
+    if buffer is not None:
+        await buffer.aclose()
 
 
 def log_stt_usage(
@@ -57,17 +109,15 @@ def log_stt_usage(
     provider: str,
     audio_duration: float,
 ) -> None:
-    """Fire-and-forget: log STT minutes after transcription."""
-    asyncio.create_task(
-        log_usage_event(
-            backend_url=backend_url,
-            session_id=session_id,
-            user_id=user_id,
-            agent_id=agent_id,
-            event_type="stt_minutes",
-            provider=provider,
-            usage_data={"audio_duration_seconds": audio_duration},
-        )
+    """Buffer STT minutes after transcription."""
+    _buffer_usage_event(
+        backend_url=backend_url,
+        session_id=session_id,
+        user_id=user_id,
+        agent_id=agent_id,
+        event_type="stt_minutes",
+        provider=provider,
+        usage_data={"audio_duration_seconds": audio_duration},
     )
 
 
@@ -80,20 +130,18 @@ def log_llm_usage(
     input_tokens: int,
     output_tokens: int,
 ) -> None:
-    """Fire-and-forget: log LLM token usage after a response."""
-    asyncio.create_task(
-        log_usage_event(
-            backend_url=backend_url,
-            session_id=session_id,
-            user_id=user_id,
-            agent_id=agent_id,
-            event_type="llm_tokens",
-            provider=provider,
-            usage_data={
-                "input_tokens": input_tokens,
-                "output_tokens": output_tokens,
-            },
-        )
+    """Buffer LLM token usage after a response."""
+    _buffer_usage_event(
+        backend_url=backend_url,
+        session_id=session_id,
+        user_id=user_id,
+        agent_id=agent_id,
+        event_type="llm_tokens",
+        provider=provider,
+        usage_data={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        },
     )
 
 
@@ -105,15 +153,13 @@ def log_tts_usage(
     provider: str,
     character_count: int,
 ) -> None:
-    """Fire-and-forget: log TTS character usage after synthesis."""
-    asyncio.create_task(
-        log_usage_event(
-            backend_url=backend_url,
-            session_id=session_id,
-            user_id=user_id,
-            agent_id=agent_id,
-            event_type="tts_characters",
-            provider=provider,
-            usage_data={"character_count": character_count},
-        )
+    """Buffer TTS character usage after synthesis."""
+    _buffer_usage_event(
+        backend_url=backend_url,
+        session_id=session_id,
+        user_id=user_id,
+        agent_id=agent_id,
+        event_type="tts_characters",
+        provider=provider,
+        usage_data={"character_count": character_count},
     )
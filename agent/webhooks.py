@@ -0,0 +1,162 @@
+"""
+Customer webhooks called around a voice session.
+
+The pre-call webhook lets a customer's CRM inject variables (caller name,
+account tier, ...) into the agent's prompts. It is started as soon as the
+agent config is known and runs alongside the rest of call setup, but the
+greeting only waits for it up to a hard budget (PRE_CALL_BUDGET_SECONDS, or
+`budget_seconds` on the webhook config). If the budget passes, the call starts
+with a generic greeting and the variables are applied to the system prompt
+when the webhook eventually answers.
+
+Successful responses are cached per agent version and caller number for
+PRE_CALL_CACHE_TTL seconds (or `cache_ttl_seconds`), so repeat callers skip
+the round trip entirely. Each job runs in its own worker process, so the cache
+lives on disk (PRE_CALL_CACHE_DIR) where every job on the host can read it.
+
+Webhook requests share the pooled client used for function tools.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+from function_tools import get_tool_client
+from prompt_templates import compile_assignments
+from shared_cache import SharedCache
+
+logger = logging.getLogger("webhooks")
+
+PRE_CALL_BUDGET_SECONDS = float(os.environ.get("PRE_CALL_BUDGET_SECONDS", "1.5"))
+PRE_CALL_CACHE_TTL = float(os.environ.get("PRE_CALL_CACHE_TTL", "300"))
+PRE_CALL_CACHE_DIR = os.environ.get(
+    "PRE_CALL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "voxarena-pre-call")
+)
+PRE_CALL_FALLBACK_GREETING = os.environ.get(
+    "PRE_CALL_FALLBACK_GREETING", "Hello, thanks for calling. How can I help you today?"
+)
+
+# Caller entries kept in the pre-call response cache on disk
+_MAX_CACHED_CALLERS = 4096
+
+
+async def execute_webhook(url: str, method: str, headers: list, body: dict | None, timeout: int) -> dict | None:
+    """Execute a webhook request."""
+    if not url:
+        return None
+
+    try:
+        # Convert list of headers to dict
+        header_dict = {h["key"]: h["value"] for h in headers if h["key"]}
+
+        response = await get_tool_client().request(
+            method=method,
+            url=url,
+            headers=header_dict,
+            json=body,
+            timeout=timeout
+        )
+        response.raise_for_status()
+        if response.headers.get("content-type") == "application/json":
+            return response.json()
+        return None
+    except Exception as e:
+        logger.error(f"Webhook request failed to {url}: {e}")
+        raise e
+
+
+async def run_pre_call_webhook(
+    pre_call: dict,
+    agent_id: str | None,
+    room_name: str,
+    user_id: str | None,
+    caller_number: str | None = None,
+) -> dict[str, str]:
+    """Execute the pre-call webhook and return its variable assignments."""
+    logger.info("Executing pre-call webhook...")
+    variables: dict[str, str] = {}
+    try:
+        payload = {
+            "agent_id": agent_id,
+            "room_name": room_name,
+            "user_id": user_id,
+            "caller_number": caller_number,
+            "event": "pre_call"
+        }
+
+        response_data = await execute_webhook(
+            url=pre_call.get("url"),
+            method=pre_call.get("method", "GET"),
+            headers=pre_call.get("headers", []),
+            body=payload if pre_call.get("method") == "POST" else None,
+            timeout=pre_call.get("timeout", 5)
+        )
+
+        # Handle Assignments (dotted paths, e.g. key.subkey, compiled once per config)
+        if response_data and pre_call.get("assignments"):
+            variables = compile_assignments(pre_call["assignments"]).extract(response_data)
+            logger.info(f"Webhook assignments: {variables}")
+
+    except Exception as e:
+        logger.error(f"Pre-call webhook failed: {e}")
+    return variables
+
+
+_pre_call_cache = SharedCache(PRE_CALL_CACHE_DIR, _MAX_CACHED_CALLERS)
+
+
+class PreCallRequest:
+    """A pre-call webhook running in the background for one call."""
+
+    def __init__(self, task: asyncio.Future, budget: float) -> None:
+        self._task = task
+        self._deadline = time.monotonic() + budget
+
+    async def within_budget(self) -> dict[str, str] | None:
+        """Variables if the webhook answers within its budget, else None (still pending)."""
+        remaining = self._deadline - time.monotonic()
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._task), max(remaining, 0))
+        except TimeoutError:
+            logger.warning("Pre-call webhook missed its latency budget, starting the call without it")
+            return None
+
+    async def result(self) -> dict[str, str]:
+        """Variables once the webhook has finished, however long it takes."""
+        return await asyncio.shield(self._task)
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+
+def start_pre_call_webhook(
+    pre_call: dict,
+    agent_id: str | None,
+    version: str,
+    room_name: str,
+    user_id: str | None,
+    caller_number: str | None,
+) -> PreCallRequest:
+    """Start the pre-call webhook (or serve it from the per-caller cache)."""
+    budget = float(pre_call.get("budget_seconds") or PRE_CALL_BUDGET_SECONDS)
+    ttl = float(pre_call.get("cache_ttl_seconds", PRE_CALL_CACHE_TTL))
+    key = json.dumps([agent_id, version, caller_number]) if caller_number and ttl > 0 else None
+
+    async def run() -> dict[str, str]:
+        if key is not None:
+            cached = await _pre_call_cache.get(key)
+            if cached is not None:
+                logger.info(f"Pre-call variables served from cache for {caller_number}")
+                return cached[0]
+        variables = await run_pre_call_webhook(
+            pre_call, agent_id=agent_id, room_name=room_name, user_id=user_id, caller_number=caller_number
+        )
+        # Failures come back empty; don't pin them for the TTL
+        if key is not None and variables:
+            await _pre_call_cache.put(key, variables, ttl)
+        return variables
+
+    return PreCallRequest(asyncio.create_task(run(), name="pre-call-webhook"), budget)
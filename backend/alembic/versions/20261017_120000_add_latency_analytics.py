@@ -0,0 +1,58 @@
+"""add_latency_analytics
+
+Revision ID: d7a4e9c2b5f1
+Revises: b3f7c2e1d4a6
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a4e9c2b5f1'
+down_revision: Union[str, None] = 'b3f7c2e1d4a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Raw per-turn latency records
+    op.create_table(
+        'turn_latencies',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('stt_provider', sa.String(50), nullable=False),
+        sa.Column('eou_delay_ms', sa.Float(), nullable=True),
+        sa.Column('stt_final_ms', sa.Float(), nullable=True),
+        sa.Column('llm_ttft_ms', sa.Float(), nullable=True),
+        sa.Column('tts_ttfb_ms', sa.Float(), nullable=True),
+        sa.Column('first_audio_ms', sa.Float(), nullable=True),
+        sa.Column('tool_ms', sa.Float(), nullable=True),
+        sa.Column('interrupted', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('session_id', sa.String(36), sa.ForeignKey('voice_sessions.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('agent_id', sa.String(36), sa.ForeignKey('agents.id', ondelete='SET NULL'), nullable=True),
+    )
+    op.create_index('ix_turn_latencies_session_id', 'turn_latencies', ['session_id'])
+
+    # Pre-aggregated, mergeable latency histograms
+    op.create_table(
+        'latency_histogram_buckets',
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('agent_id', sa.String(36), nullable=False),
+        sa.Column('stt_provider', sa.String(50), nullable=False),
+        sa.Column('metric', sa.String(32), nullable=False),
+        sa.Column('bucket', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'agent_id', 'stt_provider', 'metric', 'bucket'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('latency_histogram_buckets')
+    op.drop_index('ix_turn_latencies_session_id', table_name='turn_latencies')
+    op.drop_table('turn_latencies')
@@ -0,0 +1,57 @@
+"""add_access_path_indexes
+
+Revision ID: e2c8f1a7b9d3
+Revises: d7a4e9c2b5f1
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c8f1a7b9d3'
+down_revision: Union[str, None] = 'd7a4e9c2b5f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns) for each composite index, matching the router queries
+INDEXES = [
+    # Transcript reads and call analysis: WHERE session_id = ? ORDER BY timestamp
+    ('ix_transcripts_session_id_timestamp', 'transcripts', ['session_id', 'timestamp']),
+    # Session list: WHERE user_id = ? ORDER BY created_at DESC
+    ('ix_voice_sessions_user_id_created_at', 'voice_sessions', ['user_id', sa.text('created_at DESC')]),
+    # Cost breakdown and aggregation: WHERE session_id = ? ORDER BY created_at
+    ('ix_usage_events_session_id_created_at', 'usage_events', ['session_id', 'created_at']),
+    # Cost summary and timeline: WHERE user_id = ? AND created_at >= ?
+    ('ix_usage_events_user_id_created_at', 'usage_events', ['user_id', 'created_at']),
+    # Agent list: WHERE user_id = ? AND is_active ORDER BY created_at DESC
+    ('ix_agents_user_id_is_active_created_at', 'agents', ['user_id', 'is_active', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and does not
+    # block writes while it builds. A build that fails part-way leaves an
+    # INVALID index behind, so any leftover is dropped before building again.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+        # Covered by the leading column of ix_usage_events_user_id_created_at
+        op.drop_index(
+            'ix_usage_events_user_id', table_name='usage_events', if_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_usage_events_user_id', 'usage_events', ['user_id'], if_not_exists=True, postgresql_concurrently=True
+        )
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
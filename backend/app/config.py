@@ -8,6 +8,14 @@ class Settings(BaseSettings):
     postgres_password: str = ""
     database_url: str = ""
     db_host: str = "localhost"
+    db_echo: bool = False  # Log every SQL statement (development only)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0  # Seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # Seconds before a connection is replaced
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 30000  # 0 disables (PostgreSQL only)
+    db_metrics_enabled: bool = False  # Serve pool metrics at /health/db (internal deployments)
 
     # LiveKit
     livekit_api_key: str = ""
@@ -37,6 +45,20 @@ class Settings(BaseSettings):
         """Parse frontend_url into a list of allowed origins."""
         return [u.strip() for u in self.frontend_url.split(",") if u.strip()]
 
+    @property
+    def async_database_url(self) -> str:
+        """database_url with the async driver (asyncpg / aiosqlite) for the API engine."""
+        url = self.database_url
+        for sync_prefix, async_prefix in (
+            ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+            ("postgresql://", "postgresql+asyncpg://"),
+            ("postgres://", "postgresql+asyncpg://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+        ):
+            if url.startswith(sync_prefix):
+                return async_prefix + url[len(sync_prefix):]
+        return url
+
     @model_validator(mode="after")
     def build_database_url(self):
         if not self.database_url:
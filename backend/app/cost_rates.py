@@ -11,6 +11,8 @@ Pricing sources (last verified Feb 2026):
 - Gemini 2.5 Flash: $0.30/1M input, $2.50/1M output → https://ai.google.dev/gemini-api/docs/pricing
 - Resemble AI: $40/1M chars → https://www.resemble.ai/pricing/
 """
+from dataclasses import dataclass
+from datetime import datetime
 from decimal import Decimal
 
 # STT rates: cost per minute of audio
@@ -27,11 +29,42 @@ LLM_RATES: dict[str, Decimal] = {
     "gemini": Decimal("0.00086"),        # blended ~$0.86/1M tokens
 }
 
+# LLM rates: cost per 1K tokens, (input, output). Used when the usage payload
+# has separate input/output counts; LLM_RATES remains the blended fallback.
+LLM_TOKEN_RATES: dict[str, tuple[Decimal, Decimal]] = {
+    "gemini": (Decimal("0.0003"), Decimal("0.0025")),
+}
+
 # TTS rates: cost per character
 TTS_RATES: dict[str, Decimal] = {
     "resemble": Decimal("0.00004"),      # $40/1M characters
 }
 
+# Provider names reported by the agent worker → rate table keys
+PROVIDER_ALIASES: dict[str, str] = {
+    "google": "gemini",
+}
+
+
+@dataclass(frozen=True)
+class RateOverride:
+    """A rate change taking effect at a point in time (UTC).
+
+    For llm_tokens, set input_rate/output_rate (per 1K tokens); unit_cost is
+    the blended per-1K rate. For other event types only unit_cost is used.
+    """
+    event_type: str
+    provider: str
+    effective_from: datetime
+    unit_cost: Decimal
+    input_rate: Decimal | None = None
+    output_rate: Decimal | None = None
+
+
+# Effective-dated rate changes, applied on top of the base rates above, e.g.
+# RateOverride("tts_characters", "resemble", datetime(2026, 7, 1), Decimal("0.00003"))
+RATE_OVERRIDES: list[RateOverride] = []
+
 # Unified lookup: event_type → { provider → rate }
 COST_RATES: dict[str, dict[str, Decimal]] = {
     "stt_minutes": STT_RATES,
@@ -50,4 +83,5 @@ def get_unit_cost(event_type: str, provider: str) -> Decimal | None:
     rates = COST_RATES.get(event_type)
     if rates is None:
         return None
-    return rates.get(provider.lower())
+    provider = provider.lower()
+    return rates.get(PROVIDER_ALIASES.get(provider, provider))
@@ -1,20 +1,163 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import time
+from collections import Counter
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import get_settings
+from app.services.latency_histograms import bucket_index, quantiles
 
 settings = get_settings()
 
-engine = create_engine(settings.database_url, echo=settings.debug)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class PoolMetrics:
+    """Connection pool counters for telling pool exhaustion apart from a slow database.
+
+    - checkout wait: time a request waited for a connection (grows when the pool is exhausted)
+    - connection hold: time a connection stayed checked out (grows when queries are slow)
+    - churn: connections opened, closed and invalidated (recycle, pre-ping failures)
+
+    Wait and hold times are kept as mergeable log-bucket histograms in microseconds.
+    """
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.peak_checked_out = 0
+        self.opened = 0
+        self.closed = 0
+        self.invalidated = 0
+        self._wait_us: Counter = Counter()
+        self._hold_us: Counter = Counter()
+        self._max_wait_us = 0.0
+        self._max_hold_us = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        us = seconds * 1_000_000
+        self._wait_us[bucket_index(us)] += 1
+        self._max_wait_us = max(self._max_wait_us, us)
+
+    def record_hold(self, seconds: float) -> None:
+        us = seconds * 1_000_000
+        self._hold_us[bucket_index(us)] += 1
+        self._max_hold_us = max(self._max_hold_us, us)
+
+    def summary(self, pool) -> dict:
+        checked_out = pool.checkedout()
+        capacity = pool.size() + max(settings.db_max_overflow, 0)
+        return {
+            "pool": {
+                "size": pool.size(),
+                "max_overflow": settings.db_max_overflow,
+                "checked_out": checked_out,
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "utilization": round(checked_out / capacity, 3) if capacity else None,
+                "peak_checked_out": self.peak_checked_out,
+            },
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "checkout_wait_ms": _summarize(self._wait_us, self._max_wait_us),
+            "connection_hold_ms": _summarize(self._hold_us, self._max_hold_us),
+            "churn": {"opened": self.opened, "closed": self.closed, "invalidated": self.invalidated},
+        }
+
+
+def _summarize(counts: Counter, max_us: float) -> dict:
+    p50, p95, p99 = quantiles(counts, (0.5, 0.95, 0.99)).values()
+    return {
+        "count": sum(counts.values()),
+        "p50": _ms(p50),
+        "p95": _ms(p95),
+        "p99": _ms(p99),
+        "max": _ms(max_us) if counts else None,
+    }
+
+
+def _ms(us: float | None) -> float | None:
+    return round(us / 1000, 3) if us is not None else None
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that times how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.checkout_timeouts += 1
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start)
+        pool_metrics.peak_checked_out = max(pool_metrics.peak_checked_out, self.checkedout())
+        return record
+
+
+def _connect_args() -> dict:
+    # Per-statement timeout is enforced by PostgreSQL itself
+    if settings.async_database_url.startswith("postgresql") and settings.db_statement_timeout_ms > 0:
+        return {"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}}
+    return {}
+
+
+# The API runs on an async engine so queries never block the event loop.
+# Alembic builds its own sync engine from settings.database_url.
+engine = create_async_engine(
+    settings.async_database_url,
+    echo=settings.db_echo,
+    poolclass=InstrumentedPool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    connect_args=_connect_args(),
+)
+AsyncSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.opened += 1
+
+
+@event.listens_for(engine.sync_engine, "close")
+def _on_close(dbapi_connection, connection_record):
+    pool_metrics.closed += 1
+
+
+@event.listens_for(engine.sync_engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.invalidated += 1
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.checkouts += 1
+    connection_record.info["checked_out_at"] = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    checked_out_at = connection_record.info.pop("checked_out_at", None)
+    if checked_out_at is not None:
+        pool_metrics.record_hold(time.perf_counter() - checked_out_at)
+
+
+def get_pool_metrics() -> dict:
+    """Current pool state plus wait, hold and churn metrics since startup."""
+    return pool_metrics.summary(engine.sync_engine.pool)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -1,7 +1,10 @@
-from fastapi import FastAPI
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
-from app.routers import agents, sessions, livekit, telephony, resemble, calls, usage, costs
+from app.database import get_pool_metrics
+from app.routers import agents, sessions, livekit, telephony, resemble, calls, usage, costs, latency
 
 settings = get_settings()
 
@@ -29,6 +32,7 @@ app.include_router(resemble.router, prefix="/api/resemble", tags=["Resemble"])
 app.include_router(calls.router, prefix="/api/calls", tags=["Calls"])
 app.include_router(usage.router, prefix="/api/usage", tags=["Usage"])
 app.include_router(costs.router, prefix="/api/costs", tags=["Costs"])
+app.include_router(latency.router, prefix="/api/latency", tags=["Latency"])
 
 
 @app.get("/health")
@@ -36,6 +40,20 @@ async def health_check():
     return {"status": "ok", "service": "voxarena-api"}
 
 
+@app.get("/health/db")
+async def db_pool_health(x_user_id: Optional[str] = Header(None)):
+    """Connection pool utilization, checkout wait, connection hold time and churn.
+
+    Off unless DB_METRICS_ENABLED is set, and even then only for authenticated
+    callers, so pool internals are never served to the public internet.
+    """
+    if not settings.db_metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_user_id:
+        raise HTTPException(status_code=401, detail="User ID required")
+    return get_pool_metrics()
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to VoxArena API", "docs": "/docs"}
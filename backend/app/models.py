@@ -1,5 +1,5 @@
-from datetime import datetime
-from sqlalchemy import String, Text, Boolean, DateTime, Integer, Numeric, ForeignKey, Enum, Index, JSON
+from datetime import date, datetime
+from sqlalchemy import String, Text, Boolean, Date, DateTime, Float, Integer, Numeric, ForeignKey, Enum, Index, JSON, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from decimal import Decimal
 import enum
@@ -68,6 +68,9 @@ class User(Base):
 
 class Agent(Base):
     __tablename__ = "agents"
+    __table_args__ = (
+        Index("ix_agents_user_id_is_active_created_at", "user_id", "is_active", "created_at"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     name: Mapped[str] = mapped_column(String(100))
@@ -92,6 +95,9 @@ class Agent(Base):
 
 class VoiceSession(Base):
     __tablename__ = "voice_sessions"
+    __table_args__ = (
+        Index("ix_voice_sessions_user_id_created_at", "user_id", text("created_at DESC")),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     room_name: Mapped[str] = mapped_column(String(255), unique=True, index=True)
@@ -131,6 +137,9 @@ class VoiceSession(Base):
 
 class Transcript(Base):
     __tablename__ = "transcripts"
+    __table_args__ = (
+        Index("ix_transcripts_session_id_timestamp", "session_id", "timestamp"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     content: Mapped[str] = mapped_column(Text)
@@ -149,7 +158,8 @@ class Transcript(Base):
 class UsageEvent(Base):
     __tablename__ = "usage_events"
     __table_args__ = (
-        Index("ix_usage_events_user_id", "user_id"),
+        Index("ix_usage_events_user_id_created_at", "user_id", "created_at"),
+        Index("ix_usage_events_session_id_created_at", "session_id", "created_at"),
         Index("ix_usage_events_agent_id", "agent_id"),
         Index("ix_usage_events_created_at", "created_at"),
     )
@@ -177,3 +187,52 @@ class UsageEvent(Base):
     session: Mapped["VoiceSession"] = relationship(back_populates="usage_events")
     user: Mapped["User"] = relationship()
     agent: Mapped["Agent | None"] = relationship()
+
+
+class TurnLatency(Base):
+    """One agent reply's latency breakdown, as measured by the agent worker."""
+    __tablename__ = "turn_latencies"
+    __table_args__ = (
+        Index("ix_turn_latencies_session_id", "session_id"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    stt_provider: Mapped[str] = mapped_column(String(50))
+    eou_delay_ms: Mapped[float | None] = mapped_column(Float, nullable=True)
+    stt_final_ms: Mapped[float | None] = mapped_column(Float, nullable=True)
+    llm_ttft_ms: Mapped[float | None] = mapped_column(Float, nullable=True)
+    tts_ttfb_ms: Mapped[float | None] = mapped_column(Float, nullable=True)
+    first_audio_ms: Mapped[float | None] = mapped_column(Float, nullable=True)
+    tool_ms: Mapped[float | None] = mapped_column(Float, nullable=True)
+    interrupted: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    # Foreign keys
+    session_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("voice_sessions.id", ondelete="CASCADE")
+    )
+    user_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("users.id", ondelete="CASCADE")
+    )
+    agent_id: Mapped[str | None] = mapped_column(
+        String(36), ForeignKey("agents.id", ondelete="SET NULL"), nullable=True
+    )
+
+
+class LatencyHistogramBucket(Base):
+    """Pre-aggregated turn latency counts per user, agent, STT provider, day and metric.
+
+    Buckets are logarithmic (see app.services.latency_histograms) and mergeable
+    by summing counts. agent_id is "" for turns without an agent.
+    """
+    __tablename__ = "latency_histogram_buckets"
+
+    user_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    agent_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    stt_provider: Mapped[str] = mapped_column(String(50), primary_key=True)
+    metric: Mapped[str] = mapped_column(String(32), primary_key=True)
+    bucket: Mapped[int] = mapped_column(Integer, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
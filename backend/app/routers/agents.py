@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import uuid
 
@@ -10,9 +11,9 @@ from app.schemas import AgentCreate, AgentUpdate, AgentResponse
 router = APIRouter()
 
 
-def get_or_create_user(db: Session, clerk_id: str) -> User:
+async def get_or_create_user(db: AsyncSession, clerk_id: str) -> User:
     """Get or create a user by Clerk ID."""
-    user = db.query(User).filter(User.clerk_id == clerk_id).first()
+    user = await db.scalar(select(User).where(User.clerk_id == clerk_id))
     if not user:
         user = User(
             id=str(uuid.uuid4()),
@@ -20,41 +21,62 @@ def get_or_create_user(db: Session, clerk_id: str) -> User:
             email=f"{clerk_id}@placeholder.com",
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     return user
 
 
+def agent_etag(agent: Agent) -> str:
+    """Validator for an agent row; changes whenever the agent is updated."""
+    return f'W/"{agent.id}-{agent.updated_at.timestamp():.6f}"'
+
+
 @router.get("/", response_model=list[AgentResponse])
 async def get_agents(
     x_user_id: Optional[str] = Header(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Get all agents for the authenticated user."""
     if not x_user_id:
         raise HTTPException(status_code=401, detail="User ID required")
     
-    user = db.query(User).filter(User.clerk_id == x_user_id).first()
+    user = await db.scalar(select(User).where(User.clerk_id == x_user_id))
     if not user:
         return []
     
-    agents = db.query(Agent).filter(Agent.user_id == user.id, Agent.is_active == True).order_by(Agent.created_at.desc()).all()
-    return agents
+    agents = await db.scalars(
+        select(Agent).where(Agent.user_id == user.id, Agent.is_active == True).order_by(Agent.created_at.desc())
+    )
+    return agents.all()
 
 
 @router.get("/{agent_id}", response_model=AgentResponse)
-async def get_agent(agent_id: str, db: Session = Depends(get_db)):
-    """Get a single agent by ID."""
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+async def get_agent(
+    agent_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get a single agent by ID.
+
+    Sends an ETag so the agent worker can revalidate its cached config with
+    If-None-Match and get a bodyless 304 when nothing changed.
+    """
+    agent = await db.get(Agent, agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
+
+    etag = agent_etag(agent)
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return agent
 
 
 @router.post("/", response_model=AgentResponse, status_code=201)
-async def create_agent(agent_data: AgentCreate, db: Session = Depends(get_db)):
+async def create_agent(agent_data: AgentCreate, db: AsyncSession = Depends(get_db)):
     """Create a new agent."""
-    user = get_or_create_user(db, agent_data.user_id)
+    user = await get_or_create_user(db, agent_data.user_id)
     
     agent = Agent(
         id=str(uuid.uuid4()),
@@ -65,8 +87,8 @@ async def create_agent(agent_data: AgentCreate, db: Session = Depends(get_db)):
         user_id=user.id,
     )
     db.add(agent)
-    db.commit()
-    db.refresh(agent)
+    await db.commit()
+    await db.refresh(agent)
     return agent
 
 
@@ -74,10 +96,10 @@ async def create_agent(agent_data: AgentCreate, db: Session = Depends(get_db)):
 async def update_agent(
     agent_id: str,
     agent_data: AgentUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Update an agent."""
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    agent = await db.get(Agent, agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     
@@ -85,19 +107,19 @@ async def update_agent(
     for field, value in update_data.items():
         setattr(agent, field, value)
     
-    db.commit()
-    db.refresh(agent)
+    await db.commit()
+    await db.refresh(agent)
     return agent
 
 
 @router.delete("/{agent_id}", status_code=204)
-async def delete_agent(agent_id: str, db: Session = Depends(get_db)):
+async def delete_agent(agent_id: str, db: AsyncSession = Depends(get_db)):
     """Soft delete an agent (sets is_active to False)."""
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    agent = await db.get(Agent, agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     
     # Soft delete: mark as inactive instead of removing
     agent.is_active = False
-    db.commit()
+    await db.commit()
     return None
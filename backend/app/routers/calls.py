@@ -10,10 +10,11 @@ import uuid
 from datetime import datetime
 
 from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db
 from app.models import (
     Agent,
     CallDirection,
@@ -45,21 +46,17 @@ async def _timeout_no_answer(session_id: str, timeout_seconds: int = 60) -> None
     """Background task: mark call as NO_ANSWER if still RINGING after timeout."""
     await asyncio.sleep(timeout_seconds)
 
-    from app.database import SessionLocal
-
-    db = SessionLocal()
     try:
-        session = db.query(VoiceSession).filter(VoiceSession.id == session_id).first()
-        if session and session.call_status == CallStatus.RINGING:
-            session.call_status = CallStatus.NO_ANSWER
-            session.status = SessionStatus.FAILED
-            session.ended_at = datetime.utcnow()
-            db.commit()
-            logger.info(f"Call {session_id} timed out — marked as NO_ANSWER")
+        async with AsyncSessionLocal() as db:
+            session = await db.get(VoiceSession, session_id)
+            if session and session.call_status == CallStatus.RINGING:
+                session.call_status = CallStatus.NO_ANSWER
+                session.status = SessionStatus.FAILED
+                session.ended_at = datetime.utcnow()
+                await db.commit()
+                logger.info(f"Call {session_id} timed out — marked as NO_ANSWER")
     except Exception:
         logger.exception(f"Error in timeout handler for call {session_id}")
-    finally:
-        db.close()
 
 
 @router.post("/outbound", response_model=OutboundCallResponse, status_code=201)
@@ -67,7 +64,7 @@ async def create_outbound_call(
     request: OutboundCallRequest,
     background_tasks: BackgroundTasks,
     x_user_id: str = Header(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Initiate an outbound phone call via LiveKit SIP.
 
@@ -85,19 +82,17 @@ async def create_outbound_call(
         raise HTTPException(status_code=500, detail="LiveKit URL not configured")
 
     # --- Authenticate user ---
-    user = db.query(User).filter(User.clerk_id == x_user_id).first()
+    user = await db.scalar(select(User).where(User.clerk_id == x_user_id))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
     # --- Validate agent belongs to user ---
-    agent = (
-        db.query(Agent)
-        .filter(
+    agent = await db.scalar(
+        select(Agent).where(
             Agent.id == request.agent_id,
             Agent.user_id == user.id,
             Agent.is_active == True,
         )
-        .first()
     )
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found or does not belong to user")
@@ -119,8 +114,8 @@ async def create_outbound_call(
         started_at=datetime.utcnow(),
     )
     db.add(session)
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
 
     # --- Create LiveKit room & dial via SIP ---
     try:
@@ -158,7 +153,7 @@ async def create_outbound_call(
         session.call_status = CallStatus.FAILED
         session.status = SessionStatus.FAILED
         session.ended_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
         logger.error(f"Failed to initiate outbound call: {e}")
         raise HTTPException(status_code=502, detail=f"Failed to initiate call: {str(e)}")
 
@@ -175,10 +170,10 @@ async def create_outbound_call(
 @router.get("/{call_id}/status", response_model=CallStatusResponse)
 async def get_call_status(
     call_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Get the current status of a call."""
-    session = db.query(VoiceSession).filter(VoiceSession.id == call_id).first()
+    session = await db.get(VoiceSession, call_id)
     if not session:
         raise HTTPException(status_code=404, detail="Call not found")
 
@@ -3,8 +3,8 @@ from decimal import Decimal
 from collections import defaultdict
 
 from fastapi import APIRouter, Depends, HTTPException, Header, Query
-from sqlalchemy import func, cast, Date
-from sqlalchemy.orm import Session
+from sqlalchemy import func, cast, select, Date
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from app.database import get_db
@@ -20,49 +20,46 @@ from app.schemas import (
 router = APIRouter()
 
 
-def _resolve_user(db: Session, clerk_id: str) -> User | None:
-    return db.query(User).filter(User.clerk_id == clerk_id).first()
+async def _resolve_user(db: AsyncSession, clerk_id: str) -> User | None:
+    return await db.scalar(select(User).where(User.clerk_id == clerk_id))
 
 
 @router.get("/summary", response_model=CostSummaryResponse)
 async def get_cost_summary(
     x_user_id: Optional[str] = Header(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Total cost, this month's cost, and cost broken down by provider."""
     if not x_user_id:
         raise HTTPException(status_code=401, detail="User ID required")
 
-    user = _resolve_user(db, x_user_id)
+    user = await _resolve_user(db, x_user_id)
     if not user:
         return CostSummaryResponse(
             total_cost=Decimal("0"), this_month_cost=Decimal("0"), by_provider={}
         )
 
     # Total cost (all time)
-    total_row = (
-        db.query(func.coalesce(func.sum(UsageEvent.total_cost), 0))
-        .filter(UsageEvent.user_id == user.id)
-        .scalar()
+    total_row = await db.scalar(
+        select(func.coalesce(func.sum(UsageEvent.total_cost), 0))
+        .where(UsageEvent.user_id == user.id)
     )
     total_cost = Decimal(str(total_row))
 
     # This month
     now = datetime.utcnow()
     month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    month_row = (
-        db.query(func.coalesce(func.sum(UsageEvent.total_cost), 0))
-        .filter(UsageEvent.user_id == user.id, UsageEvent.created_at >= month_start)
-        .scalar()
+    month_row = await db.scalar(
+        select(func.coalesce(func.sum(UsageEvent.total_cost), 0))
+        .where(UsageEvent.user_id == user.id, UsageEvent.created_at >= month_start)
     )
     this_month_cost = Decimal(str(month_row))
 
     # By provider
-    provider_rows = (
-        db.query(UsageEvent.provider, func.sum(UsageEvent.total_cost))
-        .filter(UsageEvent.user_id == user.id)
+    provider_rows = await db.execute(
+        select(UsageEvent.provider, func.sum(UsageEvent.total_cost))
+        .where(UsageEvent.user_id == user.id)
         .group_by(UsageEvent.provider)
-        .all()
     )
     by_provider = {row[0]: Decimal(str(row[1])) for row in provider_rows}
 
@@ -79,40 +76,39 @@ async def get_cost_timeline(
     period: str = Query("daily", pattern="^(daily|weekly|monthly)$"),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Cost over time, grouped by day/week/month."""
     if not x_user_id:
         raise HTTPException(status_code=401, detail="User ID required")
 
-    user = _resolve_user(db, x_user_id)
+    user = await _resolve_user(db, x_user_id)
     if not user:
         return []
 
-    query = db.query(
+    query = select(
         cast(UsageEvent.created_at, Date).label("date"),
         UsageEvent.provider,
         func.sum(UsageEvent.total_cost).label("cost"),
-    ).filter(UsageEvent.user_id == user.id)
+    ).where(UsageEvent.user_id == user.id)
 
     if start_date:
         try:
             start_dt = datetime.fromisoformat(start_date.replace("Z", "+00:00")).replace(tzinfo=None)
-            query = query.filter(UsageEvent.created_at >= start_dt)
+            query = query.where(UsageEvent.created_at >= start_dt)
         except ValueError:
             pass
 
     if end_date:
         try:
             end_dt = datetime.fromisoformat(end_date.replace("Z", "+00:00")).replace(tzinfo=None)
-            query = query.filter(UsageEvent.created_at <= end_dt)
+            query = query.where(UsageEvent.created_at <= end_dt)
         except ValueError:
             pass
 
-    rows = (
+    rows = await db.execute(
         query.group_by(cast(UsageEvent.created_at, Date), UsageEvent.provider)
         .order_by(cast(UsageEvent.created_at, Date))
-        .all()
     )
 
     # Aggregate by date
@@ -135,31 +131,30 @@ async def get_cost_timeline(
 @router.get("/by-agent", response_model=list[AgentCostResponse])
 async def get_cost_by_agent(
     x_user_id: Optional[str] = Header(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Cost aggregated per agent."""
     if not x_user_id:
         raise HTTPException(status_code=401, detail="User ID required")
 
-    user = _resolve_user(db, x_user_id)
+    user = await _resolve_user(db, x_user_id)
     if not user:
         return []
 
-    rows = (
-        db.query(
+    rows = await db.execute(
+        select(
             UsageEvent.agent_id,
             func.sum(UsageEvent.total_cost).label("total_cost"),
             func.count(func.distinct(UsageEvent.session_id)).label("session_count"),
             func.count(UsageEvent.id).label("event_count"),
         )
-        .filter(UsageEvent.user_id == user.id, UsageEvent.agent_id.isnot(None))
+        .where(UsageEvent.user_id == user.id, UsageEvent.agent_id.isnot(None))
         .group_by(UsageEvent.agent_id)
-        .all()
     )
 
     result = []
     for agent_id, total_cost, session_count, event_count in rows:
-        agent = db.query(Agent).filter(Agent.id == agent_id).first()
+        agent = await db.get(Agent, agent_id)
         agent_name = agent.name if agent else "Unknown"
         result.append(
             AgentCostResponse(
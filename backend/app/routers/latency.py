@@ -0,0 +1,215 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models import Agent, LatencyHistogramBucket, TurnLatency, User, VoiceSession
+from app.schemas import (
+    LatencyGroupResponse,
+    LatencyPercentiles,
+    TurnLatencyBatchCreate,
+    TurnLatencyBatchResponse,
+)
+from app.services.latency_histograms import (
+    METRIC_END_TO_END,
+    METRIC_TIME_TO_FIRST_AUDIO,
+    bucket_index,
+    quantiles,
+    turn_metrics,
+)
+
+router = APIRouter()
+
+_DIALECT_INSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+_HISTOGRAM_KEY = ("user_id", "day", "agent_id", "stt_provider", "metric", "bucket")
+
+
+async def _resolve_user(db: AsyncSession, clerk_id: str) -> User | None:
+    return await db.scalar(select(User).where(User.clerk_id == clerk_id))
+
+
+async def _add_to_histograms(db: AsyncSession, rows: list[dict]) -> None:
+    """Increment histogram bucket counts, creating buckets on first use."""
+    stmt = _DIALECT_INSERT[db.bind.dialect.name](LatencyHistogramBucket)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(_HISTOGRAM_KEY),
+        set_={"count": LatencyHistogramBucket.count + stmt.excluded.count},
+    )
+    await db.execute(stmt, rows)
+
+
+@router.post("/turns/batch", response_model=TurnLatencyBatchResponse, status_code=201)
+async def create_turn_latencies_batch(
+    batch: TurnLatencyBatchCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    """Store a batch of per-turn latency records from the agent worker.
+
+    Raw records are kept for per-call drill-down, and each one is folded into
+    the daily histogram buckets that the percentile endpoints read. Records
+    whose ID is already stored are skipped, so a replayed batch is not
+    counted twice.
+    """
+    user_id = await db.scalar(select(VoiceSession.user_id).where(VoiceSession.id == batch.session_id))
+    if not user_id:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if not batch.turns:
+        return TurnLatencyBatchResponse(inserted=0)
+
+    client_ids = [turn.id for turn in batch.turns if turn.id]
+    existing = set()
+    if client_ids:
+        existing = set(await db.scalars(select(TurnLatency.id).where(TurnLatency.id.in_(client_ids))))
+
+    now = datetime.utcnow()
+    rows = []
+    increments: Counter = Counter()
+    for turn in batch.turns:
+        if turn.id in existing:
+            continue
+        created_at = turn.created_at or now
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        rows.append({
+            "id": turn.id or str(uuid.uuid4()),
+            "session_id": batch.session_id,
+            "user_id": user_id,
+            "agent_id": batch.agent_id,
+            "stt_provider": batch.stt_provider,
+            "eou_delay_ms": turn.eou_delay_ms,
+            "stt_final_ms": turn.stt_final_ms,
+            "llm_ttft_ms": turn.llm_ttft_ms,
+            "tts_ttfb_ms": turn.tts_ttfb_ms,
+            "first_audio_ms": turn.first_audio_ms,
+            "tool_ms": turn.tool_ms,
+            "interrupted": turn.interrupted,
+            "created_at": created_at,
+        })
+        for metric, value in turn_metrics(turn.first_audio_ms, turn.eou_delay_ms).items():
+            increments[(created_at.date(), metric, bucket_index(value))] += 1
+
+    if not rows:
+        return TurnLatencyBatchResponse(inserted=0)
+
+    await db.execute(insert(TurnLatency), rows)
+    if increments:
+        await _add_to_histograms(db, [
+            {
+                "user_id": user_id,
+                "day": day,
+                "agent_id": batch.agent_id or "",
+                "stt_provider": batch.stt_provider,
+                "metric": metric,
+                "bucket": bucket,
+                "count": count,
+            }
+            for (day, metric, bucket), count in increments.items()
+        ])
+    await db.commit()
+    return TurnLatencyBatchResponse(inserted=len(rows))
+
+
+def _parse_day(value: Optional[str]):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).date()
+    except ValueError:
+        return None
+
+
+def _summarize(counts: dict[int, int]) -> LatencyPercentiles:
+    p50, p95, p99 = quantiles(counts, (0.5, 0.95, 0.99)).values()
+    return LatencyPercentiles(samples=sum(counts.values()), p50=p50, p95=p95, p99=p99)
+
+
+async def _latency_by(
+    db: AsyncSession,
+    x_user_id: Optional[str],
+    group_column,
+    start_date: Optional[str],
+    end_date: Optional[str],
+) -> list[tuple[str, dict[str, dict[int, int]]]]:
+    """Merge histogram buckets per group and metric, in SQL, for the caller's account."""
+    if not x_user_id:
+        raise HTTPException(status_code=401, detail="User ID required")
+    user = await _resolve_user(db, x_user_id)
+    if not user:
+        return []
+
+    query = select(
+        group_column,
+        LatencyHistogramBucket.metric,
+        LatencyHistogramBucket.bucket,
+        func.sum(LatencyHistogramBucket.count),
+    ).where(LatencyHistogramBucket.user_id == user.id)
+    if start := _parse_day(start_date):
+        query = query.where(LatencyHistogramBucket.day >= start)
+    if end := _parse_day(end_date):
+        query = query.where(LatencyHistogramBucket.day <= end)
+    rows = await db.execute(query.group_by(
+        group_column, LatencyHistogramBucket.metric, LatencyHistogramBucket.bucket
+    ))
+
+    groups: dict[str, dict[str, dict[int, int]]] = defaultdict(lambda: defaultdict(dict))
+    for key, metric, bucket, count in rows:
+        groups[str(key)][metric][bucket] = int(count)
+    return sorted(groups.items())
+
+
+def _group_response(key: str, metrics: dict[str, dict[int, int]], name: Optional[str] = None):
+    return LatencyGroupResponse(
+        key=key,
+        name=name,
+        time_to_first_audio=_summarize(metrics.get(METRIC_TIME_TO_FIRST_AUDIO, {})),
+        end_to_end=_summarize(metrics.get(METRIC_END_TO_END, {})),
+    )
+
+
+@router.get("/by-agent", response_model=list[LatencyGroupResponse])
+async def get_latency_by_agent(
+    x_user_id: Optional[str] = Header(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """p50/p95/p99 turn latency per agent."""
+    groups = await _latency_by(db, x_user_id, LatencyHistogramBucket.agent_id, start_date, end_date)
+    agent_ids = [key for key, _ in groups if key]
+    names = {}
+    if agent_ids:
+        names = dict((await db.execute(select(Agent.id, Agent.name).where(Agent.id.in_(agent_ids)))).all())
+    return [
+        _group_response(key, metrics, names.get(key, "Unknown"))
+        for key, metrics in groups
+    ]
+
+
+@router.get("/by-stt-provider", response_model=list[LatencyGroupResponse])
+async def get_latency_by_stt_provider(
+    x_user_id: Optional[str] = Header(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """p50/p95/p99 turn latency per STT provider."""
+    groups = await _latency_by(db, x_user_id, LatencyHistogramBucket.stt_provider, start_date, end_date)
+    return [_group_response(key, metrics) for key, metrics in groups]
+
+
+@router.get("/timeline", response_model=list[LatencyGroupResponse])
+async def get_latency_timeline(
+    x_user_id: Optional[str] = Header(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """p50/p95/p99 turn latency per day."""
+    groups = await _latency_by(db, x_user_id, LatencyHistogramBucket.day, start_date, end_date)
+    return [_group_response(key, metrics) for key, metrics in groups]
@@ -1,7 +1,11 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import base64
+import json
+import logging
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import uuid
 
@@ -9,14 +13,22 @@ from decimal import Decimal
 
 from app.database import get_db
 from app.config import get_settings
-from app.models import VoiceSession, UsageEvent, User, Transcript, SessionStatus, TransferType
+from app.models import Agent, VoiceSession, UsageEvent, User, Transcript, SessionStatus, TransferType
 from app.schemas import (
+    AgentResponse,
+    SessionBootstrapRequest,
+    SessionBootstrapResponse,
     VoiceSessionCreate,
     VoiceSessionUpdate,
     VoiceSessionResponse,
+    VoiceSessionListItem,
+    VoiceSessionListResponse,
     TranscriptCreate,
     TranscriptCreateByRoom,
     TranscriptResponse,
+    TranscriptBatchCreate,
+    TranscriptBatchResponse,
+    SessionEndRequest,
     SessionCostBreakdownResponse,
     UsageEventResponse,
     TransferRequest,
@@ -25,44 +37,137 @@ from app.schemas import (
 from app.services.call_analysis import analyze_call
 from app.services.cost_aggregation import aggregate_session_cost
 from app.services.call_transfer import validate_e164, cold_transfer, warm_transfer
+from app.routers.telephony import find_agent_by_phone
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-def get_or_create_user(db: Session, clerk_id: str) -> User:
-    """Get or create a user by Clerk ID."""
-    user = db.query(User).filter(User.clerk_id == clerk_id).first()
+async def resolve_session_user(db: AsyncSession, user_id: str) -> User:
+    """Resolve the owner of a new session without committing.
+
+    user_id can be either:
+    - A Clerk ID (browser sessions): looked up, or created if missing
+    - An internal DB user UUID (SIP sessions): looked up directly by primary key
+
+    A newly created user is only flushed, so it commits together with the session.
+    """
+    # Check if the incoming user_id is an internal DB UUID (36-char UUID format)
+    # vs a Clerk ID (e.g. "user_2abc..." or "sip-caller")
+    if len(user_id) == 36 and user_id.count('-') == 4:
+        # Looks like a UUID — try to find the user by internal primary key first
+        user = await db.get(User, user_id)
+        if user:
+            return user
+
+    # Fall back to Clerk ID lookup / creation
+    user = await db.scalar(select(User).where(User.clerk_id == user_id))
     if not user:
         user = User(
             id=str(uuid.uuid4()),
-            clerk_id=clerk_id,
-            email=f"{clerk_id}@placeholder.com",
+            clerk_id=user_id,
+            email=f"{user_id}@placeholder.com",
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.flush()
     return user
 
 
-@router.get("/")
+def encode_session_cursor(created_at: datetime, session_id: str) -> str:
+    """Opaque keyset cursor pointing just past a session in (created_at, id) DESC order."""
+    raw = json.dumps([created_at.isoformat(), session_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_session_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, session_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(session_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def count_rows(db: AsyncSession, query, mode: str) -> int | None:
+    """Row count for a list query: exact, a planner estimate (PostgreSQL), or skipped."""
+    if mode == "none":
+        return None
+    if mode == "estimate" and db.bind.dialect.name == "postgresql":
+        # The planner's row estimate costs the same however many rows match
+        compiled = query.compile(dialect=db.bind.dialect)
+        if compiled.positional:
+            params = tuple(compiled.params[name] for name in compiled.positiontup)
+        else:
+            params = compiled.params
+        try:
+            # A savepoint keeps a failed EXPLAIN from aborting the request's transaction
+            async with db.begin_nested():
+                conn = await db.connection()
+                plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except Exception:
+            logger.warning("Session count estimate failed, counting exactly", exc_info=True)
+    return await db.scalar(select(func.count()).select_from(query.subquery()))
+
+
+# Columns the session list returns; the session_data / cost_breakdown JSON stays in the DB
+SESSION_LIST_COLUMNS = (
+    VoiceSession.id,
+    VoiceSession.room_name,
+    VoiceSession.status,
+    VoiceSession.started_at,
+    VoiceSession.ended_at,
+    VoiceSession.duration,
+    VoiceSession.user_id,
+    VoiceSession.agent_id,
+    VoiceSession.call_direction,
+    VoiceSession.outbound_phone_number,
+    VoiceSession.call_status,
+    VoiceSession.transferred_to,
+    VoiceSession.transfer_type,
+    VoiceSession.transfer_timestamp,
+    VoiceSession.total_cost,
+    VoiceSession.created_at,
+    VoiceSession.updated_at,
+    VoiceSession.session_data["analysis"].label("analysis"),
+    Agent.name.label("agent_name"),
+)
+
+
+@router.get("/", response_model=VoiceSessionListResponse)
 async def get_sessions(
     x_user_id: Optional[str] = Header(None),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=10000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; replaces page"),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$", description="How to compute total"),
+    include_metadata: bool = Query(False, description="Also return each session's full metadata"),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    """Get all sessions for the authenticated user with pagination and date filtering."""
+    """Get sessions for the authenticated user, newest first, with date filtering.
+
+    Pages either by `page` (OFFSET) or by `cursor`. Every response carries a
+    `next_cursor` (null on the last page); following it keeps each page an
+    index range scan on (user_id, created_at) however deep the history goes.
+    `total` is an exact count by default, a planner estimate with
+    `count=estimate`, or omitted (null) with `count=none`.
+
+    Rows are a single column projection joined to the agent name; only the
+    call analysis is read out of session_data unless `include_metadata` is set.
+    """
     if not x_user_id:
         raise HTTPException(status_code=401, detail="User ID required")
     
-    user = db.query(User).filter(User.clerk_id == x_user_id).first()
+    user = await db.scalar(select(User).where(User.clerk_id == x_user_id))
     if not user:
-        return {"sessions": [], "total": 0, "page": page, "limit": limit}
+        return VoiceSessionListResponse(sessions=[], total=0, page=page, limit=limit)
     
     # Build query
-    query = db.query(VoiceSession).filter(VoiceSession.user_id == user.id)
+    query = select(VoiceSession.id).where(VoiceSession.user_id == user.id)
     
     # Apply date filters (convert to naive UTC for comparison with DB)
     if start_date:
@@ -70,7 +175,7 @@ async def get_sessions(
             start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
             # Convert to naive datetime for comparison with naive DB timestamps
             start_dt = start_dt.replace(tzinfo=None)
-            query = query.filter(VoiceSession.created_at >= start_dt)
+            query = query.where(VoiceSession.created_at >= start_dt)
         except ValueError:
             pass
     
@@ -79,64 +184,74 @@ async def get_sessions(
             end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
             # Convert to naive datetime for comparison with naive DB timestamps
             end_dt = end_dt.replace(tzinfo=None)
-            query = query.filter(VoiceSession.created_at <= end_dt)
+            query = query.where(VoiceSession.created_at <= end_dt)
         except ValueError:
             pass
     
-    # Get total count
-    total = query.count()
+    total = await count_rows(db, query, count)
     
-    # Apply pagination
-    offset = (page - 1) * limit
-    sessions = (
-        query
-        .order_by(VoiceSession.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+    columns = SESSION_LIST_COLUMNS
+    if include_metadata:
+        columns += (VoiceSession.session_data.label("metadata"),)
+    page_query = (
+        query.with_only_columns(*columns)
+        .outerjoin(Agent, Agent.id == VoiceSession.agent_id)
+        # id breaks ties between sessions created in the same instant
+        .order_by(VoiceSession.created_at.desc(), VoiceSession.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        after_created_at, after_id = decode_session_cursor(cursor)
+        page_query = page_query.where(
+            VoiceSession.created_at <= after_created_at,
+            or_(
+                VoiceSession.created_at < after_created_at,
+                VoiceSession.id < after_id,
+            ),
+        )
+    else:
+        page_query = page_query.offset((page - 1) * limit)
+    rows = (await db.execute(page_query)).mappings().all()
+
+    # The extra row only tells us whether another page follows
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_session_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    return VoiceSessionListResponse(
+        sessions=[VoiceSessionListItem(**row) for row in rows],
+        total=total,
+        page=page,
+        limit=limit,
+        next_cursor=next_cursor,
     )
-    # Build session responses with agent names
-    session_responses = []
-    for s in sessions:
-        response = VoiceSessionResponse.model_validate(s)
-        # Populate agent_name from the agent relationship
-        if s.agent:
-            response.agent_name = s.agent.name
-        session_responses.append(response)
-    
-    return {
-        "sessions": session_responses,
-        "total": total,
-        "page": page,
-        "limit": limit,
-    }
 
 
 @router.get("/{session_id}", response_model=VoiceSessionResponse)
-async def get_session(session_id: str, db: Session = Depends(get_db)):
+async def get_session(session_id: str, db: AsyncSession = Depends(get_db)):
     """Get a single session by ID."""
-    session = db.query(VoiceSession).filter(VoiceSession.id == session_id).first()
+    session = await db.get(VoiceSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     return session
 
 
 @router.get("/{session_id}/transcripts", response_model=list[TranscriptResponse])
-async def get_session_transcripts(session_id: str, db: Session = Depends(get_db)):
+async def get_session_transcripts(session_id: str, db: AsyncSession = Depends(get_db)):
     """Get all transcripts for a session."""
-    transcripts = (
-        db.query(Transcript)
-        .filter(Transcript.session_id == session_id)
+    transcripts = await db.scalars(
+        select(Transcript)
+        .where(Transcript.session_id == session_id)
         .order_by(Transcript.timestamp.asc())
-        .all()
     )
-    return transcripts
+    return transcripts.all()
 
 
 @router.get("/{session_id}/analysis")
-async def get_session_analysis(session_id: str, db: Session = Depends(get_db)):
+async def get_session_analysis(session_id: str, db: AsyncSession = Depends(get_db)):
     """Get call analysis for a session."""
-    session = db.query(VoiceSession).filter(VoiceSession.id == session_id).first()
+    session = await db.get(VoiceSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -145,18 +260,19 @@ async def get_session_analysis(session_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/{session_id}/cost-breakdown", response_model=SessionCostBreakdownResponse)
-async def get_session_cost_breakdown(session_id: str, db: Session = Depends(get_db)):
+async def get_session_cost_breakdown(session_id: str, db: AsyncSession = Depends(get_db)):
     """Get cost breakdown for a session."""
-    session = db.query(VoiceSession).filter(VoiceSession.id == session_id).first()
+    session = await db.get(VoiceSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
     events = (
-        db.query(UsageEvent)
-        .filter(UsageEvent.session_id == session_id)
-        .order_by(UsageEvent.created_at.asc())
-        .all()
-    )
+        await db.scalars(
+            select(UsageEvent)
+            .where(UsageEvent.session_id == session_id)
+            .order_by(UsageEvent.created_at.asc())
+        )
+    ).all()
 
     cost_by_type: dict[str, Decimal] = {}
     for event in events:
@@ -176,27 +292,14 @@ async def get_session_cost_breakdown(session_id: str, db: Session = Depends(get_
 @router.post("/", response_model=VoiceSessionResponse, status_code=201)
 async def create_session(
     session_data: VoiceSessionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Create a new voice session.
 
-    user_id can be either:
-    - A Clerk ID (browser sessions): looked up or created via get_or_create_user
-    - An internal DB user UUID (SIP sessions): looked up directly by primary key
+    user_id can be a Clerk ID or an internal DB user UUID (see resolve_session_user).
     """
-    incoming_user_id = session_data.user_id
-    
-    # Check if the incoming user_id is an internal DB UUID (36-char UUID format)
-    # vs a Clerk ID (e.g. "user_2abc..." or "sip-caller")
-    user = None
-    if len(incoming_user_id) == 36 and incoming_user_id.count('-') == 4:
-        # Looks like a UUID — try to find the user by internal primary key first
-        user = db.query(User).filter(User.id == incoming_user_id).first()
-    
-    if user is None:
-        # Fall back to Clerk ID lookup / creation
-        user = get_or_create_user(db, incoming_user_id)
-    
+    user = await resolve_session_user(db, session_data.user_id)
+
     session = VoiceSession(
         id=str(uuid.uuid4()),
         room_name=session_data.room_name,
@@ -207,19 +310,63 @@ async def create_session(
         started_at=datetime.utcnow(),
     )
     db.add(session)
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     return session
 
 
+@router.post("/bootstrap", response_model=SessionBootstrapResponse, status_code=201)
+async def bootstrap_session(
+    request: SessionBootstrapRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Resolve the agent and create the session in one round trip for the agent worker.
+
+    The agent is resolved by agent_id, or by the dialed phone_number for SIP calls.
+    The session owner is the user_id hint when given (browser calls), otherwise the
+    agent owner. Everything is written in a single commit.
+    """
+    agent = None
+    if request.agent_id and request.agent_id != "default":
+        agent = await db.get(Agent, request.agent_id)
+    elif request.phone_number:
+        agent = await find_agent_by_phone(db, request.phone_number)
+
+    if request.user_id:
+        user = await resolve_session_user(db, request.user_id)
+    elif agent:
+        user = await db.get(User, agent.user_id)
+    else:
+        user = await resolve_session_user(db, "sip-caller")  # Last-resort fallback
+
+    session = VoiceSession(
+        id=str(uuid.uuid4()),
+        room_name=request.room_name,
+        user_id=user.id,
+        agent_id=agent.id if agent else None,
+        session_data={},
+        status=SessionStatus.ACTIVE,
+        started_at=datetime.utcnow(),
+    )
+    db.add(session)
+    agent_response = AgentResponse.model_validate(agent) if agent else None
+    await db.commit()
+
+    return SessionBootstrapResponse(
+        session_id=session.id,
+        user_id=user.id,
+        agent=agent_response,
+    )
+
+
 @router.patch("/{session_id}", response_model=VoiceSessionResponse)
 async def update_session(
     session_id: str,
     session_data: VoiceSessionUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Update a session."""
-    session = db.query(VoiceSession).filter(VoiceSession.id == session_id).first()
+    session = await db.get(VoiceSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -227,8 +374,8 @@ async def update_session(
     for field, value in update_data.items():
         setattr(session, field, value)
     
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     return session
 
 
@@ -236,10 +383,10 @@ async def update_session(
 async def add_transcript(
     session_id: str,
     transcript_data: TranscriptCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Add a transcript to a session."""
-    session = db.query(VoiceSession).filter(VoiceSession.id == session_id).first()
+    session = await db.get(VoiceSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -250,8 +397,8 @@ async def add_transcript(
         speaker=transcript_data.speaker,
     )
     db.add(transcript)
-    db.commit()
-    db.refresh(transcript)
+    await db.commit()
+    await db.refresh(transcript)
     return transcript
 
 
@@ -259,7 +406,7 @@ async def add_transcript(
 async def transfer_call(
     session_id: str,
     transfer_data: TransferRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Transfer an active call to another phone number.
@@ -277,7 +424,7 @@ async def transfer_call(
         )
 
     # Look up session
-    session = db.query(VoiceSession).filter(VoiceSession.id == session_id).first()
+    session = await db.get(VoiceSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -306,8 +453,8 @@ async def transfer_call(
     session.transferred_to = transfer_data.phone_number
     session.transfer_type = transfer_data.type
     session.transfer_timestamp = datetime.utcnow()
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
 
     return TransferResponse(
         session_id=session.id,
@@ -319,9 +466,9 @@ async def transfer_call(
 
 
 @router.get("/by-room/{room_name}", response_model=VoiceSessionResponse)
-async def get_session_by_room(room_name: str, db: Session = Depends(get_db)):
+async def get_session_by_room(room_name: str, db: AsyncSession = Depends(get_db)):
     """Get a session by room name."""
-    session = db.query(VoiceSession).filter(VoiceSession.room_name == room_name).first()
+    session = await db.scalar(select(VoiceSession).where(VoiceSession.room_name == room_name))
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     return session
@@ -331,16 +478,28 @@ async def get_session_by_room(room_name: str, db: Session = Depends(get_db)):
 async def end_session_by_room(
     room_name: str,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    end_data: Optional[SessionEndRequest] = None,
+    db: AsyncSession = Depends(get_db),
 ):
-    """End a session by room name and calculate duration."""
-    session = db.query(VoiceSession).filter(VoiceSession.room_name == room_name).first()
+    """End a session by room name and calculate duration.
+
+    Idempotent: ending an already-ended session changes nothing.
+    """
+    session = await db.scalar(select(VoiceSession).where(VoiceSession.room_name == room_name))
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
     # Only update if session is still active
     if session.status == SessionStatus.ACTIVE:
         now = datetime.utcnow()
+        if end_data and end_data.ended_at:
+            ended_at = end_data.ended_at
+            if ended_at.tzinfo is not None:
+                ended_at = ended_at.astimezone(timezone.utc).replace(tzinfo=None)
+            now = min(now, ended_at)
+        if session.started_at:
+            # A client clock behind the server's must not end the call before it started
+            now = max(session.started_at, now)
         session.ended_at = now
         session.status = SessionStatus.COMPLETED
 
@@ -349,8 +508,8 @@ async def end_session_by_room(
             duration = int((now - session.started_at).total_seconds())
             session.duration = duration
 
-        db.commit()
-        db.refresh(session)
+        await db.commit()
+        await db.refresh(session)
 
         # Trigger post-call analysis and cost aggregation in background (non-blocking)
         background_tasks.add_task(analyze_call, session.id)
@@ -363,10 +522,10 @@ async def end_session_by_room(
 async def add_transcript_by_room(
     room_name: str,
     transcript_data: TranscriptCreateByRoom,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Add a transcript to a session using room name."""
-    session = db.query(VoiceSession).filter(VoiceSession.room_name == room_name).first()
+    session = await db.scalar(select(VoiceSession).where(VoiceSession.room_name == room_name))
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -377,8 +536,58 @@ async def add_transcript_by_room(
         speaker=transcript_data.speaker,
     )
     db.add(transcript)
-    db.commit()
-    db.refresh(transcript)
+    await db.commit()
+    await db.refresh(transcript)
     return transcript
 
 
+@router.post(
+    "/by-room/{room_name}/transcripts/batch",
+    response_model=TranscriptBatchResponse,
+    status_code=201,
+)
+async def add_transcripts_by_room(
+    room_name: str,
+    batch: TranscriptBatchCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    """Add an ordered batch of transcript lines to a session using room name.
+
+    The batch is written with a single multi-row INSERT and one commit.
+    Lines carrying an ID that is already stored are skipped, so a replayed
+    batch is not duplicated.
+    """
+    session_id = await db.scalar(select(VoiceSession.id).where(VoiceSession.room_name == room_name))
+    if not session_id:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if not batch.transcripts:
+        return TranscriptBatchResponse(session_id=session_id, inserted=0)
+
+    client_ids = [item.id for item in batch.transcripts if item.id]
+    existing = set()
+    if client_ids:
+        existing = set(await db.scalars(select(Transcript.id).where(Transcript.id.in_(client_ids))))
+
+    now = datetime.utcnow()
+    rows = []
+    for i, item in enumerate(batch.transcripts):
+        if item.id in existing:
+            continue
+        timestamp = item.timestamp
+        if timestamp is None:
+            # Keep batch order stable when the agent sends no capture time
+            timestamp = now + timedelta(microseconds=i)
+        elif timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        rows.append({
+            "id": item.id or str(uuid.uuid4()),
+            "session_id": session_id,
+            "content": item.content,
+            "speaker": item.speaker,
+            "timestamp": timestamp,
+        })
+
+    if rows:
+        await db.execute(insert(Transcript), rows)
+        await db.commit()
+    return TranscriptBatchResponse(session_id=session_id, inserted=len(rows))
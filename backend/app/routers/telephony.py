@@ -3,8 +3,10 @@ Telephony Router - Twilio phone number management and SIP integration.
 Handles searching, buying, assigning, and releasing Twilio phone numbers for agents.
 """
 
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
 import logging
@@ -12,6 +14,7 @@ import logging
 from app.database import get_db
 from app.config import get_settings
 from app import models
+from app.schemas import AgentResponse
 
 logger = logging.getLogger("telephony")
 router = APIRouter()
@@ -46,6 +49,12 @@ class AssignNumberRequest(BaseModel):
     phone_number: str  # An already-owned Twilio number (E.164 format, e.g. +1234567890)
 
 
+class RoutingSyncResponse(BaseModel):
+    version: Optional[str] = None  # Pass back as `since` for the next delta sync
+    agents: list[AgentResponse]  # Active agents with a phone number
+    removed: list[str] = []  # Agent IDs that are no longer phone-routed
+
+
 # --- Endpoints ---
 
 @router.get("/numbers/search", response_model=list[NumberSearchResult])
@@ -89,7 +98,7 @@ async def search_available_numbers(
 @router.post("/numbers/buy", response_model=BuyNumberResponse)
 async def buy_number(
     request: BuyNumberRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Purchase a Twilio phone number and assign it to an agent."""
     settings = get_settings()
@@ -98,7 +107,7 @@ async def buy_number(
         raise HTTPException(status_code=500, detail="Twilio credentials not configured")
 
     # Verify agent exists
-    agent = db.query(models.Agent).filter(models.Agent.id == request.agent_id).first()
+    agent = await db.get(models.Agent, request.agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
 
@@ -138,8 +147,8 @@ async def buy_number(
         # Update agent record
         agent.phone_number = incoming.phone_number
         agent.twilio_sid = incoming.sid
-        db.commit()
-        db.refresh(agent)
+        await db.commit()
+        await db.refresh(agent)
 
         logger.info(f"Purchased number {incoming.phone_number} for agent {agent.name}")
 
@@ -159,12 +168,12 @@ async def buy_number(
 @router.post("/numbers/release")
 async def release_number(
     request: ReleaseNumberRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Release a Twilio phone number from an agent."""
     settings = get_settings()
 
-    agent = db.query(models.Agent).filter(models.Agent.id == request.agent_id).first()
+    agent = await db.get(models.Agent, request.agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
 
@@ -181,7 +190,7 @@ async def release_number(
         old_number = agent.phone_number
         agent.phone_number = None
         agent.twilio_sid = None
-        db.commit()
+        await db.commit()
 
         logger.info(f"Released number {old_number} from agent {agent.name}")
         return {"status": "released", "phone_number": old_number}
@@ -196,12 +205,12 @@ async def release_number(
 @router.post("/numbers/assign")
 async def assign_existing_number(
     request: AssignNumberRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Assign an already-owned Twilio number to an agent (no purchase)."""
     settings = get_settings()
 
-    agent = db.query(models.Agent).filter(models.Agent.id == request.agent_id).first()
+    agent = await db.get(models.Agent, request.agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
 
@@ -232,8 +241,8 @@ async def assign_existing_number(
 
     agent.phone_number = phone
     agent.twilio_sid = twilio_sid  # May be None if Twilio lookup failed
-    db.commit()
-    db.refresh(agent)
+    await db.commit()
+    await db.refresh(agent)
 
     logger.info(f"Assigned existing number {phone} to agent {agent.name}")
     return {
@@ -260,27 +269,67 @@ def normalize_phone(number: str) -> str:
     return f"+{digits}"
 
 
-# --- Agent Lookup (used by Agent worker for SIP dispatch) ---
-
-@router.get("/lookup")
-async def lookup_agent_by_phone(
-    phone_number: str = Query(..., description="The phone number to look up"),
-    db: Session = Depends(get_db),
-):
-    """Look up an agent by its assigned phone number. Used by the agent worker for SIP dispatch."""
+async def find_agent_by_phone(db: AsyncSession, phone_number: str) -> models.Agent | None:
+    """Find the active agent assigned to a phone number, comparing normalized forms."""
     normalized_input = normalize_phone(phone_number)
     logger.info(f"Looking up agent for phone: {phone_number} (normalized: {normalized_input})")
 
     # Get all agents with a phone number and compare normalized versions
-    agents = (
-        db.query(models.Agent)
-        .filter(models.Agent.phone_number.isnot(None), models.Agent.is_active == True)
-        .all()
+    agents = await db.scalars(
+        select(models.Agent)
+        .where(models.Agent.phone_number.isnot(None), models.Agent.is_active == True)
     )
 
     for a in agents:
         if normalize_phone(a.phone_number) == normalized_input:
             logger.info(f"Found agent: {a.name} (id={a.id}) for number {phone_number}")
-            return {"agent_id": a.id, "name": a.name, "config": a.config}
+            return a
+    return None
+
+
+# --- Agent Lookup (used by Agent worker for SIP dispatch) ---
+
+@router.get("/lookup")
+async def lookup_agent_by_phone(
+    phone_number: str = Query(..., description="The phone number to look up"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Look up an agent by its assigned phone number. Used by the agent worker for SIP dispatch."""
+    a = await find_agent_by_phone(db, phone_number)
+    if a:
+        return {"agent_id": a.id, "name": a.name, "config": a.config}
 
     raise HTTPException(status_code=404, detail="No agent found for this phone number")
+
+
+@router.get("/routing", response_model=RoutingSyncResponse)
+async def get_routing_table(
+    since: Optional[str] = Query(None, description="Version from a previous sync; returns only agents changed since then"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bulk routing table for the agent worker's config cache.
+
+    Without `since`, returns every active phone-routed agent (used to preload the
+    cache at worker startup). With `since`, returns only agents updated at or
+    after that version, split into upserts and removals.
+    """
+    query = select(models.Agent)
+    if since:
+        try:
+            since_dt = datetime.fromisoformat(since)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid since version")
+        # >= so rows sharing the boundary timestamp are never skipped; re-sending one is harmless
+        query = query.where(models.Agent.updated_at >= since_dt)
+    else:
+        query = query.where(models.Agent.phone_number.isnot(None), models.Agent.is_active == True)
+
+    agents = (await db.scalars(query)).all()
+    routed = [a for a in agents if a.is_active and a.phone_number]
+    removed = [a.id for a in agents if not (a.is_active and a.phone_number)]
+
+    version = since
+    if agents:
+        version = max(a.updated_at for a in agents).isoformat()
+
+    return RoutingSyncResponse(version=version, agents=routed, removed=removed)
@@ -1,30 +1,58 @@
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 
 from app.database import get_db
 from app.models import UsageEvent, VoiceSession, User
-from app.schemas import UsageEventCreate, UsageEventResponse
+from app.schemas import (
+    UsageEventCreate,
+    UsageEventPayload,
+    UsageEventResponse,
+    UsageEventBatchCreate,
+    UsageEventBatchResponse,
+)
+from app.services.pricing import PricedUsage, get_pricing_engine
 
 router = APIRouter()
 
 
+def price_usage_events(events: list[UsageEventPayload], at: datetime) -> list[PricedUsage]:
+    """Resolve quantity and cost for each event, pricing raw usage_data in one pass."""
+    raw = [event for event in events if event.usage_data is not None]
+    priced = iter(
+        get_pricing_engine().price_batch(
+            ((event.event_type.value, event.provider, event.usage_data) for event in raw), at
+        )
+    )
+    return [
+        next(priced)
+        if event.usage_data is not None
+        else PricedUsage(event.quantity, event.unit_cost, event.total_cost)
+        for event in events
+    ]
+
+
 @router.post("/events", response_model=UsageEventResponse, status_code=201)
 async def create_usage_event(
     event_data: UsageEventCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Log a usage event from the agent worker."""
     # Validate session exists
-    session = db.query(VoiceSession).filter(VoiceSession.id == event_data.session_id).first()
+    session = await db.get(VoiceSession, event_data.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
     # Validate user exists
-    user = db.query(User).filter(User.id == event_data.user_id).first()
+    user = await db.get(User, event_data.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    now = datetime.utcnow()
+    (priced,) = price_usage_events([event_data], now)
     event = UsageEvent(
         id=str(uuid.uuid4()),
         session_id=event_data.session_id,
@@ -32,11 +60,63 @@ async def create_usage_event(
         agent_id=event_data.agent_id,
         provider=event_data.provider,
         event_type=event_data.event_type,
-        quantity=event_data.quantity,
-        unit_cost=event_data.unit_cost,
-        total_cost=event_data.total_cost,
+        quantity=priced.quantity,
+        unit_cost=priced.unit_cost,
+        total_cost=priced.total_cost,
+        created_at=now,
     )
     db.add(event)
-    db.commit()
-    db.refresh(event)
+    await db.commit()
+    await db.refresh(event)
     return event
+
+
+@router.post("/events/batch", response_model=UsageEventBatchResponse, status_code=201)
+async def create_usage_events_batch(
+    batch: UsageEventBatchCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    """Log a batch of usage events for one session.
+
+    The session and user are validated once for the whole batch, raw usage
+    is priced in one pass, and the events are written with a single
+    multi-row INSERT and one commit. Events whose ID is already stored are
+    skipped, so a replayed batch is not counted twice.
+    """
+    if not await db.scalar(select(VoiceSession.id).where(VoiceSession.id == batch.session_id)):
+        raise HTTPException(status_code=404, detail="Session not found")
+    if not await db.scalar(select(User.id).where(User.id == batch.user_id)):
+        raise HTTPException(status_code=404, detail="User not found")
+    if not batch.events:
+        return UsageEventBatchResponse(inserted=0)
+
+    # Events carrying an ID that is already stored were delivered before
+    client_ids = [event.id for event in batch.events if event.id]
+    if client_ids:
+        existing = set(await db.scalars(select(UsageEvent.id).where(UsageEvent.id.in_(client_ids))))
+        events = [event for event in batch.events if event.id not in existing]
+    else:
+        events = batch.events
+    if not events:
+        return UsageEventBatchResponse(inserted=0)
+
+    now = datetime.utcnow()
+    priced = price_usage_events(events, now)
+    rows = [
+        {
+            "id": event.id or str(uuid.uuid4()),
+            "session_id": batch.session_id,
+            "user_id": batch.user_id,
+            "agent_id": event.agent_id,
+            "provider": event.provider,
+            "event_type": event.event_type,
+            "quantity": cost.quantity,
+            "unit_cost": cost.unit_cost,
+            "total_cost": cost.total_cost,
+            "created_at": now,
+        }
+        for event, cost in zip(events, priced)
+    ]
+    await db.execute(insert(UsageEvent), rows)
+    await db.commit()
+    return UsageEventBatchResponse(inserted=len(rows))
@@ -70,6 +70,20 @@ class VoiceSessionCreate(VoiceSessionBase):
     agent_id: Optional[str] = None
 
 
+class SessionBootstrapRequest(BaseModel):
+    """One-shot session setup for the agent worker."""
+    room_name: str
+    agent_id: Optional[str] = None
+    phone_number: Optional[str] = None  # Dialed number for SIP calls, used when agent_id is unknown
+    user_id: Optional[str] = None  # Clerk ID or internal user UUID; defaults to the agent owner
+
+
+class SessionBootstrapResponse(BaseModel):
+    session_id: str
+    user_id: str  # Internal DB user UUID
+    agent: Optional[AgentResponse] = None
+
+
 class VoiceSessionUpdate(BaseModel):
     status: Optional[SessionStatus] = None
     ended_at: Optional[datetime] = None
@@ -113,6 +127,38 @@ class VoiceSessionResponse(VoiceSessionBase):
         return instance
 
 
+class VoiceSessionListItem(BaseModel):
+    """Session row for list views, built from a column projection (no ORM load)."""
+    id: str
+    room_name: str
+    status: SessionStatus
+    started_at: Optional[datetime]
+    ended_at: Optional[datetime]
+    duration: Optional[int]
+    user_id: str
+    agent_id: Optional[str]
+    agent_name: Optional[str] = None
+    call_direction: Optional[CallDirection] = None
+    outbound_phone_number: Optional[str] = None
+    call_status: Optional[CallStatus] = None
+    analysis: Optional[dict] = None  # session_data["analysis"], extracted in SQL
+    transferred_to: Optional[str] = None
+    transfer_type: Optional[TransferType] = None
+    transfer_timestamp: Optional[datetime] = None
+    total_cost: Optional[Decimal] = None
+    metadata: Optional[dict] = None  # Full session_data, only with include_metadata=true
+    created_at: datetime
+    updated_at: datetime
+
+
+class VoiceSessionListResponse(BaseModel):
+    sessions: list[VoiceSessionListItem]
+    total: Optional[int]  # None with count=none
+    page: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
 # Transcript Schemas
 class TranscriptBase(BaseModel):
     content: str
@@ -128,6 +174,28 @@ class TranscriptCreateByRoom(TranscriptBase):
     pass
 
 
+class TranscriptBatchItem(TranscriptBase):
+    # Client-generated ID; a replayed line with a known ID is skipped
+    id: Optional[str] = Field(None, max_length=36)
+    # Capture time on the agent; keeps lines ordered when a batch lands at once
+    timestamp: Optional[datetime] = None
+
+
+class TranscriptBatchCreate(BaseModel):
+    """Ordered batch of transcript lines for one session (by room name)."""
+    transcripts: list[TranscriptBatchItem] = Field(..., max_length=500)
+
+
+class TranscriptBatchResponse(BaseModel):
+    session_id: str
+    inserted: int
+
+
+class SessionEndRequest(BaseModel):
+    # When the call actually ended, if delivery of the end notice was delayed
+    ended_at: Optional[datetime] = None
+
+
 class TranscriptResponse(TranscriptBase):
     id: str
     session_id: str
@@ -182,15 +250,46 @@ class CallStatusResponse(BaseModel):
 
 
 # Usage Event Schemas
-class UsageEventCreate(BaseModel):
-    session_id: str
-    user_id: str
+class UsageEventPayload(BaseModel):
+    """Usage as reported by the agent worker.
+
+    Send either raw counters in usage_data (priced by the backend) or the
+    precomputed quantity, unit_cost and total_cost.
+    """
     agent_id: Optional[str] = None
     provider: str
     event_type: UsageEventType
-    quantity: Decimal
-    unit_cost: Decimal
-    total_cost: Decimal
+    usage_data: Optional[dict[str, float]] = None
+    quantity: Optional[Decimal] = None
+    unit_cost: Optional[Decimal] = None
+    total_cost: Optional[Decimal] = None
+
+    @model_validator(mode="after")
+    def _require_usage(self):
+        if self.usage_data is None and None in (self.quantity, self.unit_cost, self.total_cost):
+            raise ValueError("Provide usage_data or quantity, unit_cost and total_cost")
+        return self
+
+
+class UsageEventCreate(UsageEventPayload):
+    session_id: str
+    user_id: str
+
+
+class UsageEventBatchItem(UsageEventPayload):
+    # Client-generated ID; a replayed event with a known ID is skipped
+    id: Optional[str] = Field(None, max_length=36)
+
+
+class UsageEventBatchCreate(BaseModel):
+    """Usage events for one session, sent together by the agent worker."""
+    session_id: str
+    user_id: str
+    events: list[UsageEventBatchItem] = Field(..., max_length=1000)
+
+
+class UsageEventBatchResponse(BaseModel):
+    inserted: int
 
 
 class UsageEventResponse(BaseModel):
@@ -249,3 +348,43 @@ class TransferResponse(BaseModel):
     transferred_to: str
     status: str
     message: str
+
+
+# Latency Schemas
+class TurnLatencyItem(BaseModel):
+    # Client-generated ID; a replayed record with a known ID is skipped
+    id: Optional[str] = Field(None, max_length=36)
+    created_at: Optional[datetime] = None
+    eou_delay_ms: Optional[float] = None
+    stt_final_ms: Optional[float] = None
+    llm_ttft_ms: Optional[float] = None
+    tts_ttfb_ms: Optional[float] = None
+    first_audio_ms: Optional[float] = None
+    tool_ms: Optional[float] = None
+    interrupted: bool = False
+
+
+class TurnLatencyBatchCreate(BaseModel):
+    """Turn latency records for one session, sent together by the agent worker."""
+    session_id: str
+    agent_id: Optional[str] = None
+    stt_provider: str
+    turns: list[TurnLatencyItem] = Field(..., max_length=1000)
+
+
+class TurnLatencyBatchResponse(BaseModel):
+    inserted: int
+
+
+class LatencyPercentiles(BaseModel):
+    samples: int
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+
+class LatencyGroupResponse(BaseModel):
+    key: str  # Agent ID, STT provider or ISO date, depending on the grouping
+    name: Optional[str] = None  # Agent name when grouped by agent
+    time_to_first_audio: LatencyPercentiles
+    end_to_end: LatencyPercentiles
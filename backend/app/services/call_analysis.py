@@ -3,8 +3,9 @@ import logging
 import os
 
 import httpx
+from sqlalchemy import select
 
-from app.database import SessionLocal
+from app.database import AsyncSessionLocal
 from app.models import VoiceSession, Transcript
 
 logger = logging.getLogger(__name__)
@@ -35,19 +36,19 @@ async def analyze_call(session_id: str) -> None:
         logger.warning("GOOGLE_API_KEY not set — skipping call analysis for session %s", session_id)
         return
 
-    db = SessionLocal()
     try:
-        session = db.query(VoiceSession).filter(VoiceSession.id == session_id).first()
-        if not session:
-            logger.warning("Session %s not found for analysis", session_id)
-            return
-
-        transcripts = (
-            db.query(Transcript)
-            .filter(Transcript.session_id == session_id)
-            .order_by(Transcript.timestamp.asc())
-            .all()
-        )
+        async with AsyncSessionLocal() as db:
+            if not await db.get(VoiceSession, session_id):
+                logger.warning("Session %s not found for analysis", session_id)
+                return
+
+            transcripts = (
+                await db.scalars(
+                    select(Transcript)
+                    .where(Transcript.session_id == session_id)
+                    .order_by(Transcript.timestamp.asc())
+                )
+            ).all()
 
         if not transcripts:
             logger.info("No transcripts for session %s — skipping analysis", session_id)
@@ -60,6 +61,7 @@ async def analyze_call(session_id: str) -> None:
 
         prompt = ANALYSIS_PROMPT.format(transcript=transcript_text)
 
+        # No DB connection is held while waiting on the model
         async with httpx.AsyncClient(timeout=30.0) as client:
             response = await client.post(
                 f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={api_key}",
@@ -78,14 +80,16 @@ async def analyze_call(session_id: str) -> None:
         raw_text = result["candidates"][0]["content"]["parts"][0]["text"]
         analysis = json.loads(raw_text)
 
-        session.session_data = {
-            **(session.session_data or {}),
-            "analysis": analysis,
-        }
-        db.commit()
+        async with AsyncSessionLocal() as db:
+            session = await db.get(VoiceSession, session_id)
+            if not session:
+                return
+            session.session_data = {
+                **(session.session_data or {}),
+                "analysis": analysis,
+            }
+            await db.commit()
         logger.info("Call analysis completed for session %s", session_id)
 
     except Exception:
         logger.exception("Call analysis failed for session %s", session_id)
-    finally:
-        db.close()
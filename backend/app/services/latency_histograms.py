@@ -0,0 +1,62 @@
+"""Mergeable latency histograms for turn latency analytics.
+
+Latencies are counted in logarithmic buckets (the DDSketch mapping): bucket i
+holds values in (GAMMA**(i-1), GAMMA**i], so any quantile read back from the
+bucket counts is within RELATIVE_ACCURACY of the true value. Buckets with the
+same index can simply be added together, which is what lets the backend store
+per (user, agent, STT provider, day, metric) counts and merge them across
+agents, providers or days at query time instead of scanning raw samples.
+"""
+import math
+from typing import Iterable, Mapping
+
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+# Metrics kept as histograms, derived from each turn record
+METRIC_TIME_TO_FIRST_AUDIO = "time_to_first_audio"  # Turn committed → first audio
+METRIC_END_TO_END = "end_to_end"  # Caller stops speaking → first audio
+
+
+def bucket_index(value_ms: float) -> int:
+    """Bucket holding a latency; everything at or below 1 ms shares bucket 0."""
+    if value_ms <= 1:
+        return 0
+    return math.ceil(math.log(value_ms) / _LOG_GAMMA)
+
+
+def bucket_value(index: int) -> float:
+    """Representative latency of a bucket (within RELATIVE_ACCURACY of its members)."""
+    if index <= 0:
+        return 1.0
+    return 2 * GAMMA**index / (GAMMA + 1)
+
+
+def turn_metrics(first_audio_ms: float | None, eou_delay_ms: float | None) -> dict[str, float]:
+    """Histogram metrics for one turn record; stages that were not measured are left out."""
+    metrics = {}
+    if first_audio_ms is not None:
+        metrics[METRIC_END_TO_END] = first_audio_ms
+        if eou_delay_ms is not None:
+            metrics[METRIC_TIME_TO_FIRST_AUDIO] = max(first_audio_ms - eou_delay_ms, 0.0)
+    return metrics
+
+
+def quantiles(counts: Mapping[int, int], qs: Iterable[float]) -> dict[float, float | None]:
+    """Read quantiles (0..1) from merged bucket counts."""
+    total = sum(counts.values())
+    if not total:
+        return {q: None for q in qs}
+    ordered = sorted(counts.items())
+    result = {}
+    for q in qs:
+        rank = q * (total - 1)
+        seen = 0
+        for index, count in ordered:
+            seen += count
+            if seen > rank:
+                result[q] = round(bucket_value(index), 1)
+                break
+    return result
+
@@ -0,0 +1,145 @@
+"""Ingest-time pricing of raw usage reported by the agent worker.
+
+The worker sends raw counters (audio seconds, input/output tokens, characters)
+and the backend turns them into quantity, unit_cost and total_cost here, so
+rates live in one place (app.cost_rates) and the worker never does cost math.
+
+Rates are compiled once into an in-memory table keyed by (event_type,
+provider). Each key holds a time-ordered list of rate cards: the base rate
+plus any effective-dated overrides. A batch is priced in one pass, resolving
+each distinct rate card once.
+"""
+import bisect
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Iterable
+
+from app.cost_rates import (
+    COST_RATES,
+    LLM_TOKEN_RATES,
+    PROVIDER_ALIASES,
+    RATE_OVERRIDES,
+)
+
+logger = logging.getLogger(__name__)
+
+_ZERO = Decimal("0")
+_THOUSAND = Decimal("1000")
+_SIXTY = Decimal("60")
+
+# Match the scale of the usage_events columns
+_QUANTITY_EXP = Decimal("0.0001")
+_UNIT_COST_EXP = Decimal("0.00000001")
+_TOTAL_COST_EXP = Decimal("0.000001")
+
+
+@dataclass(frozen=True)
+class RateCard:
+    unit_cost: Decimal
+    input_rate: Decimal | None = None
+    output_rate: Decimal | None = None
+
+
+@dataclass(frozen=True)
+class PricedUsage:
+    quantity: Decimal
+    unit_cost: Decimal
+    total_cost: Decimal
+
+
+def _decimal(value: Any) -> Decimal:
+    return Decimal(str(value)) if value is not None else _ZERO
+
+
+class PricingEngine:
+    """Prices raw usage payloads against an effective-dated rate table."""
+
+    def __init__(self) -> None:
+        self._table: dict[tuple[str, str], tuple[list[datetime], list[RateCard]]] = {}
+
+        entries: dict[tuple[str, str], list[tuple[datetime, RateCard]]] = {}
+        for event_type, rates in COST_RATES.items():
+            for provider, unit_cost in rates.items():
+                input_rate, output_rate = LLM_TOKEN_RATES.get(provider, (None, None))
+                if event_type != "llm_tokens":
+                    input_rate = output_rate = None
+                entries.setdefault((event_type, provider), []).append(
+                    (datetime.min, RateCard(unit_cost, input_rate, output_rate))
+                )
+        for override in RATE_OVERRIDES:
+            entries.setdefault((override.event_type, override.provider), []).append(
+                (
+                    override.effective_from,
+                    RateCard(override.unit_cost, override.input_rate, override.output_rate),
+                )
+            )
+
+        for key, cards in entries.items():
+            cards.sort(key=lambda entry: entry[0])
+            self._table[key] = ([at for at, _ in cards], [card for _, card in cards])
+
+    def rate_card(self, event_type: str, provider: str, at: datetime) -> RateCard | None:
+        """Return the rate card in effect at `at`, or None for unknown providers."""
+        provider = provider.lower()
+        cards = self._table.get((event_type, PROVIDER_ALIASES.get(provider, provider)))
+        if cards is None:
+            return None
+        starts, rate_cards = cards
+        index = bisect.bisect_right(starts, at) - 1
+        return rate_cards[index] if index >= 0 else None
+
+    def price(
+        self, event_type: str, usage_data: dict[str, Any], card: RateCard | None
+    ) -> PricedUsage:
+        """Compute quantity and cost for one raw usage payload."""
+        if event_type == "stt_minutes":
+            quantity = _decimal(usage_data.get("audio_duration_seconds")) / _SIXTY
+            unit_cost = card.unit_cost if card else _ZERO
+            total_cost = quantity * unit_cost
+        elif event_type == "llm_tokens":
+            input_tokens = _decimal(usage_data.get("input_tokens"))
+            output_tokens = _decimal(usage_data.get("output_tokens"))
+            quantity = input_tokens + output_tokens
+            if card and card.input_rate is not None and card.output_rate is not None:
+                total_cost = (
+                    input_tokens * card.input_rate + output_tokens * card.output_rate
+                ) / _THOUSAND
+                # Effective per-1K rate for this event
+                unit_cost = total_cost * _THOUSAND / quantity if quantity else card.input_rate
+            else:
+                unit_cost = card.unit_cost if card else _ZERO
+                total_cost = quantity * unit_cost / _THOUSAND
+        else:  # tts_characters
+            quantity = _decimal(usage_data.get("character_count"))
+            unit_cost = card.unit_cost if card else _ZERO
+            total_cost = quantity * unit_cost
+
+        return PricedUsage(
+            quantity=quantity.quantize(_QUANTITY_EXP),
+            unit_cost=unit_cost.quantize(_UNIT_COST_EXP),
+            total_cost=total_cost.quantize(_TOTAL_COST_EXP),
+        )
+
+    def price_batch(
+        self, events: Iterable[tuple[str, str, dict[str, Any]]], at: datetime
+    ) -> list[PricedUsage]:
+        """Price (event_type, provider, usage_data) triples in one pass."""
+        cards: dict[tuple[str, str], RateCard | None] = {}
+        priced = []
+        for event_type, provider, usage_data in events:
+            key = (event_type, provider)
+            if key not in cards:
+                cards[key] = self.rate_card(event_type, provider, at)
+                if cards[key] is None:
+                    logger.warning("No rate for %s/%s, pricing at 0", event_type, provider)
+            priced.append(self.price(event_type, usage_data, cards[key]))
+        return priced
+
+
+@lru_cache
+def get_pricing_engine() -> PricingEngine:
+    """Return the process-wide pricing engine (rates are compiled once)."""
+    return PricingEngine()
@@ -0,0 +1,36 @@
+import os
+import tempfile
+
+import pytest
+
+# The API engine is created on import, so point it at a throwaway SQLite file first
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="voxarena-tests-"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.main import app
+
+
+@pytest.fixture
+def db_engine():
+    engine = create_engine(f"sqlite:///{_DB_PATH}")
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine):
+    with Session(db_engine) as session:
+        yield session
+
+
+@pytest.fixture
+def client(db_engine):
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,21 @@
+from app import main
+
+
+def test_pool_metrics_are_off_by_default(client):
+    response = client.get("/health/db", headers={"X-User-Id": "user_ops"})
+
+    assert response.status_code == 404
+
+
+def test_pool_metrics_require_a_user(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "db_metrics_enabled", True)
+
+    assert client.get("/health/db").status_code == 401
+
+    response = client.get("/health/db", headers={"X-User-Id": "user_ops"})
+    assert response.status_code == 200
+    assert "pool" in response.json()
+
+
+def test_liveness_stays_public(client):
+    assert client.get("/health").json() == {"status": "ok", "service": "voxarena-api"}
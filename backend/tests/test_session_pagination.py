@@ -0,0 +1,113 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import SessionStatus, User, VoiceSession
+from app.routers.sessions import decode_session_cursor, encode_session_cursor
+
+CLERK_ID = "user_pagination"
+CREATED_AT = datetime(2026, 3, 1, 12, 0, 0, 123456)
+
+
+@pytest.fixture
+def sessions(db):
+    """Ten sessions, seven of them created in the same instant."""
+    user = User(id=str(uuid.uuid4()), clerk_id=CLERK_ID, email="pages@example.com")
+    db.add(user)
+    created = [CREATED_AT] * 7 + [
+        CREATED_AT + timedelta(seconds=1),
+        CREATED_AT - timedelta(seconds=1),
+        CREATED_AT - timedelta(days=1),
+    ]
+    rows = [
+        VoiceSession(
+            id=str(uuid.uuid4()),
+            room_name=f"room-{i}",
+            user_id=user.id,
+            status=SessionStatus.COMPLETED,
+            created_at=created_at,
+        )
+        for i, created_at in enumerate(created)
+    ]
+    db.add_all(rows)
+    db.commit()
+    ordered = sorted(rows, key=lambda s: (s.created_at, s.id), reverse=True)
+    return [s.id for s in ordered]
+
+
+def _list(client, **params):
+    response = client.get(
+        "/api/sessions/", params=params, headers={"X-User-Id": CLERK_ID}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_cursor_round_trip():
+    session_id = str(uuid.uuid4())
+    cursor = encode_session_cursor(CREATED_AT, session_id)
+
+    assert "=" not in cursor
+    assert decode_session_cursor(cursor) == (CREATED_AT, session_id)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "bnVsbA", "WyJ4Il0"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_session_cursor(cursor)
+    assert excinfo.value.status_code == 400
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_cursor_pages_through_equal_created_at(client, sessions, limit):
+    seen = []
+    page = _list(client, limit=limit, count="none")
+    # Bounded so a cursor that stops advancing fails instead of looping forever
+    for _ in range(len(sessions)):
+        seen.extend(s["id"] for s in page["sessions"])
+        if page["next_cursor"] is None:
+            break
+        assert len(page["sessions"]) == limit
+        page = _list(client, limit=limit, count="none", cursor=page["next_cursor"])
+
+    # Ties on created_at are broken by id: no session skipped or repeated
+    assert seen == sessions
+
+
+def test_last_full_page_has_no_next_cursor(client, sessions):
+    page = _list(client, limit=len(sessions))
+
+    assert [s["id"] for s in page["sessions"]] == sessions
+    assert page["next_cursor"] is None
+
+
+def test_invalid_cursor_returns_400(client, sessions):
+    response = client.get(
+        "/api/sessions/",
+        params={"cursor": "not-a-cursor"},
+        headers={"X-User-Id": CLERK_ID},
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    ("mode", "expected"),
+    # SQLite has no planner estimate, so count=estimate falls back to an exact count
+    [("exact", 10), ("estimate", 10), ("none", None)],
+)
+def test_count_modes(client, sessions, mode, expected):
+    page = _list(client, limit=3, count=mode)
+
+    assert page["total"] == expected
+    assert len(page["sessions"]) == 3
+
+
+def test_count_respects_date_filter(client, sessions):
+    page = _list(
+        client, count="exact", start_date=(CREATED_AT - timedelta(hours=1)).isoformat()
+    )
+
+    assert page["total"] == 9
@@ -53,7 +53,7 @@ export default async function DashboardPage() {
     const apiUrl = process.env.INTERNAL_API_URL || process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api';
     const headers = { 'x-user-id': userId };
 
-    const recentRes = await fetch(`${apiUrl}/sessions/?limit=5`, { headers, cache: 'no-store' });
+    const recentRes = await fetch(`${apiUrl}/sessions/?limit=5&count=none`, { headers, cache: 'no-store' });
 
     const recentData: SessionsPage | null = recentRes.ok ? await recentRes.json().catch(() => null) : null;
     const recentSessions: VoiceSession[] = recentData?.sessions ?? [];
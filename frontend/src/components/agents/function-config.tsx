@@ -74,6 +74,11 @@ export interface FunctionEndpoint {
     timeout: number;
 }
 
+export interface FunctionCache {
+    ttl_seconds: number;
+    key_args?: string[]; // Arguments that form the cache key; all arguments when omitted
+}
+
 export interface FunctionDefinition {
     id: string;
     name: string;
@@ -82,6 +87,7 @@ export interface FunctionDefinition {
     endpoint: FunctionEndpoint;
     speak_during_execution: boolean;
     speak_on_send: string;
+    cache?: FunctionCache;
 }
 
 interface FunctionConfigProps {
@@ -39,6 +39,9 @@ export interface WebhookDefinition {
     headers: { key: string; value: string }[];
     // For pre-call: map response keys to variables
     assignments?: { variable: string; path: string }[];
+    // For pre-call: max seconds the greeting waits, and per-caller cache TTL
+    budget_seconds?: number;
+    cache_ttl_seconds?: number;
     // For post-call: optional custom body
     body?: string;
 }
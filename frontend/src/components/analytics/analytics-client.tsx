@@ -139,21 +139,27 @@ export default function AnalyticsClient({ userId, apiUrl }: AnalyticsClientProps
                 startDate.setDate(startDate.getDate() - lookbackDays)
                 const startDateISO = startDate.toISOString()
 
-                // Paginate to collect all sessions in the range
+                // Follow the cursor to collect all sessions in the range (no total needed)
                 let allSessions: Session[] = []
-                let page = 1
+                let cursor: string | null = null
                 const pageSize = 1000
                 while (true) {
+                    const params = new URLSearchParams({
+                        limit: pageSize.toString(),
+                        count: "none",
+                        start_date: startDateISO,
+                    })
+                    if (cursor) params.append("cursor", cursor)
                     const res = await fetch(
-                        `${apiUrl}/sessions/?limit=${pageSize}&page=${page}&start_date=${encodeURIComponent(startDateISO)}`,
+                        `${apiUrl}/sessions/?${params}`,
                         { headers: { "x-user-id": userId }, cache: "no-store" }
                     )
                     if (!res.ok) break
                     const data = await res.json()
                     const batch: Session[] = data.sessions || []
                     allSessions = allSessions.concat(batch)
-                    if (allSessions.length >= (data.total ?? 0) || batch.length < pageSize) break
-                    page++
+                    cursor = data.next_cursor ?? null
+                    if (!cursor) break
                 }
                 setSessions(allSessions)
             } catch (e) {
@@ -84,12 +84,12 @@ export function DashboardStats({ userId }: DashboardStatsProps) {
             if (currRes.ok) {
                 const d: SessionsPage = await currRes.json()
                 setCurrSessions(d.sessions)
-                setCurrTotal(d.total)
+                setCurrTotal(d.total ?? 0)
             }
             if (prevRes.ok) {
                 const d: SessionsPage = await prevRes.json()
                 setPrevSessions(d.sessions)
-                setPrevTotal(d.total)
+                setPrevTotal(d.total ?? 0)
             }
             if (agentsRes.ok) {
                 const d: Agent[] = await agentsRes.json()
@@ -19,16 +19,17 @@ export interface VoiceSession {
   agent_name?: string | null;
   analysis?: CallAnalysis | null;
   direction?: "inbound" | "outbound" | null;
-  metadata: Record<string, unknown>;
+  metadata?: Record<string, unknown> | null; // Session list: only with include_metadata=true
   created_at: string;
   updated_at: string;
 }
 
 export interface SessionsPage {
   sessions: VoiceSession[];
-  total: number;
+  total: number | null; // null when requested with count=none
   page: number;
   limit: number;
+  next_cursor: string | null; // Pass as `cursor` for the next page; null on the last page
 }
 
 export interface CostSummary {